@@ -0,0 +1,20 @@
+# backfill_timelines.py（为入库时时间线拉取失败的比赛补拉时间线，只请求 game-timelines，不重新拉取 detail）
+
+import argparse
+from web.lcu_client import backfill_timelines, DEFAULT_DETAIL_CONCURRENCY
+from web.lcu_session import get_session
+from web.match_storage import ensure_schema
+
+def backfill(session=None, limit=None, concurrency=DEFAULT_DETAIL_CONCURRENCY):
+    ensure_schema()
+    session = session or get_session()
+    filled, missing = session.call(lambda connection: backfill_timelines(connection, limit, concurrency))
+    print(f"✅ 补齐 {filled} / {missing} 场比赛的时间线")
+    return filled, missing
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refetch timelines for stored matches that are missing one")
+    parser.add_argument("--limit", type=int, default=None, help="at most this many matches (newest first)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_DETAIL_CONCURRENCY)
+    args = parser.parse_args()
+    backfill(limit=args.limit, concurrency=args.concurrency)
@@ -0,0 +1,120 @@
+# bench_backends.py（对比 MySQL 与嵌入式 SQLite 后端：逐场 / 批量入库与常用查询）
+#   python -m benchmarks.bench_backends --games 2000
+#   python -m benchmarks.bench_backends --backends sqlite     # 没有 MySQL 容器时只测 SQLite
+import argparse
+import os
+import tempfile
+import time
+import pymysql
+from benchmarks.synthetic import make_games
+from config.config import DB_HOST, DB_PORT, DB_USER, DB_PASS
+from web.match_aggregates import get_champion_stats, get_queue_stats
+from web.known_entities import get_known_entities
+from web.match_queries import recent_games, head_to_head, champion_history
+from web.match_storage import init_tables_if_missing, insert_match_json, insert_matches_bulk
+from web.sqlite_backend import connect_sqlite
+
+ME = "00000000-0000-4000-8000-00000000beef"
+# 基准使用独立的库，不影响真实数据
+BENCH_DB_NAME = "lol_stats_bench"
+BENCH_TABLES = (
+    "crawl_frontier", "timeline_frames", "match_timelines",
+    "participants", "teams", "players", "matches",
+    "player_champion_stats", "player_queue_stats", "schema_version",
+)
+
+
+def connect_mysql_bench():
+    conn = pymysql.connect(host=DB_HOST, port=DB_PORT, user=DB_USER, password=DB_PASS,
+                           charset="utf8mb4", autocommit=True)
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {BENCH_DB_NAME} DEFAULT CHARSET utf8mb4")
+        conn.select_db(BENCH_DB_NAME)
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        for table in BENCH_TABLES:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+    return conn
+
+def connect_sqlite_bench(workdir):
+    path = os.path.join(workdir, "bench.sqlite3")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return connect_sqlite(path)
+
+def time_queries(conn, repeat, champion_id, other_puuid):
+    cases = {
+        "recent_games": lambda: recent_games(conn, ME, 20),
+        "head_to_head": lambda: head_to_head(conn, ME, other_puuid, 50),
+        "champion_history": lambda: champion_history(conn, ME, champion_id, 50),
+        "champion_stats": lambda: get_champion_stats(conn, ME),
+        "queue_stats": lambda: get_queue_stats(conn, ME),
+    }
+    results = {}
+    for name, fn in cases.items():
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - started)
+        samples.sort()
+        results[name] = samples[len(samples) // 2]
+    return results
+
+def run_backend(conn, games, single, repeat):
+    init_tables_if_missing(conn)
+    # 每个后端都是新建的空库，不能沿用上一个后端写入后登记的已知实体
+    get_known_entities().clear()
+    results = {}
+
+    started = time.perf_counter()
+    for game in games[:single]:
+        insert_match_json(game, conn)
+    results["insert_match_json"] = single / (time.perf_counter() - started)
+
+    bulk = insert_matches_bulk(games[single:], conn, verbose=False)
+    results["insert_matches_bulk"] = bulk["matches"] / bulk["seconds"] if bulk["seconds"] else 0.0
+
+    me_part = next(p for p in games[0]["participantIdentities"] if p["player"]["puuid"] == ME)
+    champion_id = next(p["championId"] for p in games[0]["participants"]
+                       if p["participantId"] == me_part["participantId"])
+    other_puuid = next(p["player"]["puuid"] for p in games[0]["participantIdentities"]
+                       if p["player"]["puuid"] != ME)
+    results["queries"] = time_queries(conn, repeat, champion_id, other_puuid)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--single", type=int, default=200, help="games inserted one by one before the bulk load")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--backends", nargs="+", choices=("mysql", "sqlite"), default=["mysql", "sqlite"])
+    args = parser.parse_args()
+
+    games = make_games(args.games, seed=1, me=ME)
+    workdir = tempfile.mkdtemp(prefix="bench-backends-")
+    connectors = {"mysql": connect_mysql_bench, "sqlite": lambda: connect_sqlite_bench(workdir)}
+
+    report = {}
+    for backend in args.backends:
+        try:
+            conn = connectors[backend]()
+        except Exception as e:
+            print(f"[WARN] 跳过 {backend}: {e}")
+            continue
+        try:
+            report[backend] = run_backend(conn, games, args.single, args.repeat)
+        finally:
+            conn.close()
+
+    backends = list(report)
+    print(f"games={args.games} single={args.single} repeat={args.repeat}")
+    print(f"{'case':<22}" + "".join(f"{b:>14}" for b in backends))
+    for case in ("insert_match_json", "insert_matches_bulk"):
+        print(f"{case + ' (games/s)':<22}" + "".join(f"{report[b][case]:>14,.0f}" for b in backends))
+    for query in ("recent_games", "head_to_head", "champion_history", "champion_stats", "queue_stats"):
+        print(f"{query + ' (ms)':<22}" + "".join(f"{report[b]['queries'][query] * 1000:>14.3f}" for b in backends))
+
+if __name__ == "__main__":
+    main()
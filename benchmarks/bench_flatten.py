@@ -0,0 +1,61 @@
+# bench_flatten.py（对比 commands.py 原有的 json_normalize + next() 展平与 data.flatten.flatten_games）
+#   python -m benchmarks.bench_flatten --games 3000
+import argparse
+import time
+import pandas as pd
+from benchmarks.synthetic import make_games
+from data.flatten import flatten_games
+
+
+def legacy_flatten(games, queue_map, champ_map):
+    df_game = pd.json_normalize(games)
+    df_game['matchType'] = df_game['queueId'].map(queue_map).fillna('Unknown')
+    nested_cols = [c for c in df_game.columns if isinstance(df_game.iloc[0].get(c), list)]
+    df_game_clean = df_game.drop(columns=nested_cols)
+
+    records = []
+    for game in games:
+        for ident in game.get('participantIdentities', []):
+            pid = ident['participantId']
+            stats = next((p['stats'] for p in game['participants'] if p['participantId'] == pid), {})
+            champ_id = next((p['championId'] for p in game['participants'] if p['participantId'] == pid), None)
+            records.append({
+                'gameId': game['gameId'],
+                'summonerName': ident['player'].get('gameName'),
+                'championId': champ_id,
+                'championName': champ_map.get(champ_id),
+                **stats
+            })
+    return df_game_clean, pd.DataFrame(records)
+
+def best_of(fn, repeat, *args):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    games = make_games(args.games)
+    queue_map = {420: 'Ranked Solo', 450: 'ARAM', 1700: 'Ascension'}
+    champ_map = {i: f"Champion{i}" for i in range(1, 951)}
+
+    t_legacy, (g_old, p_old) = best_of(legacy_flatten, args.repeat, games, queue_map, champ_map)
+    t_new, (g_new, p_new) = best_of(flatten_games, args.repeat, games, queue_map, champ_map)
+
+    pd.testing.assert_frame_equal(g_old, g_new[g_old.columns], check_dtype=False)
+    pd.testing.assert_frame_equal(p_old, p_new[p_old.columns], check_dtype=False)
+
+    print(f"games={args.games} participants={len(p_new)}")
+    print(f"legacy  : {t_legacy * 1000:8.1f} ms")
+    print(f"columnar: {t_new * 1000:8.1f} ms  ({t_legacy / t_new:.1f}x)")
+
+if __name__ == "__main__":
+    main()
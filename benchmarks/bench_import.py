@@ -0,0 +1,71 @@
+# bench_import.py（离线导入基准：逐文件 json.load + insert_match_json 对比 web.bulk_import 进程池导入，SQLite 后端）
+#   python -m benchmarks.bench_import --games 5000 --workers 4
+#   python -m benchmarks.bench_import --format ndjson
+import argparse
+import json
+import os
+import tempfile
+import time
+from benchmarks.synthetic import make_games
+from web.bulk_import import import_dumps
+from web.known_entities import get_known_entities
+from web.match_storage import init_tables_if_missing, insert_match_json
+from web.sqlite_backend import connect_sqlite
+
+
+def write_dump(games, workdir, fmt):
+    if fmt == "ndjson":
+        with open(os.path.join(workdir, "games.ndjson"), "w", encoding="utf-8") as f:
+            for game in games:
+                f.write(json.dumps(game) + "\n")
+    else:
+        for game in games:
+            with open(os.path.join(workdir, f"{game['gameId']}.json"), "w", encoding="utf-8") as f:
+                json.dump(game, f)
+
+def fresh_db(workdir, name):
+    get_known_entities().clear()
+    conn = connect_sqlite(os.path.join(workdir, name))
+    init_tables_if_missing(conn)
+    return conn
+
+def bench_one_by_one(dump_dir, conn):
+    # 导入器出现之前的做法：逐个文件读取并调用 insert_match_json
+    started = time.perf_counter()
+    games = 0
+    for name in sorted(os.listdir(dump_dir)):
+        with open(os.path.join(dump_dir, name), encoding="utf-8") as f:
+            if name.endswith(".ndjson"):
+                details = [json.loads(line) for line in f]
+            else:
+                details = [json.load(f)]
+        for detail in details:
+            insert_match_json(detail, conn)
+            games += 1
+    return games, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--format", choices=("json", "ndjson"), default="json")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-import-")
+    dump_dir = os.path.join(workdir, "dump")
+    os.makedirs(dump_dir)
+    write_dump(make_games(args.games, seed=2), dump_dir, args.format)
+
+    conn = fresh_db(workdir, "one_by_one.sqlite3")
+    games, seconds = bench_one_by_one(dump_dir, conn)
+    conn.close()
+    print(f"{'insert_match_json':<22}{games / seconds:>10,.0f} games/s")
+
+    conn = fresh_db(workdir, "bulk_import.sqlite3")
+    stats = import_dumps([dump_dir], conn, workers=args.workers, checkpoint_path=None, verbose=False)
+    conn.close()
+    print(f"{'bulk_import':<22}{stats['games_per_sec']:>10,.0f} games/s  "
+          f"({stats['files_per_sec']:,.1f} files/s, workers={args.workers})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# bench_ingest.py（端到端入库基准：对 fake_lcu 假服务运行 fetch_and_store_history 与 call_api_paginated）
+#   python -m benchmarks.bench_ingest --games 300 --latency 0.02
+#   python -m benchmarks.bench_ingest --no-db        # 只测网络与行构建，写库替换为空操作
+#   写库时使用临时目录中的 SQLite 文件，不会写入配置的数据库
+#   python -m benchmarks.bench_ingest --capacity 8 --error-rate 0.02   # 模拟客户端过载，观察调度器重试与并发上限
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+import web.lcu_client as lcu_client
+import web.match_cache as match_cache
+from benchmarks.bench_backends import connect_sqlite_bench
+from benchmarks.fake_lcu import FakeLCUServer, HttpConnection
+from web.known_entities import get_known_entities
+from web.match_storage import init_tables_if_missing
+from web.sqlite_backend import connect_sqlite
+from web.request_scheduler import format_scheduler_stats, get_scheduler
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+def classify(endpoint: str) -> str:
+    if endpoint.endswith("/current-summoner"):
+        return "summoner"
+    if endpoint.endswith("/matches"):
+        return "history_page"
+    if "/games/" in endpoint:
+        return "match_detail"
+    if "/game-timelines/" in endpoint:
+        return "timeline"
+    return "other"
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def report(self) -> str:
+        lines = [f"{'stage':<14}{'count':>7}{'p50 ms':>10}{'p99 ms':>10}"]
+        for stage, values in self.samples.items():
+            lines.append(f"{stage:<14}{len(values):>7}"
+                         f"{percentile(values, 0.5) * 1000:>10.2f}{percentile(values, 0.99) * 1000:>10.2f}")
+        return "\n".join(lines)
+
+
+class TimedConnection:
+    """包装连接，按端点类别记录请求耗时（含读取响应体）。"""
+
+    def __init__(self, conn, timer: StageTimer):
+        self._conn = conn
+        self._timer = timer
+
+    async def request(self, method, endpoint, **kwargs):
+        started = time.perf_counter()
+        resp = await self._conn.request(method, endpoint, **kwargs)
+        await resp.read()
+        self._timer.add(classify(endpoint), time.perf_counter() - started)
+        return resp
+
+    async def close(self):
+        await self._conn.close()
+
+
+class _NullDB:
+    def close(self):
+        pass
+
+def install_bench_db(workdir):
+    # 与 bench_backends 相同：每次运行重建临时 SQLite 库并建表，写入路径上的连接都指向它
+    conn = connect_sqlite_bench(workdir)
+    try:
+        init_tables_if_missing(conn)
+    finally:
+        conn.close()
+    get_known_entities().clear()
+    path = os.path.join(workdir, "bench.sqlite3")
+    lcu_client.connect_mysql = lambda: connect_sqlite(path)
+    return path
+
+def install_db_timing(timer: StageTimer, use_db: bool, workdir=None):
+    insert = lcu_client.insert_match_json if use_db else (lambda *args, **kwargs: None)
+    if use_db:
+        print(f"bench database: {install_bench_db(workdir or tempfile.mkdtemp(prefix='bench-ingest-'))}")
+    else:
+        lcu_client.connect_mysql = _NullDB
+
+    def timed_insert(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return insert(*args, **kwargs)
+        finally:
+            timer.add("db_write", time.perf_counter() - started)
+
+    lcu_client.insert_match_json = timed_insert
+    if not use_db:
+        lcu_client.insert_timeline = lambda *args, **kwargs: None
+
+def start_server_thread(server: FakeLCUServer):
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name="fake-lcu", daemon=True).start()
+    ready.wait()
+    return loop
+
+async def bench_fetch_and_store(url, pages, page_size, concurrency, timer):
+    conn = TimedConnection(await HttpConnection(url).open(), timer)
+    games = 0
+    try:
+        for page_index in range(pages):
+            started = time.perf_counter()
+            games += await lcu_client.fetch_and_store_history(conn, page_index, page_size, concurrency)
+            timer.add("page_total", time.perf_counter() - started)
+    finally:
+        await conn.close()
+    return games
+
+def bench_call_api_paginated(url, total, page_size, workers, timer):
+    from PyQt5.QtCore import QCoreApplication
+    import web.websocket_client_api as api
+    from web.lcu_session import LCUSession, set_session
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+
+    async def factory():
+        return TimedConnection(await HttpConnection(url).open(), timer)
+
+    session = LCUSession(connection_factory=factory)
+    set_session(session)
+    session.wait_connected()
+
+    call_api = api.call_api
+
+    def timed_call_api(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return call_api(*args, **kwargs)
+        finally:
+            timer.add("call_api", time.perf_counter() - started)
+
+    api.call_api = timed_call_api
+    try:
+        return len(api.call_api_paginated("match_history", total_range=(0, total),
+                                          page_size=page_size, max_workers=workers))
+    finally:
+        api.call_api = call_api
+        session.stop()
+
+def run_case(name, fn):
+    started = time.perf_counter()
+    games = fn()
+    elapsed = time.perf_counter() - started
+    print(f"\n== {name}: {games} games in {elapsed:.2f}s ({games / elapsed if elapsed else 0:.1f} games/s)")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=300)
+    parser.add_argument("--page-size", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--capacity", type=int, default=0, help="fake client overload threshold (0 = unlimited)")
+    parser.add_argument("--concurrency", type=int, default=lcu_client.DEFAULT_DETAIL_CONCURRENCY)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--no-db", action="store_true")
+    parser.add_argument("--skip-qt", action="store_true", help="skip the call_api_paginated (Qt) case")
+    args = parser.parse_args()
+
+    # 原始 JSON 缓存写到临时目录，不污染 cache/
+    match_cache._cache = match_cache.MatchCache(tempfile.mkdtemp(prefix="bench-cache-"))
+
+    server = FakeLCUServer(n_games=args.games, latency=args.latency, jitter=args.jitter,
+                           error_rate=args.error_rate, capacity=args.capacity)
+    loop = start_server_thread(server)
+    pages = (args.games + args.page_size - 1) // args.page_size
+
+    timer = StageTimer()
+    install_db_timing(timer, use_db=not args.no_db)
+    run_case("fetch_and_store_history", lambda: asyncio.run(
+        bench_fetch_and_store(server.url, pages, args.page_size, args.concurrency, timer)))
+    print(timer.report())
+    print(format_scheduler_stats(get_scheduler().snapshot()))
+
+    if not args.skip_qt:
+        timer = StageTimer()
+        run_case("call_api_paginated", lambda: bench_call_api_paginated(
+            server.url, args.games, args.page_size, args.workers, timer))
+        print(timer.report())
+
+    loop.call_soon_threadsafe(loop.stop)
+
+if __name__ == "__main__":
+    main()
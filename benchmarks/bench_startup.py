@@ -0,0 +1,75 @@
+# bench_startup.py（启动耗时：从启动解释器到主窗口第一次绘制，每次都在新进程中测量）
+#   python -m benchmarks.bench_startup --runs 5
+#   QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_startup    # 无显示器环境
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# 子进程：分别记录导入主窗口模块、构造窗口、首次 Paint 事件相对脚本开始的时间
+CHILD_SCRIPT = r"""
+import sys, time
+t0 = time.perf_counter()
+from PyQt5.QtCore import QEvent, QObject
+from PyQt5.QtWidgets import QApplication
+import config.config
+from ui.main_window import MainWindow
+t_import = time.perf_counter()
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            t_paint = time.perf_counter()
+            print(f"RESULT {t_import - t0:.6f} {t_window - t0:.6f} {t_paint - t0:.6f} "
+                  f"{int('sqlalchemy' in sys.modules)} {int('pandas' in sys.modules)} "
+                  f"{int('lcu_driver' in sys.modules)}", flush=True)
+            app.quit()
+        return False
+
+app = QApplication(sys.argv)
+window = MainWindow()
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+t_window = time.perf_counter()
+app.exec_()
+"""
+
+STARTUP_BUDGET_SEC = 1.0
+
+
+def run_once(cwd):
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", CHILD_SCRIPT], cwd=cwd, capture_output=True, text=True, timeout=60)
+    wall = time.perf_counter() - started
+    line = next((l for l in proc.stdout.splitlines() if l.startswith("RESULT ")), None)
+    if line is None:
+        raise RuntimeError(f"startup child failed:\n{proc.stdout}\n{proc.stderr}")
+    t_import, t_window, t_paint, *loaded = line.split()[1:]
+    return {
+        "import": float(t_import), "window": float(t_window), "paint": float(t_paint), "wall": wall,
+        "heavy_modules": [name for name, flag in zip(("sqlalchemy", "pandas", "lcu_driver"), loaded) if flag == "1"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = [run_once(cwd) for _ in range(args.runs)]
+
+    print(f"runs={args.runs} (median, seconds)")
+    for key, label in (("import", "import modules"), ("window", "MainWindow built"),
+                       ("paint", "first paint"), ("wall", "process wall time")):
+        print(f"{label:<20}{statistics.median(r[key] for r in runs):8.3f}")
+    print(f"heavy modules loaded before first paint: {', '.join(runs[0]['heavy_modules']) or 'none'}")
+
+    paint = statistics.median(r["paint"] for r in runs)
+    status = "✅" if paint < STARTUP_BUDGET_SEC else "❌"
+    print(f"{status} first paint {paint:.3f}s (budget {STARTUP_BUDGET_SEC:.1f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# fake_lcu.py（本地 aiohttp 假 LCU 服务：合成或录制的比赛数据，可配置延迟与错误注入）
+#   python -m benchmarks.fake_lcu --games 300 --latency 0.02 --error-rate 0.05
+import argparse
+import asyncio
+import json
+import random
+import aiohttp
+from aiohttp import web
+from benchmarks.synthetic import make_games, make_summary, make_timeline
+from web.match_cache import MatchCache
+
+FAKE_PUUID = "00000000-0000-4000-8000-00000000beef"
+DEFAULT_PORT = 2999
+
+
+class FakeLCUServer:
+    """提供 current-summoner / match history 分页 / games/{id} / game-timelines/{id} / region-locale 端点。
+
+    latency 为每个请求的基础延迟（秒），jitter 为额外的均匀随机延迟上限；
+    error_rate 的请求返回 503，incomplete_rate 的 detail 缺少 participants（触发 fallback）。
+    capacity > 0 时模拟客户端过载：同时处理的请求超过 capacity 个后，多出的请求延迟翻倍并返回 503。
+    根路径为 websocket 事件流（同 LCU 的 OnJsonApiEvent），publish() 向所有订阅者推送事件，
+    add_game() 模拟一场刚结束的比赛出现在历史中。
+    """
+
+    def __init__(self, games=None, n_games=300, latency=0.0, jitter=0.0, error_rate=0.0,
+                 incomplete_rate=0.0, capacity=0, host="127.0.0.1", port=0, seed=0):
+        games = games if games is not None else make_games(n_games, seed=seed, me=FAKE_PUUID)
+        # LCU 的历史按时间倒序返回
+        self.games = sorted(games, key=lambda g: g["gameId"], reverse=True)
+        self.by_id = {g["gameId"]: g for g in self.games}
+        # 每个玩家的历史只包含其参与的比赛（多玩家抓取时按 puuid 翻页）
+        self.by_puuid = {}
+        for g in self.games:
+            for ident in g.get("participantIdentities", ()):
+                self.by_puuid.setdefault(ident["player"]["puuid"], []).append(g)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.incomplete_rate = incomplete_rate
+        self.capacity = capacity
+        self.in_flight = 0
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._runner = None
+        self._loop = None
+        self._sockets = set()
+        # gameflow-phase / champ-select session 的当前值，publish 事件时由调用方一并更新
+        self.phase = "None"
+        self.champ_select = None
+
+    @classmethod
+    def from_cache(cls, cache_dir, **kwargs):
+        cache = MatchCache(cache_dir)
+        return cls(games=list(cache.iter_details()), **kwargs)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        app = web.Application(middlewares=[self._inject_faults])
+        app.router.add_get("/", self._websocket)
+        app.router.add_get("/lol-summoner/v1/current-summoner", self._summoner)
+        app.router.add_get("/lol-match-history/v1/products/lol/{puuid}/matches", self._history)
+        app.router.add_get("/lol-match-history/v1/games/{game_id}", self._game)
+        app.router.add_get("/lol-match-history/v1/game-timelines/{game_id}", self._timeline)
+        app.router.add_get("/riotclient/region-locale", self._region_locale)
+        app.router.add_get("/lol-gameflow/v1/gameflow-phase", self._gameflow_phase)
+        app.router.add_get("/lol-champ-select/v1/session", self._champ_select)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if not self.port:
+            self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def add_game(self, game: dict):
+        self.games.insert(0, game)
+        self.by_id[game["gameId"]] = game
+        for ident in game.get("participantIdentities", ()):
+            self.by_puuid.setdefault(ident["player"]["puuid"], []).insert(0, game)
+
+    def publish(self, uri: str, event_type: str, data):
+        """可在任意线程调用。"""
+        message = json.dumps([8, "OnJsonApiEvent", {"uri": uri, "eventType": event_type, "data": data}])
+        for ws in list(self._sockets):
+            asyncio.run_coroutine_threadsafe(ws.send_str(message), self._loop)
+
+    async def _websocket(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._sockets.add(ws)
+        try:
+            async for _msg in ws:
+                # 客户端发送的订阅请求 [5, "OnJsonApiEvent"] 无需处理
+                pass
+        finally:
+            self._sockets.discard(ws)
+        return ws
+
+    @web.middleware
+    async def _inject_faults(self, request, handler):
+        if request.path == "/":
+            return await handler(request)
+        self.requests += 1
+        self.in_flight += 1
+        try:
+            overloaded = self.capacity and self.in_flight > self.capacity
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            if delay:
+                await asyncio.sleep(delay * 2 if overloaded else delay)
+            if overloaded or (self.error_rate and self._rng.random() < self.error_rate):
+                return web.json_response({"errorCode": "RPC_ERROR", "httpStatus": 503}, status=503)
+            return await handler(request)
+        finally:
+            self.in_flight -= 1
+
+    async def _summoner(self, request):
+        return web.json_response({"displayName": "FakeSummoner", "puuid": FAKE_PUUID, "summonerId": 1})
+
+    async def _history(self, request):
+        puuid = request.match_info["puuid"]
+        beg = int(request.query.get("begIndex", 0))
+        end = int(request.query.get("endIndex", beg + 20))
+        games = [make_summary(g, puuid) for g in self.by_puuid.get(puuid, ())[beg:end]]
+        return web.json_response({"games": {"games": games, "gameCount": len(games)}})
+
+    async def _game(self, request):
+        game = self.by_id.get(int(request.match_info["game_id"]))
+        if game is None:
+            return web.json_response({"errorCode": "RPC_ERROR", "httpStatus": 404}, status=404)
+        if self.incomplete_rate and self._rng.random() < self.incomplete_rate:
+            game = {k: v for k, v in game.items() if k != "participants"}
+        return web.json_response(game)
+
+    async def _timeline(self, request):
+        game = self.by_id.get(int(request.match_info["game_id"]))
+        if game is None:
+            return web.json_response({"errorCode": "RPC_ERROR", "httpStatus": 404}, status=404)
+        return web.json_response(make_timeline(game))
+
+    async def _gameflow_phase(self, request):
+        return web.json_response(self.phase)
+
+    async def _champ_select(self, request):
+        if self.champ_select is None:
+            return web.json_response({"errorCode": "RPC_ERROR", "httpStatus": 404}, status=404)
+        return web.json_response(self.champ_select)
+
+    async def _region_locale(self, request):
+        return web.json_response({"locale": "en_US", "region": "NA"})
+
+
+class HttpConnection:
+    """lcu_driver Connection 的最小替身：request(method, endpoint, **kwargs) 返回 aiohttp 响应。"""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.session = None
+
+    async def open(self):
+        self.session = aiohttp.ClientSession()
+        return self
+
+    async def request(self, method: str, endpoint: str, **kwargs):
+        if kwargs.get("data"):
+            kwargs["data"] = json.dumps(kwargs["data"])
+        return await self.session.request(method, f"{self.base_url}{endpoint}", **kwargs)
+
+    async def run_ws(self, dispatch):
+        """订阅事件流，对每个事件调用 dispatch(self, {"uri", "eventType", "data"})，直到连接关闭或被取消。"""
+        async with self.session.ws_connect(f"{self.base_url}/") as ws:
+            await ws.send_json([5, "OnJsonApiEvent"])
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    dispatch(self, json.loads(msg.data)[2])
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+
+def connection_factory(base_url: str):
+    async def factory():
+        return await HttpConnection(base_url).open()
+    return factory
+
+async def serve_forever(server: FakeLCUServer):
+    await server.start()
+    print(f"Fake LCU listening on {server.url} ({len(server.games)} games, puuid={FAKE_PUUID})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=300)
+    parser.add_argument("--cache-dir", help="serve recorded payloads from a match cache instead of synthetic games")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--incomplete-rate", type=float, default=0.0)
+    parser.add_argument("--capacity", type=int, default=0)
+    args = parser.parse_args()
+
+    options = dict(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                   incomplete_rate=args.incomplete_rate, capacity=args.capacity, port=args.port)
+    server = (FakeLCUServer.from_cache(args.cache_dir, **options) if args.cache_dir
+              else FakeLCUServer(n_games=args.games, **options))
+    try:
+        asyncio.run(serve_forever(server))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,121 @@
+# synthetic.py（生成与 LCU /lol-match-history/v1/games/{id} 同结构的合成比赛数据）
+import random
+from datetime import datetime, timedelta, timezone
+
+QUEUES = (420, 440, 450, 1700)
+LANES = (("TOP", "SOLO"), ("JUNGLE", "NONE"), ("MIDDLE", "SOLO"), ("BOTTOM", "CARRY"), ("BOTTOM", "SUPPORT"))
+BASE_GAME_ID = 7_000_000_000
+BASE_CREATION = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def make_puuid(rng: random.Random, pool_size: int) -> str:
+    n = rng.randrange(pool_size)
+    return f"{n:08x}-0000-4000-8000-{n:012x}"
+
+def make_stats(rng: random.Random, win: bool) -> dict:
+    stats = {
+        "win": win, "champLevel": rng.randint(8, 18),
+        "kills": rng.randint(0, 20), "deaths": rng.randint(0, 15), "assists": rng.randint(0, 25),
+        "totalDamageDealtToChampions": rng.randint(2000, 60000),
+        "magicDamageDealtToChampions": rng.randint(0, 30000),
+        "physicalDamageDealtToChampions": rng.randint(0, 30000),
+        "trueDamageDealtToChampions": rng.randint(0, 5000),
+        "totalDamageTaken": rng.randint(5000, 60000), "magicalDamageTaken": rng.randint(0, 20000),
+        "physicalDamageTaken": rng.randint(0, 30000), "trueDamageTaken": rng.randint(0, 3000),
+        "totalHeal": rng.randint(0, 20000), "totalUnitsHealed": rng.randint(0, 5),
+        "totalShieldedOnTeammates": rng.randint(0, 5000), "timeCCingOthers": rng.randint(0, 60),
+        "visionScore": rng.randint(0, 80), "wardsPlaced": rng.randint(0, 30), "wardsKilled": rng.randint(0, 10),
+        "visionWardsBoughtInGame": rng.randint(0, 6),
+        "goldEarned": rng.randint(5000, 20000), "goldSpent": rng.randint(4000, 19000),
+        "totalMinionsKilled": rng.randint(0, 300), "neutralMinionsKilled": rng.randint(0, 200),
+        "perkPrimaryStyle": rng.choice((8000, 8100, 8200, 8300, 8400)),
+        "perkSubStyle": rng.choice((8000, 8100, 8200, 8300, 8400)),
+        "statPerk0": 5008, "statPerk1": 5008, "statPerk2": 5002,
+    }
+    for i in range(7):
+        stats[f"item{i}"] = rng.randint(1000, 7000)
+    for i in range(6):
+        stats[f"perk{i}"] = rng.randint(8000, 9000)
+    return stats
+
+def make_game(game_id: int, rng: random.Random, player_pool=2000, me=None) -> dict:
+    winner = rng.choice((100, 200))
+    participants, identities = [], []
+    for pid in range(1, 11):
+        team_id = 100 if pid <= 5 else 200
+        lane, role = LANES[(pid - 1) % 5]
+        participants.append({
+            "participantId": pid, "teamId": team_id, "championId": rng.randint(1, 950),
+            "spell1Id": 4, "spell2Id": rng.choice((3, 7, 11, 12, 14)),
+            "stats": make_stats(rng, team_id == winner),
+            "timeline": {"lane": lane, "role": role},
+        })
+        puuid = me if (me and pid == 1) else make_puuid(rng, player_pool)
+        identities.append({
+            "participantId": pid,
+            "player": {
+                "puuid": puuid, "gameName": f"Player{puuid[:4]}", "summonerName": f"Player{puuid[:4]}",
+                "tagLine": "NA1", "platformId": "NA1", "profileIcon": rng.randint(1, 5000),
+            },
+        })
+
+    creation = BASE_CREATION + timedelta(minutes=40 * (game_id - BASE_GAME_ID))
+    return {
+        "gameId": game_id,
+        "gameCreationDate": creation.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "gameDuration": rng.randint(900, 2700),
+        "queueId": rng.choice(QUEUES), "mapId": 11,
+        "gameMode": "CLASSIC", "gameType": "MATCHED_GAME", "gameVersion": "15.6.123.4567",
+        "platformId": "NA1", "seasonId": 15,
+        "teams": [
+            {"teamId": t, "win": "Win" if t == winner else "Fail",
+             "firstBlood": rng.random() < 0.5, "firstTower": rng.random() < 0.5,
+             "towerKills": rng.randint(0, 11), "inhibitorKills": rng.randint(0, 3),
+             "dragonKills": rng.randint(0, 5), "baronKills": rng.randint(0, 2),
+             "riftHeraldKills": rng.randint(0, 2), "bans": []}
+            for t in (100, 200)
+        ],
+        "participants": participants,
+        "participantIdentities": identities,
+    }
+
+def make_timeline(game: dict, seed=0) -> dict:
+    # 与 /lol-match-history/v1/game-timelines/{id} 同结构：每分钟一帧，累计金币 / 经验 / 补刀单调递增
+    rng = random.Random(game["gameId"] ^ seed)
+    n_frames = game["gameDuration"] // 60 + 1
+    totals = {p["participantId"]: [500, 0, 0, 0] for p in game["participants"]}
+    frames = []
+    for minute in range(n_frames):
+        participant_frames = {}
+        for pid, total in totals.items():
+            if minute:
+                total[0] += rng.randint(250, 500)
+                total[1] += rng.randint(300, 600)
+                total[2] += rng.randint(0, 10)
+                total[3] += rng.randint(0, 4)
+            participant_frames[str(pid)] = {
+                "participantId": pid, "totalGold": total[0], "currentGold": rng.randint(0, 1500),
+                "xp": total[1], "level": min(18, 1 + total[1] // 1000),
+                "minionsKilled": total[2], "jungleMinionsKilled": total[3],
+                "position": {"x": rng.randint(0, 15000), "y": rng.randint(0, 15000)},
+            }
+        events = [
+            {"type": "CHAMPION_KILL", "timestamp": minute * 60000 + rng.randint(0, 59999),
+             "killerId": rng.randint(1, 10), "victimId": rng.randint(1, 10),
+             "position": {"x": rng.randint(0, 15000), "y": rng.randint(0, 15000)}}
+            for _ in range(rng.randint(0, 3))
+        ] if minute else []
+        frames.append({"timestamp": minute * 60000, "participantFrames": participant_frames, "events": events})
+    return {"frameInterval": 60000, "frames": frames}
+
+def make_games(n: int, seed=0, player_pool=2000, me=None) -> list:
+    rng = random.Random(seed)
+    return [make_game(BASE_GAME_ID + i, rng, player_pool, me) for i in range(n)]
+
+def make_summary(game: dict, puuid: str) -> dict:
+    # match history 列表里的摘要只带当前玩家自己的 participant
+    pid = next((i["participantId"] for i in game["participantIdentities"] if i["player"]["puuid"] == puuid), 1)
+    summary = {k: v for k, v in game.items() if k not in ("participants", "participantIdentities", "teams")}
+    summary["participants"] = [p for p in game["participants"] if p["participantId"] == pid]
+    summary["participantIdentities"] = [i for i in game["participantIdentities"] if i["participantId"] == pid]
+    return summary
@@ -1,21 +1,46 @@
 # commands.py
 import asyncio
-import pandas as pd
 from lcu_driver import Connector
 from rich.console import Console
-from config.config import engine
-from data.db import insert_data, show_status, clear_tables
 from web.mappings import load_queue_map, load_champion_map
-from web.lcu_client import fetch_match_history, get_current_summoner, get_current_game_phase
+from web.lcu_client import (
+    fetch_match_history_page, get_current_summoner, get_current_game_phase, DEFAULT_SYNC_MAX_PAGES
+)
+from web.live_watcher import LiveWatcher
 
 console = Console()
 connector = Connector()
+# 订阅对局事件：结束的对局自动入库，current 命令直接读取缓存的状态
+watcher = LiveWatcher(on_ingested=lambda game_id, detail: console.print(f"✅ Game {game_id} stored"))
+
+# 命令 -> 队列 ID
+QUEUE_FILTERS = {'solo': 420, 'aram': 450, 'duel': 1700}
+HISTORY_PAGE_SIZE = 30
+
+async def fetch_match_history(connection, puuid, max_pages=DEFAULT_SYNC_MAX_PAGES, page_size=HISTORY_PAGE_SIZE):
+    # 顺序翻页直到不足一页（或达到上限）
+    games = []
+    for page_index in range(max_pages):
+        page = await fetch_match_history_page(connection, puuid, page_index, page_size)
+        games.extend(page)
+        if len(page) < page_size:
+            break
+    return games
+
+async def load_history_store(connection, puuid):
+    # 原始 JSON 只在构建期间存在，返回后只保留紧凑的 MatchStore
+    from data.match_store import MatchStore
+    games = await fetch_match_history(connection, puuid)
+    return MatchStore.from_games(games) if games else None
 
 async def process_commands(connection):
+    # pandas / SQLAlchemy 相关模块较重，进入命令循环时才导入
+    from data.db import insert_data, show_status, clear_tables
+
     summ, puuid = await get_current_summoner(connection)
     queue_map = load_queue_map()
     champ_map = load_champion_map()
-    cached = None
+    store = None
 
     console.print("Commands: all, solo, aram, duel, status, clear, current, quit")
     while True:
@@ -23,51 +48,26 @@ async def process_commands(connection):
         if choice == 'quit':
             break
 
-        if choice in ('all', 'solo', 'aram', 'duel'):
-            if cached is None:
-                games = await fetch_match_history(connection, puuid)
-                if not games:
+        if choice == 'all' or choice in QUEUE_FILTERS:
+            if store is None:
+                # 紧凑列式存储代替整表 DataFrame 缓存，按队列筛选直接在数组上完成
+                store = await load_history_store(connection, puuid)
+                if store is None:
                     console.print("No match history found.")
                     continue
 
-                df_game = pd.json_normalize(games)
-                df_game['matchType'] = df_game['queueId'].map(queue_map).fillna('Unknown')
-                # 去掉嵌套的列
-                nested_cols = [c for c in df_game.columns if isinstance(df_game.iloc[0].get(c), list)]
-                df_game_clean = df_game.drop(columns=nested_cols)
-
-                records = []
-                for game in games:
-                    for ident in game.get('participantIdentities', []):
-                        pid = ident['participantId']
-                        stats = next((p['stats'] for p in game['participants'] if p['participantId'] == pid), {})
-                        champ_id = next((p['championId'] for p in game['participants'] if p['participantId'] == pid), None)
-                        records.append({
-                            'gameId': game['gameId'],
-                            'summonerName': ident['player'].get('gameName'),
-                            'championId': champ_id,
-                            'championName': champ_map.get(champ_id),
-                            **stats
-                        })
-                df_part = pd.DataFrame(records)
-                cached = {'game': df_game_clean, 'participants': df_part}
-
-            df = cached['participants'].merge(cached['game'][['gameId', 'matchType']], on='gameId')
-            if choice == 'solo': 
-                df = df[df['matchType'] == queue_map.get(420)]
-            elif choice == 'aram': 
-                df = df[df['matchType'] == queue_map.get(450)]
-            elif choice == 'duel': 
-                df = df[df['matchType'] == queue_map.get(1700)]
-                
-            if df.empty:
+            selected = store if choice == 'all' else store.filter_queue(QUEUE_FILTERS[choice])
+            if not len(selected):
                 console.print(f"No records for '{choice}'.")
                 continue
 
-            # 根据不同的数据表分别插入
-            for name, df_ent in cached.items():
-                out = df_ent[df_ent['gameId'].isin(df['gameId'].unique())]
-                insert_data(name, out)
+            # 只为选中的比赛从数组列生成 game / participants 两张表并插入
+            df_game = selected.games_frame()
+            df_game['match_type'] = df_game['queue_id'].map(queue_map).fillna('Unknown')
+            df_part = selected.to_frame().drop(columns=['queue_id', 'duration_sec'])
+            df_part['champion_name'] = df_part['champion_id'].map(champ_map)
+            insert_data('game', df_game)
+            insert_data('participants', df_part)
 
         elif choice == 'status':
             show_status()
@@ -76,16 +76,24 @@ async def process_commands(connection):
             clear_tables()
 
         elif choice == 'current':
-            session = await get_current_game_phase(connection)
-            console.print(session)
+            state = watcher.current_state()
+            if state["phase"] is None:
+                # 尚未收到任何事件（prime 失败）时退回一次性查询
+                state = await get_current_game_phase(connection)
+            console.print(state)
 
         else:
             console.print("Unknown command — try again.")
 
 async def connect(connection):
+    try:
+        await watcher.prime(connection)
+    except Exception as e:
+        console.print(f"Failed to read game phase: {e}")
     await process_commands(connection)
     await connector.stop()
 
 def run():
+    watcher.register(connector)
     connector.ready(connect)
     connector.start()
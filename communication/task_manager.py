@@ -1,11 +1,204 @@
-# communication/task_manager.py
-import concurrent.futures
+# communication/task_manager.py（API 任务调度：按优先级排队，相同请求合并执行，可取消，统计排队深度与耗时）
+import heapq
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
 from web import call_api
+from web.metrics import metrics
 
+# 数值越小越先执行：界面上的交互请求排在批量回填之前
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 5
+PRIORITY_BACKFILL = 10
 
-# 建立一个固定大小的线程池，可根据需要调整 max_workers 数量
-executor = concurrent.futures.ThreadPoolExecutor(max_workers=3)
+DEFAULT_WORKERS = 3
 
-def submit_api_task(api_name):
-    # 提交任务到线程池，每次任务调用都会重新建立 websocket 连接
-    return executor.submit(call_api, api_name)
+_QUEUED, _RUNNING, _DONE = "queued", "running", "done"
+
+
+class _Task:
+    def __init__(self, key, fn, args, kwargs, priority):
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.state = _QUEUED
+        # 每个调用方各自的 Future；全部取消且尚未开始时任务出队
+        self.waiters = []
+        self.submitted_at = time.perf_counter()
+
+
+class _LatencyStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self) -> dict:
+        return {"count": self.count, "avg": self.total / self.count if self.count else 0.0, "max": self.max}
+
+
+class TaskManager:
+    """固定数量的工作线程从优先级队列取任务。
+
+    submit() 返回 concurrent.futures.Future：key 相同的任务在排队或执行期间只运行一次，
+    结果分发给所有调用方（single-flight）；更高优先级的重复提交会把排队中的任务提前。
+    调用方 future.cancel() 只撤销自己的等待，所有调用方都取消后排队中的任务不再执行；
+    已开始执行的任务无法中断，结果被丢弃。
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS):
+        self.max_workers = max_workers
+        self._heap = []
+        self._seq = itertools.count()
+        self._inflight = {}
+        self._cond = threading.Condition()
+        self._threads = []
+        self._shutdown = False
+        # 正在执行的任务数（含 key=None 的任务，它们不在 _inflight 中）
+        self._running = 0
+        self.counters = {"submitted": 0, "coalesced": 0, "cancelled": 0, "completed": 0, "failed": 0}
+        self._wait = {}
+        self._run = {}
+
+    # ----------------- 提交 / 取消 -----------------
+
+    def submit(self, fn, *args, key=None, priority=PRIORITY_NORMAL, **kwargs) -> Future:
+        future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("TaskManager 已关闭")
+            self.counters["submitted"] += 1
+            task = self._inflight.get(key) if key is not None else None
+            if task is not None and task.state != _DONE:
+                self.counters["coalesced"] += 1
+                metrics.inc("task_manager_coalesced_total")
+                if task.state == _QUEUED and priority < task.priority:
+                    task.priority = priority
+                    heapq.heappush(self._heap, (priority, next(self._seq), task))
+            else:
+                task = _Task(key, fn, args, kwargs, priority)
+                if key is not None:
+                    self._inflight[key] = task
+                heapq.heappush(self._heap, (priority, next(self._seq), task))
+                self._ensure_workers()
+                self._cond.notify()
+            task.waiters.append(future)
+        future.add_done_callback(lambda f, task=task: self._on_waiter_done(task, f))
+        return future
+
+    def _on_waiter_done(self, task, future):
+        if not future.cancelled():
+            return
+        with self._cond:
+            self.counters["cancelled"] += 1
+            if task.state == _QUEUED and all(w.cancelled() for w in task.waiters):
+                # 堆中的条目在出队时跳过
+                task.state = _DONE
+                self._forget(task)
+
+    def _forget(self, task):
+        if task.key is not None and self._inflight.get(task.key) is task:
+            del self._inflight[task.key]
+
+    # ----------------- 执行 -----------------
+
+    def _ensure_workers(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.max_workers:
+            thread = threading.Thread(target=self._worker, name=f"task-manager-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_task(self):
+        with self._cond:
+            while True:
+                while self._heap:
+                    priority, _seq, task = heapq.heappop(self._heap)
+                    # 已取消或被提前（重复入堆）的旧条目
+                    if task.state != _QUEUED or priority != task.priority:
+                        continue
+                    task.state = _RUNNING
+                    self._running += 1
+                    return task
+                if self._shutdown:
+                    return None
+                self._cond.wait()
+
+    def _worker(self):
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            started = time.perf_counter()
+            self._record(self._wait, task.priority, started - task.submitted_at)
+            try:
+                result, error = task.fn(*task.args, **task.kwargs), None
+            except BaseException as e:
+                result, error = None, e
+            self._record(self._run, task.priority, time.perf_counter() - started)
+
+            with self._cond:
+                task.state = _DONE
+                self._running -= 1
+                self._forget(task)
+                self.counters["failed" if error is not None else "completed"] += 1
+                waiters = list(task.waiters)
+            for future in waiters:
+                try:
+                    if error is not None:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(result)
+                except InvalidStateError:
+                    # 调用方已取消
+                    pass
+
+    def _record(self, table, priority, seconds):
+        with self._cond:
+            table.setdefault(priority, _LatencyStats()).add(seconds)
+        metrics.observe("task_manager_wait_seconds" if table is self._wait else "task_manager_run_seconds",
+                        seconds, priority=priority)
+
+    # ----------------- 统计 / 关闭 -----------------
+
+    def stats(self) -> dict:
+        with self._cond:
+            depth = {}
+            for priority, _seq, task in self._heap:
+                if task.state == _QUEUED and priority == task.priority:
+                    depth[priority] = depth.get(priority, 0) + 1
+            return {
+                "queue_depth": depth,
+                "running": self._running,
+                "counters": dict(self.counters),
+                "wait": {p: s.as_dict() for p, s in sorted(self._wait.items())},
+                "run": {p: s.as_dict() for p, s in sorted(self._run.items())},
+            }
+
+    def shutdown(self, wait=True):
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+task_manager = TaskManager()
+
+def api_task_key(api_name, api_params=None):
+    return ("api", api_name, json.dumps(api_params or {}, sort_keys=True, default=str))
+
+def submit_api_task(api_name, api_params=None, priority=PRIORITY_INTERACTIVE):
+    # call_api 复用 LCU 长连接会话；同一页 / 同一召唤师的并发请求合并为一次调用
+    return task_manager.submit(call_api, api_name, api_params, key=api_task_key(api_name, api_params),
+                               priority=priority)
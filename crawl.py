@@ -0,0 +1,52 @@
+# crawl.py（多玩家抓取：从同场过的玩家出发抓取他们的比赛历史，可中断，下次运行从 crawl_frontier 继续）
+
+import argparse
+from web.crawler import (
+    CrawlPipeline, crawl_progress, DEFAULT_MAX_PLAYERS, DEFAULT_PAGES_PER_PLAYER, DEFAULT_CRAWL_PAGE_SIZE,
+    DEFAULT_PLAYER_WORKERS, DEFAULT_CRAWL_FETCH_WORKERS,
+)
+from web.ingest_pipeline import format_stats
+from web.lcu_session import get_session
+from web.match_storage import connect_mysql, ensure_schema
+
+def crawl(session=None, **options):
+    ensure_schema()
+    session = session or get_session()
+    holder = {}
+
+    async def run(connection):
+        holder["pipeline"] = CrawlPipeline(connection, **options)
+        return await holder["pipeline"].run()
+
+    try:
+        stats = session.call(run)
+    except KeyboardInterrupt:
+        if "pipeline" in holder:
+            holder["pipeline"].cancel()
+        print("⏹️ 已中断，下次运行将从未完成的玩家继续")
+        return None
+    print(format_stats(stats))
+    print(holder["pipeline"].crawl_snapshot())
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl the match histories of players we have played with")
+    parser.add_argument("--max-players", type=int, default=DEFAULT_MAX_PLAYERS)
+    parser.add_argument("--pages-per-player", type=int, default=DEFAULT_PAGES_PER_PLAYER)
+    parser.add_argument("--page-size", type=int, default=DEFAULT_CRAWL_PAGE_SIZE)
+    parser.add_argument("--player-workers", type=int, default=DEFAULT_PLAYER_WORKERS)
+    parser.add_argument("--fetch-workers", type=int, default=DEFAULT_CRAWL_FETCH_WORKERS)
+    parser.add_argument("--no-expand", action="store_true", help="only crawl players known when the run starts")
+    args = parser.parse_args()
+
+    try:
+        crawl(max_players=args.max_players, pages_per_player=args.pages_per_player, page_size=args.page_size,
+              player_workers=args.player_workers, fetch_workers=args.fetch_workers, expand=not args.no_expand)
+        conn = connect_mysql()
+        try:
+            print("📊 抓取进度:", crawl_progress(conn))
+        finally:
+            conn.close()
+        print("✅ 抓取完成")
+    except Exception as e:
+        print("❌ 抓取失败:", e)
@@ -1,24 +1,31 @@
 # db.py
 import pandas as pd
 from sqlalchemy import inspect, text
-from config.config import engine
+from web.db_pool import get_engine
+from web.known_entities import get_known_entities
 from rich.console import Console
 
 console = Console()
 
 def insert_data(table_name: str, df: pd.DataFrame):
-    df.to_sql(table_name, engine, if_exists='append', index=False)
+    df.to_sql(table_name, get_engine(), if_exists='append', index=False)
     console.print(f"✅ Inserted {len(df)} rows into '{table_name}' table")
 
 def show_status():
+    engine = get_engine()
     inspector = inspect(engine)
     for tbl in inspector.get_table_names():
         count = pd.read_sql(f"SELECT COUNT(*) AS cnt FROM `{tbl}`", engine)['cnt'][0]
         console.print(f"{tbl}: {count:,} rows")
 
 def clear_tables():
+    engine = get_engine()
     inspector = inspect(engine)
+    # 按外键依赖逆序删除（先子表后父表），两种后端都开启了外键检查
+    tables = [tbl for tbl, _fks in inspector.get_sorted_table_and_fkc_names() if tbl]
     with engine.begin() as conn:
-        for tbl in inspector.get_table_names():
-            conn.execute(text(f"TRUNCATE TABLE `{tbl}`"))
+        for tbl in reversed(tables):
+            # SQLite 没有 TRUNCATE，DELETE 在两种后端上都可用
+            conn.execute(text(f"DELETE FROM `{tbl}`"))
             console.print(f"✅ Cleared '{tbl}'")
+    get_known_entities().clear()
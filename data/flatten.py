@@ -0,0 +1,121 @@
+# flatten.py（比赛列表 -> game / participants 两张 DataFrame：单次遍历、列预分配）
+from operator import itemgetter
+import numpy as np
+import pandas as pd
+
+
+def _set(columns: dict, key, size: int, index: int, value):
+    col = columns.get(key)
+    if col is None:
+        # 新出现的列按总行数一次性预分配，缺失值保持 None（DataFrame 中为 NaN）
+        col = columns[key] = [None] * size
+    col[index] = value
+
+def _set_scalars(columns: dict, obj: dict, size: int, index: int, prefix=''):
+    # 与 json_normalize 一致：嵌套 dict 展开为 a.b 列，list 列直接丢弃
+    for key, value in obj.items():
+        if isinstance(value, dict):
+            _set_scalars(columns, value, size, index, f'{prefix}{key}.')
+        elif not isinstance(value, list):
+            _set(columns, prefix + key, size, index, value)
+
+def _sample_stats(games) -> dict:
+    for game in games:
+        for p in game.get('participants', ()):
+            if p.get('stats'):
+                return p['stats']
+    return {}
+
+def flatten_games(games, queue_map=None, champ_map=None):
+    """返回 (df_game, df_part)。
+
+    df_game 为每场比赛的标量字段加 matchType；df_part 每个 participantIdentity 一行，
+    包含 gameId / summonerName / championId / championName 与该选手的全部 stats。
+    stats 的整数/布尔字段写入预分配的 int64 矩阵：键顺序与样本一致时整行一次赋值，
+    否则逐键写入并记录缺失位置。
+    """
+    queue_map = queue_map or {}
+    champ_map = champ_map or {}
+    n_games = len(games)
+    n_parts = sum(len(g.get('participantIdentities', ())) for g in games)
+
+    sample = _sample_stats(games)
+    schema = tuple(sample)
+    num_keys = tuple(k for k, v in sample.items() if isinstance(v, (bool, int)))
+    num_index = {k: j for j, k in enumerate(num_keys)}
+    bool_keys = {k for k, v in sample.items() if isinstance(v, bool)}
+    other_keys = tuple(k for k in schema if k not in num_index)
+    getter = itemgetter(*num_keys) if len(num_keys) > 1 else None
+
+    matrix = np.zeros((n_parts, len(num_keys)), dtype=np.int64)
+    missing = None
+    game_cols = {}
+    other_cols = {}
+    game_ids = np.zeros(n_parts, dtype=np.int64)
+    names = [None] * n_parts
+    champ_ids = [None] * n_parts
+
+    row = 0
+    for gi, game in enumerate(games):
+        _set_scalars(game_cols, game, n_games, gi)
+
+        game_id = game['gameId']
+        by_pid = {p['participantId']: p for p in game.get('participants', ())}
+        for ident in game.get('participantIdentities', ()):
+            p = by_pid.get(ident['participantId'], {})
+            stats = p.get('stats', {})
+            game_ids[row] = game_id
+            names[row] = ident['player'].get('gameName')
+            champ_ids[row] = p.get('championId')
+
+            fast = getter is not None and tuple(stats) == schema
+            if fast:
+                try:
+                    matrix[row] = getter(stats)
+                except (TypeError, ValueError):
+                    fast = False
+            if fast:
+                for key in other_keys:
+                    _set(other_cols, key, n_parts, row, stats[key])
+            else:
+                if missing is None:
+                    missing = np.zeros(matrix.shape, dtype=bool)
+                missing[row] = True
+                for key, value in stats.items():
+                    j = num_index.get(key)
+                    if j is not None and isinstance(value, (bool, int)):
+                        matrix[row, j] = value
+                        missing[row, j] = False
+                    else:
+                        _set(other_cols, key, n_parts, row, value)
+            row += 1
+
+    part_data = {
+        'gameId': game_ids,
+        'summonerName': names,
+        'championId': champ_ids,
+        'championName': [champ_map.get(c) for c in champ_ids],
+    }
+    for key in schema:
+        j = num_index.get(key)
+        if j is None:
+            continue
+        col = matrix[:, j]
+        col_missing = missing[:, j] if missing is not None else None
+        if col_missing is not None and col_missing.any():
+            col = col.astype(float)
+            col[col_missing] = np.nan
+            if key in other_cols:
+                # 同一键在部分行里是非整数值，整列退化为 object
+                values = other_cols.pop(key)
+                col = [v if v is not None else (c if not m else None)
+                       for v, c, m in zip(values, matrix[:, j].tolist(), col_missing)]
+        elif key in bool_keys:
+            col = col.astype(bool)
+        part_data[key] = col
+    part_data.update(other_cols)
+
+    df_game = pd.DataFrame(game_cols)
+    if 'queueId' in df_game:
+        df_game['matchType'] = df_game['queueId'].map(queue_map).fillna('Unknown')
+    return df_game, pd.DataFrame(part_data)
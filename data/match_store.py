@@ -0,0 +1,317 @@
+# match_store.py（紧凑列式比赛存储：参与者数值统计为定宽 NumPy 数组，lane / role / 名称等字符串字典编码）
+from datetime import timezone
+import numpy as np
+from web.match_storage import parse_game_creation
+
+# (列名, LCU stats 字段, dtype)；列名与 participants 表一致，可直接从数据库加载
+STAT_FIELDS = (
+    ("kills", "kills", np.int16),
+    ("deaths", "deaths", np.int16),
+    ("assists", "assists", np.int16),
+    ("champ_level", "champLevel", np.int8),
+    ("dmg_total", "totalDamageDealtToChampions", np.int32),
+    ("taken_total", "totalDamageTaken", np.int32),
+    ("heal_total", "totalHeal", np.int32),
+    ("cc_time_sec", "timeCCingOthers", np.int16),
+    ("vision_score", "visionScore", np.int16),
+    ("wards_placed", "wardsPlaced", np.int16),
+    ("wards_killed", "wardsKilled", np.int16),
+    ("gold_earned", "goldEarned", np.int32),
+    ("minions_killed", "totalMinionsKilled", np.int16),
+    ("jungle_cs", "neutralMinionsKilled", np.int16),
+)
+STAT_COLUMNS = tuple(name for name, _key, _dtype in STAT_FIELDS)
+
+# 参与者的固定列（stats 之外）
+PARTICIPANT_DTYPES = {
+    "game_index": np.int32,     # 指向 games 数组的下标
+    "participant_id": np.int8,
+    "team_id": np.int16,
+    "champion_id": np.int16,
+    "win": np.bool_,
+}
+STRING_COLUMNS = ("puuid", "summoner_name", "lane", "role")
+GAME_DTYPES = {
+    "game_id": np.int64,
+    "game_creation": np.int64,  # 毫秒时间戳
+    "duration_sec": np.int32,
+    "queue_id": np.int32,
+}
+
+LOAD_CHUNK_SIZE = 10_000
+
+_DB_SQL = f"""
+    SELECT m.game_id, m.game_creation, m.duration_sec, m.queue_id,
+           p.participant_id, p.team_id, p.champion_id, p.win,
+           p.puuid, pl.summoner_name, p.lane, p.role,
+           {", ".join("p." + c for c in STAT_COLUMNS)}
+    FROM participants p
+    JOIN matches m ON m.game_id = p.game_id
+    LEFT JOIN players pl ON pl.puuid = p.puuid
+    {{where}}
+    ORDER BY p.game_id, p.participant_id
+"""
+
+
+class StringDictionary:
+    """字符串字典编码：每个不同的值只保存一次，列中存 int32 编码。"""
+
+    def __init__(self, values=None):
+        self.values = []
+        self._codes = {}
+        for value in values or ():
+            self.code(value)
+
+    def code(self, value) -> int:
+        value = value or ""
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value):
+        """返回编码，不存在时为 -1（用于过滤，不会扩充字典）。"""
+        return self._codes.get(value or "", -1)
+
+    def decode(self, codes) -> list:
+        values = self.values
+        return [values[c] for c in np.asarray(codes).tolist()]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class MatchStore:
+    """games 为每场一行的定宽数组，participants 为每个参与者一行；字符串列存编码，字典在子集间共享。
+
+    用法：
+        store = MatchStore.from_games(games)            # 直接来自拉取的 match detail
+        store = MatchStore.from_db(conn, puuid=puuid)   # 来自 matches / participants 表
+        ranked = store.filter_queue(420)
+        ranked.group_by_champion(puuid=puuid)
+    """
+
+    def __init__(self, games: dict, participants: dict, dictionaries: dict):
+        self.games = games
+        self.participants = participants
+        self.dictionaries = dictionaries
+
+    # ----------------- 构建 -----------------
+
+    @classmethod
+    def _allocate(cls, n_games: int, n_parts: int):
+        games = {name: np.zeros(n_games, dtype=dtype) for name, dtype in GAME_DTYPES.items()}
+        participants = {name: np.zeros(n_parts, dtype=dtype) for name, dtype in PARTICIPANT_DTYPES.items()}
+        for name, _key, dtype in STAT_FIELDS:
+            participants[name] = np.zeros(n_parts, dtype=dtype)
+        for name in STRING_COLUMNS:
+            participants[name] = np.zeros(n_parts, dtype=np.int32)
+        return games, participants
+
+    @classmethod
+    def from_games(cls, games):
+        """从 /lol-match-history/v1/games/{id} 的 JSON 列表构建，不经过 DataFrame。"""
+        games = list(games)
+        n_parts = sum(len(g.get("participants", ())) for g in games)
+        game_cols, part_cols = cls._allocate(len(games), n_parts)
+        dictionaries = {name: StringDictionary() for name in STRING_COLUMNS}
+        stat_cols = [(part_cols[name], key) for name, key, _dtype in STAT_FIELDS]
+        puuids, names, lanes, roles = (part_cols[c] for c in STRING_COLUMNS)
+        puuid_dict, name_dict, lane_dict, role_dict = (dictionaries[c] for c in STRING_COLUMNS)
+
+        row = 0
+        for gi, game in enumerate(games):
+            game_cols["game_id"][gi] = game["gameId"]
+            # 与入库时相同的解析方式，保证 from_games 与 from_db 结果一致
+            game_cols["game_creation"][gi] = _to_millis(parse_game_creation(game))
+            game_cols["duration_sec"][gi] = game.get("gameDuration", 0)
+            game_cols["queue_id"][gi] = game.get("queueId", 0)
+
+            players = {i["participantId"]: i.get("player", {}) for i in game.get("participantIdentities", ())}
+            for p in game.get("participants", ()):
+                pid = p.get("participantId", 0)
+                stats = p.get("stats", {})
+                timeline = p.get("timeline", {})
+                player = players.get(pid, {})
+
+                part_cols["game_index"][row] = gi
+                part_cols["participant_id"][row] = pid
+                part_cols["team_id"][row] = p.get("teamId", 0)
+                part_cols["champion_id"][row] = p.get("championId") or 0
+                part_cols["win"][row] = bool(stats.get("win", False))
+                for col, key in stat_cols:
+                    col[row] = stats.get(key, 0)
+                puuids[row] = puuid_dict.code(player.get("puuid"))
+                names[row] = name_dict.code(player.get("gameName") or player.get("summonerName"))
+                lanes[row] = lane_dict.code(timeline.get("lane"))
+                roles[row] = role_dict.code(timeline.get("role"))
+                row += 1
+
+        return cls(game_cols, part_cols, dictionaries)
+
+    @classmethod
+    def from_db(cls, conn, puuid=None, queue_ids=None, chunk_size=LOAD_CHUNK_SIZE):
+        """从 matches / participants / players 表加载；puuid 给定时只取该玩家参与的比赛（含其余 9 人）。"""
+        clauses, params = [], []
+        if puuid is not None:
+            clauses.append("p.game_id IN (SELECT game_id FROM participants WHERE puuid = %s)")
+            params.append(puuid)
+        if queue_ids is not None:
+            queue_ids = list(queue_ids)
+            clauses.append(f"m.queue_id IN ({', '.join(['%s'] * len(queue_ids))})")
+            params.extend(queue_ids)
+        sql = _DB_SQL.format(where=("WHERE " + " AND ".join(clauses)) if clauses else "")
+
+        dictionaries = {name: StringDictionary() for name in STRING_COLUMNS}
+        game_chunks, part_chunks = [], []
+        game_offset, last_game_id = 0, None
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                game_cols, part_cols, last_game_id = cls._load_chunk(rows, dictionaries, game_offset, last_game_id)
+                game_chunks.append(game_cols)
+                part_chunks.append(part_cols)
+                game_offset += len(game_cols["game_id"])
+
+        game_cols, part_cols = cls._allocate(0, 0)
+        if game_chunks:
+            game_cols = {k: np.concatenate([c[k] for c in game_chunks]) for k in game_cols}
+            part_cols = {k: np.concatenate([c[k] for c in part_chunks]) for k in part_cols}
+        return cls(game_cols, part_cols, dictionaries)
+
+    @classmethod
+    def _load_chunk(cls, rows, dictionaries, game_offset, last_game_id):
+        # 结果按 game_id 排序：同一场比赛的参与者可能跨两个分块，只在 game_id 变化时新增一场
+        columns = list(zip(*rows))
+        game_ids = np.asarray(columns[0], dtype=np.int64)
+        new_game = np.empty(len(rows), dtype=bool)
+        new_game[0] = game_ids[0] != last_game_id
+        new_game[1:] = game_ids[1:] != game_ids[:-1]
+        starts = np.flatnonzero(new_game)
+
+        game_cols = {
+            "game_id": game_ids[starts],
+            "game_creation": np.asarray(
+                [_to_millis(columns[1][i]) for i in starts.tolist()], dtype=np.int64),
+            "duration_sec": np.asarray([columns[2][i] or 0 for i in starts.tolist()], dtype=np.int32),
+            "queue_id": np.asarray([columns[3][i] or 0 for i in starts.tolist()], dtype=np.int32),
+        }
+        # 属于上一分块最后一场比赛的行 game_index 为 game_offset - 1
+        part_cols = {"game_index": (np.cumsum(new_game) - 1 + game_offset).astype(np.int32)}
+        for offset, name in enumerate(("participant_id", "team_id", "champion_id", "win"), start=4):
+            part_cols[name] = np.asarray([v or 0 for v in columns[offset]], dtype=PARTICIPANT_DTYPES[name])
+        for offset, name in enumerate(STRING_COLUMNS, start=8):
+            code = dictionaries[name].code
+            part_cols[name] = np.asarray([code(v) for v in columns[offset]], dtype=np.int32)
+        for offset, (name, _key, dtype) in enumerate(STAT_FIELDS, start=8 + len(STRING_COLUMNS)):
+            part_cols[name] = np.asarray([v or 0 for v in columns[offset]], dtype=dtype)
+        return game_cols, part_cols, int(game_ids[-1])
+
+    # ----------------- 过滤 -----------------
+
+    def __len__(self):
+        return len(self.games["game_id"])
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self.games.values()) + sum(a.nbytes for a in self.participants.values())
+
+    @property
+    def game_ids(self):
+        return self.games["game_id"]
+
+    def select_games(self, game_mask):
+        """按每场比赛的布尔掩码取子集，返回新的 MatchStore（字典共享）。"""
+        game_mask = np.asarray(game_mask, dtype=bool)
+        part_mask = game_mask[self.participants["game_index"]]
+        # 旧下标 -> 新下标
+        remap = np.cumsum(game_mask, dtype=np.int32) - 1
+        participants = {name: col[part_mask] for name, col in self.participants.items()}
+        participants["game_index"] = remap[participants["game_index"]]
+        games = {name: col[game_mask] for name, col in self.games.items()}
+        return MatchStore(games, participants, self.dictionaries)
+
+    def filter_queue(self, queue_ids):
+        if isinstance(queue_ids, int):
+            queue_ids = (queue_ids,)
+        return self.select_games(np.isin(self.games["queue_id"], list(queue_ids)))
+
+    def player_mask(self, puuid: str):
+        return self.participants["puuid"] == self.dictionaries["puuid"].lookup(puuid)
+
+    def column(self, name: str):
+        """参与者列；字符串列解码为 list。"""
+        if name in self.dictionaries:
+            return self.dictionaries[name].decode(self.participants[name])
+        if name in self.games:
+            return self.games[name][self.participants["game_index"]]
+        return self.participants[name]
+
+    # ----------------- 聚合 -----------------
+
+    def group_by_champion(self, puuid=None) -> list:
+        """按英雄汇总（puuid 给定时只统计该玩家），字段与 match_aggregates.get_champion_stats 一致，按场次降序。"""
+        parts = self.participants
+        mask = self.player_mask(puuid) if puuid is not None else np.ones(len(parts["champion_id"]), dtype=bool)
+        champions, inverse = np.unique(parts["champion_id"][mask], return_inverse=True)
+        size = len(champions)
+
+        def total(values):
+            return np.bincount(inverse, weights=values[mask], minlength=size)
+
+        duration = self.games["duration_sec"][parts["game_index"]].astype(np.float64)
+        sums = {
+            "games": np.bincount(inverse, minlength=size).astype(np.float64),
+            "wins": total(parts["win"].astype(np.float64)),
+            "kills": total(parts["kills"]),
+            "deaths": total(parts["deaths"]),
+            "assists": total(parts["assists"]),
+            "cs": total(parts["minions_killed"].astype(np.int32) + parts["jungle_cs"]),
+            "duration_sec": total(duration),
+            "vision_score": total(parts["vision_score"]),
+            "gold_earned": total(parts["gold_earned"]),
+            "dmg_total": total(parts["dmg_total"]),
+        }
+        minutes = sums["duration_sec"] / 60
+        with np.errstate(divide="ignore", invalid="ignore"):
+            derived = {
+                "winrate": np.where(sums["games"] > 0, sums["wins"] / sums["games"], 0.0),
+                "kda": (sums["kills"] + sums["assists"]) / np.maximum(sums["deaths"], 1),
+                "cs_per_min": np.where(minutes > 0, sums["cs"] / minutes, 0.0),
+                "vision_per_game": np.where(sums["games"] > 0, sums["vision_score"] / sums["games"], 0.0),
+            }
+
+        order = np.argsort(-sums["games"], kind="stable")
+        return [
+            {"champion_id": int(champions[i]),
+             **{k: int(v[i]) for k, v in sums.items()},
+             **{k: float(v[i]) for k, v in derived.items()}}
+            for i in order.tolist()
+        ]
+
+    def games_frame(self):
+        """每场比赛一行的 pandas DataFrame（game_creation 为毫秒时间戳）。"""
+        import pandas as pd
+        return pd.DataFrame(self.games)
+
+    def to_frame(self):
+        """解码为 pandas DataFrame（每个参与者一行），只在需要交给 pandas 时调用。"""
+        import pandas as pd
+        data = {name: self.column(name) for name in ("game_id", "queue_id", "duration_sec")}
+        for name, col in self.participants.items():
+            if name != "game_index":
+                data[name] = self.column(name) if name in self.dictionaries else col
+        return pd.DataFrame(data)
+
+
+def _to_millis(value) -> int:
+    # 数据库中为不带时区的 UTC DATETIME，JSON 中为毫秒时间戳
+    if value is None:
+        return 0
+    if hasattr(value, "timestamp"):
+        return int(value.replace(tzinfo=timezone.utc).timestamp() * 1000)
+    return int(value)
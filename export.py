@@ -1,27 +1,260 @@
-# export_matches.py（增强兼容版）
+# export_matches.py（流式导出：服务端游标分块写出，支持 CSV / Parquet 分区 / 按已导出台账增量导出，多表并行）
 
-import pandas as pd
-from web.match_storage import connect_mysql
+import argparse
+import concurrent.futures
+import csv
 import os
+import shutil
+import uuid
+import pymysql.cursors
+from pymysql.constants import FIELD_TYPE
+from web.match_storage import connect_mysql
 
 EXPORT_DIR = "exports"
+# 已导出 game_id 的台账：每个表 + 格式一个文件，每行一个 game_id
+LEDGER_DIR = ".exported"
+DEFAULT_CHUNK_SIZE = 50_000
+# 每条查询包含的 game_id 数
+IDS_PER_QUERY = 1000
+DEFAULT_TABLES = ["matches", "participants", "teams", "players"]
 
-def export_table_to_csv(table_name: str):
-    filename = f"{table_name}_export.csv"
-    filepath = os.path.join(EXPORT_DIR, filename)
+# 带 game_id 的表可以关联 matches 取分区列，并按已导出台账增量导出；players 没有 game_id，只能全量导出。
+# 回填 / 抓取 / 离线导入会写入 game_id 更小的比赛，因此增量以台账为准而不是 MAX(game_id)
+EXPORT_QUERIES = {
+    "matches": """
+        SELECT m.*, DATE(m.game_creation) AS game_date
+        FROM matches m
+        {where}
+        ORDER BY m.game_id
+    """,
+    "teams": """
+        SELECT t.*, DATE(m.game_creation) AS game_date, m.queue_id AS queue_id
+        FROM teams t JOIN matches m ON m.game_id = t.game_id
+        {where}
+        ORDER BY t.game_id
+    """,
+    "participants": """
+        SELECT p.*, DATE(m.game_creation) AS game_date, m.queue_id AS queue_id
+        FROM participants p JOIN matches m ON m.game_id = p.game_id
+        {where}
+        ORDER BY p.game_id
+    """,
+}
+PARTITION_COLS = ["game_date", "queue_id"]
+
+
+# ----------------- 已导出台账 -----------------
+
+def _ledger_path(table_name: str, fmt: str, export_dir=EXPORT_DIR) -> str:
+    return os.path.join(export_dir, LEDGER_DIR, f"{table_name}.{fmt}.ids")
+
+def _load_exported_ids(table_name: str, fmt: str, export_dir=EXPORT_DIR):
+    """返回已导出的 game_id 集合；从未全量导出过（没有台账）时返回 None。"""
+    try:
+        with open(_ledger_path(table_name, fmt, export_dir), encoding="utf-8") as f:
+            return {int(line) for line in f if line.strip()}
+    except OSError:
+        return None
+
+def _save_exported_ids(table_name: str, fmt: str, game_ids, export_dir=EXPORT_DIR, append=False):
+    # 全量导出整体替换台账；增量导出在数据写完之后追加
+    path = _ledger_path(table_name, fmt, export_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    target = path if append else path + ".tmp"
+    with open(target, "a" if append else "w", encoding="utf-8") as f:
+        f.writelines(f"{game_id}\n" for game_id in game_ids)
+    if not append:
+        os.replace(target, path)
+
+
+# ----------------- 查询 -----------------
+
+def _all_game_ids(conn) -> list:
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT game_id FROM matches ORDER BY game_id")
+        return [row[0] for row in cursor.fetchall()]
+
+def _describe(conn, table_name: str):
+    # 空结果的查询只取列信息
+    query = EXPORT_QUERIES[table_name].format(where="WHERE 1 = 0") if table_name in EXPORT_QUERIES \
+        else f"SELECT * FROM {table_name} WHERE 1 = 0"
+    with conn.cursor() as cursor:
+        cursor.execute(query)
+        cursor.fetchall()
+        return cursor.description
+
+def _iter_chunks(cursor, chunk_size: int):
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield rows
+
+def _iter_rows(conn, table_name: str, game_ids, chunk_size: int):
+    """game_ids 为 None 时全表扫描，否则按 IDS_PER_QUERY 个 game_id 一条查询；各自按 chunk_size 分块产出。"""
+    if game_ids is None:
+        queries = [(f"SELECT * FROM {table_name}", ())]
+    else:
+        template = EXPORT_QUERIES[table_name]
+        queries = (
+            (template.format(where=f"WHERE m.game_id IN ({', '.join(['%s'] * len(batch))})"), batch)
+            for batch in (game_ids[i:i + IDS_PER_QUERY] for i in range(0, len(game_ids), IDS_PER_QUERY))
+        )
+    # SSCursor 为服务端游标，结果集按需从 MySQL 拉取
+    with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+        for query, params in queries:
+            cursor.execute(query, params)
+            yield from _iter_chunks(cursor, chunk_size)
+
+
+# ----------------- 写出 -----------------
+
+def _write_csv(chunks, columns, filepath, append):
+    count = 0
+    with open(filepath, "a" if append else "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        if not append:
+            writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+# MySQL 列类型到 Arrow 类型；TINYINT(1) 的 BOOLEAN 同样按整数导出
+_ARROW_TYPES = {
+    "int64": (FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG, FIELD_TYPE.INT24, FIELD_TYPE.LONGLONG,
+              FIELD_TYPE.YEAR),
+    "float64": (FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE, FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL),
+    "date32": (FIELD_TYPE.DATE, FIELD_TYPE.NEWDATE),
+    "timestamp": (FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP),
+}
+
+def _arrow_schema(description, sample_rows):
+    """固定整个导出的 schema，避免各分块各自推断（如某块中一整列都是 NULL）写出不一致的文件。
+
+    MySQL 按列类型映射；SQLite 的 description 没有类型，按样本中第一个非空值推断，全空的列按字符串处理。
+    """
+    import datetime
+    import pyarrow as pa
+
+    by_code = {code: name for name, codes in _ARROW_TYPES.items() for code in codes}
+    factories = {"bool": pa.bool_, "int64": pa.int64, "float64": pa.float64, "date32": pa.date32,
+                 "timestamp": lambda: pa.timestamp("us")}
+    fields = []
+    for index, column in enumerate(description):
+        name = by_code.get(column[1])
+        if name is None and column[1] is None:
+            sample = next((row[index] for row in sample_rows if row[index] is not None), None)
+            if isinstance(sample, bool):
+                name = "bool"
+            elif isinstance(sample, int):
+                name = "int64"
+            elif isinstance(sample, float):
+                name = "float64"
+            elif isinstance(sample, datetime.datetime):
+                name = "timestamp"
+            elif isinstance(sample, datetime.date):
+                name = "date32"
+        fields.append(pa.field(column[0], factories[name]() if name else pa.string()))
+    return pa.schema(fields)
+
+def _write_parquet(chunks, description, dirpath):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = [d[0] for d in description]
+    partition_cols = [c for c in PARTITION_COLS if c in columns]
+    # 每次运行的文件名不同，增量导出只新增文件，不会覆盖之前的分块
+    run_id = uuid.uuid4().hex[:12]
+    schema, count = None, 0
+    for index, rows in enumerate(chunks):
+        if schema is None:
+            schema = _arrow_schema(description, rows)
+        table = pa.Table.from_pydict({col: list(values) for col, values in zip(columns, zip(*rows))}, schema=schema)
+        # 每个分块写成各分区下的新文件，内存占用只与 chunk_size 有关
+        pq.write_to_dataset(
+            table, dirpath, partition_cols=partition_cols or None,
+            basename_template=f"part-{run_id}-{index}-{{i}}.parquet",
+        )
+        count += len(rows)
+    return count
+
+def _replace_path(tmp_path: str, path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    if os.path.exists(tmp_path):
+        os.replace(tmp_path, path)
+
+def export_table(table_name: str, fmt="csv", delta=False, chunk_size=DEFAULT_CHUNK_SIZE, export_dir=EXPORT_DIR):
+    """导出单表。delta=True 时只导出台账中没有的比赛并追加到已有输出；没有台账时退化为全量导出。
+
+    全量导出先写到临时文件 / 目录，成功后整体替换原有输出与台账。
+    """
+    os.makedirs(export_dir, exist_ok=True)
+    keyed = table_name in EXPORT_QUERIES
+    if delta and not keyed:
+        print(f"⏭️ 跳过 {table_name}：没有 game_id，无法增量导出（去掉 --delta 全量导出）")
+        return 0
+    exported = _load_exported_ids(table_name, fmt, export_dir) if delta else None
+    append = exported is not None
+
+    if fmt == "parquet":
+        target = os.path.join(export_dir, table_name)
+    else:
+        target = os.path.join(export_dir, f"{table_name}_export.csv")
+    tmp_target = target + ".partial"
 
     conn = connect_mysql()
     try:
-        if not os.path.exists(EXPORT_DIR):
-            os.makedirs(EXPORT_DIR)
-        df = pd.read_sql(f"SELECT * FROM {table_name}", conn)
-        df.to_csv(filepath, index=False, encoding="utf-8-sig")
-        print(f"✅ 导出成功：{filepath}（共 {len(df)} 条记录）")
+        game_ids = None
+        if keyed:
+            # 先取 game_id 快照，导出期间新入库的比赛留给下一次
+            game_ids = [g for g in _all_game_ids(conn) if not append or g not in exported]
+            if append and not game_ids:
+                print(f"✅ {table_name} 没有新比赛需要导出")
+                return 0
+
+        description = _describe(conn, table_name)
+        chunks = _iter_rows(conn, table_name, game_ids, chunk_size)
+        out = target if append else tmp_target
+        if os.path.isdir(tmp_target):
+            shutil.rmtree(tmp_target)
+        if fmt == "parquet":
+            count = _write_parquet(chunks, description, out)
+        else:
+            count = _write_csv(chunks, [d[0] for d in description], out, append=append and os.path.exists(out))
+
+        if not append:
+            _replace_path(tmp_target, target)
+        if keyed:
+            _save_exported_ids(table_name, fmt, game_ids, export_dir, append=append)
+        print(f"✅ 导出成功：{target}（共 {count} 条记录）")
+        return count
     except Exception as e:
         print(f"❌ 导出失败（{table_name}）：{e}")
+        return 0
     finally:
         conn.close()
 
+def export_table_to_csv(table_name: str):
+    return export_table(table_name, fmt="csv")
+
+def export_tables(tables=None, fmt="csv", delta=False, chunk_size=DEFAULT_CHUNK_SIZE, max_workers=4):
+    tables = tables or DEFAULT_TABLES
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(export_table, table, fmt, delta, chunk_size): table
+            for table in tables
+        }
+        return {futures[f]: f.result() for f in concurrent.futures.as_completed(futures)}
+
 if __name__ == "__main__":
-    for table in ["matches", "participants", "teams", "players"]:
-        export_table_to_csv(table)
+    parser = argparse.ArgumentParser(description="Export match tables in bounded-memory chunks")
+    parser.add_argument("tables", nargs="*", default=DEFAULT_TABLES)
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    parser.add_argument("--delta", action="store_true", help="only games not yet in the exported-ids ledger")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    export_tables(args.tables, args.format, args.delta, args.chunk_size, args.workers)
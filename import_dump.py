@@ -0,0 +1,28 @@
+# import_dump.py（离线导入 JSON / NDJSON 比赛转储，格式与 LCU /games/{id} 返回一致，中断后重新运行即续跑）
+
+import argparse
+from web.bulk_import import import_dumps, CHECKPOINT_FILE, IMPORT_BATCH_SIZE, FILES_PER_TASK, LINES_PER_TASK
+from web.match_storage import connect_mysql, ensure_schema
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-import match JSON / NDJSON dumps into the match database")
+    parser.add_argument("paths", nargs="+", help="files or directories (*.json, *.ndjson, *.jsonl, optionally .gz)")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="games per transaction")
+    parser.add_argument("--files-per-task", type=int, default=FILES_PER_TASK)
+    parser.add_argument("--lines-per-task", type=int, default=LINES_PER_TASK)
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE, help="resume file ('' to disable)")
+    args = parser.parse_args()
+
+    try:
+        ensure_schema()
+        conn = connect_mysql()
+        try:
+            import_dumps(args.paths, conn, workers=args.workers, batch_size=args.batch_size,
+                         checkpoint_path=args.checkpoint or None, files_per_task=args.files_per_task,
+                         lines_per_task=args.lines_per_task)
+        finally:
+            conn.close()
+        print("✅ 导入完成")
+    except Exception as e:
+        print("❌ 导入失败:", e)
@@ -4,6 +4,7 @@ from PyQt5.QtWidgets import QApplication
 from ui.main_window import MainWindow
 import logging
 import config.config  
+from web.metrics import configure_from_env
 
 import logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
@@ -11,6 +12,8 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(mes
 
 
 def main():
+    # LOL_STAT_METRICS=1 时采集指标，LOL_STAT_METRICS_PORT 提供 /metrics
+    configure_from_env()
     app = QApplication(sys.argv)
     main_win = MainWindow()
     main_win.show()
@@ -0,0 +1,13 @@
+# rebuild_stats.py（全量重建 player_champion_stats / player_queue_stats 汇总表）
+from web.match_storage import connect_mysql, init_tables_if_missing
+from web.match_aggregates import rebuild_aggregates
+
+if __name__ == "__main__":
+    try:
+        conn = connect_mysql()
+        init_tables_if_missing(conn)
+        rebuild_aggregates(conn)
+        conn.close()
+        print("✅ Aggregate tables rebuilt successfully.")
+    except Exception as e:
+        print("❌ Failed to rebuild aggregate tables:", e)
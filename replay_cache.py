@@ -0,0 +1,35 @@
+# replay_cache.py（从本地 match detail 缓存重建数据库，无需启动客户端）
+
+import argparse
+from web.known_entities import get_known_entities
+from web.match_cache import CACHE_DIR, MatchCache
+from web.match_storage import connect_mysql, init_tables_if_missing, insert_matches_bulk, DEFAULT_BATCH_SIZE
+
+def replay(cache_dir=CACHE_DIR, batch_size=DEFAULT_BATCH_SIZE):
+    cache = MatchCache(cache_dir)
+    print(f"🛠️ 从 {cache_dir} 回放 {len(cache)} 场比赛...")
+
+    conn = connect_mysql()
+    try:
+        init_tables_if_missing(conn)
+        # 已入库的比赛与玩家在构建行之前跳过
+        known = get_known_entities()
+        known.warm(conn)
+        result = insert_matches_bulk(cache.iter_details(), conn, batch_size=batch_size)
+    finally:
+        conn.close()
+    stats = known.stats()
+    print(f"[INFO] 已知实体缓存命中率：比赛 {stats['game']['hit_rate']:.1%}，玩家 {stats['puuid']['hit_rate']:.1%}")
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the match database from the local raw-JSON cache")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    try:
+        replay(args.cache_dir, args.batch_size)
+        print("✅ 回放完成")
+    except Exception as e:
+        print("❌ 回放失败:", e)
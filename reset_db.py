@@ -1,11 +1,6 @@
 # reset_db.py
 import pymysql
-
-DB_NAME = "lol_stats"
-DB_USER = "lol_user"
-DB_PASS = "lol_pass"
-DB_HOST = "localhost"
-DB_PORT = 3306
+from config.config import DB_NAME, DB_USER, DB_PASS, DB_HOST, DB_PORT
 
 if __name__ == "__main__":
     try:
@@ -1,13 +1,15 @@
 import asyncio
 from lcu_driver import Connector
-from web.lcu_client import fetch_and_store_history
+from web.ingest_pipeline import IngestPipeline, format_stats
 
 connector = Connector()
 
 @connector.ready
 async def on_ready(connection):
     print("[LCU] Connected to client. Starting match fetch and store test...")
-    await fetch_and_store_history(connection, page_index=0, page_size=5)
+    pipeline = IngestPipeline(connection, pages=1, page_size=5, fetch_workers=4, batch_size=5)
+    stats = await pipeline.run()
+    print(format_stats(stats))
     print("[✅] All match records processed.")
     await connector.stop()
 
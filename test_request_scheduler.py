@@ -0,0 +1,72 @@
+# test_request_scheduler.py（请求调度器：取消进行中的请求后许可必须归还，之后的请求不能卡住）
+#   python -m pytest -q test_request_scheduler.py
+import asyncio
+from web.request_scheduler import RequestScheduler
+
+
+class _Response:
+    status = 200
+
+    def __init__(self, hang_read):
+        self.hang_read = hang_read
+        self.closed = False
+
+    async def read(self):
+        if self.hang_read:
+            await asyncio.Event().wait()
+        return b"{}"
+
+    def close(self):
+        self.closed = True
+
+
+class _Connection:
+    """hang="request" 卡在 conn.request，hang="read" 卡在 resp.read()，None 立即返回。"""
+
+    def __init__(self, hang=None):
+        self.hang = hang
+        self.responses = []
+
+    async def request(self, method, endpoint, **kwargs):
+        if self.hang == "request":
+            await asyncio.Event().wait()
+        resp = _Response(self.hang == "read")
+        self.responses.append(resp)
+        return resp
+
+
+async def _cancel_in_flight(hang):
+    scheduler = RequestScheduler(initial=4, max_concurrency=4)
+    conn = _Connection(hang)
+    tasks = [asyncio.create_task(scheduler.fetch(conn, "GET", f"/x/{i}", "test")) for i in range(6)]
+    await asyncio.sleep(0.05)
+    assert scheduler.in_flight == 4
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    assert scheduler.in_flight == 0
+    assert all(resp.closed for resp in conn.responses)
+
+    status, body = await asyncio.wait_for(scheduler.fetch(_Connection(), "GET", "/after", "test"), 1)
+    assert (status, body) == (200, b"{}")
+    assert scheduler.in_flight == 0
+
+def test_cancel_during_request_releases_permits():
+    asyncio.run(_cancel_in_flight("request"))
+
+def test_cancel_during_read_releases_permits_and_closes_response():
+    asyncio.run(_cancel_in_flight("read"))
+
+def test_non_transient_error_releases_permit():
+    async def run():
+        class _Broken:
+            async def request(self, method, endpoint, **kwargs):
+                raise ValueError("boom")
+        scheduler = RequestScheduler(initial=1, max_concurrency=1)
+        for _ in range(3):
+            try:
+                await asyncio.wait_for(scheduler.fetch(_Broken(), "GET", "/x", "test"), 1)
+            except ValueError:
+                pass
+        assert scheduler.in_flight == 0
+    asyncio.run(run())
@@ -0,0 +1,108 @@
+# jobs.py（后台入库任务：在工作线程中运行 IngestPipeline，进度与吞吐通过信号推送给界面）
+
+import logging
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+from web.ingest_pipeline import IngestPipeline, empty_snapshot, format_stats
+from web.lcu_session import get_session
+from web.match_storage import ensure_schema
+
+# 界面任务按页提交批次，进度条每写完约一页就刷新一次
+UI_PAGE_SIZE = 30
+UI_PAGES = 10
+# 等待客户端连接：每隔 CONNECT_POLL_INTERVAL 秒检查一次是否已取消，超过 CONNECT_TIMEOUT 秒放弃
+CONNECT_POLL_INTERVAL = 0.5
+CONNECT_TIMEOUT = 60
+
+
+class IngestJob(QThread):
+    """在 QThread 中把 IngestPipeline 提交到 LCU 会话线程并等待结果，GUI 线程只接收信号。
+
+    progress(dict)：{"pages_done", "pages_total", "stages": pipeline.snapshot()}
+    completed(dict)：结束时的 snapshot；cancelled 属性区分正常结束与取消
+    failed(str)：连接失败等异常
+    """
+
+    progress = pyqtSignal(dict)
+    completed = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+    def __init__(self, pages=UI_PAGES, page_size=UI_PAGE_SIZE, start_page=0, incremental=True,
+                 skip_known=False, parent=None):
+        super().__init__(parent)
+        self.pages = pages
+        self.page_size = page_size
+        self.start_page = start_page
+        self.incremental = incremental
+        self.skip_known = skip_known
+        self.pages_done = start_page
+        self.cancelled = False
+        self._pipeline = None
+
+    def run(self):
+        try:
+            # 启动时的结构检查在后台进行，首次入库前需确保已完成
+            ensure_schema()
+            if not self._wait_connected():
+                # 连接之前就被取消，流水线没有启动
+                self.completed.emit(empty_snapshot())
+                return
+            stats = get_session().call(self._run_pipeline, connect_timeout=CONNECT_TIMEOUT)
+        except Exception as e:
+            logging.error(f"入库任务失败: {e}")
+            self.failed.emit(str(e))
+            return
+        logging.info("入库任务结束\n" + format_stats(stats))
+        self.completed.emit(stats)
+
+    def _wait_connected(self) -> bool:
+        """分段等待客户端连接，期间可被 cancel() 打断；返回 False 表示已取消，超时抛出 TimeoutError。"""
+        session = get_session()
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+        while not self.cancelled:
+            if session.wait_connected(CONNECT_POLL_INTERVAL):
+                return True
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"{CONNECT_TIMEOUT} 秒内未检测到 LCU 客户端")
+        return False
+
+    def cancel(self):
+        """可在 GUI 线程调用：立即取消流水线，已写入的批次保留。"""
+        self.cancelled = True
+        if self._pipeline is not None:
+            self._pipeline.cancel()
+
+    def resume_kwargs(self) -> dict:
+        """续跑参数：重新翻同一范围的页，跳过已入库的比赛，不因遇到旧数据而停止。"""
+        # 取消时已翻过的若干页可能仍停留在队列中未写入，无法按页号断点；
+        # 已入库的比赛在翻页阶段即被过滤，重翻只多出历史列表请求，不会重复拉取 detail
+        return {
+            "pages": self.pages,
+            "page_size": self.page_size,
+            "start_page": self.start_page,
+            "incremental": False,
+            "skip_known": True,
+        }
+
+    async def _run_pipeline(self, connection):
+        self._pipeline = IngestPipeline(
+            connection, pages=self.pages, page_size=self.page_size, start_page=self.start_page,
+            incremental=self.incremental, skip_known=self.skip_known,
+            batch_size=self.page_size, progress_callback=self._emit_progress,
+        )
+        if self.cancelled:
+            # cancel() 在流水线创建之前到达
+            self._pipeline.stop()
+        try:
+            return await self._pipeline.run()
+        finally:
+            self.pages_done = max(self.pages_done, self._pipeline.pages_done)
+
+    def _emit_progress(self, snapshot: dict):
+        # 在会话线程中回调；跨线程信号由 Qt 排队投递到 GUI 线程
+        self.pages_done = max(self.pages_done, self._pipeline.pages_done)
+        self.progress.emit({
+            "pages_done": self.pages_done,
+            "pages_total": self.start_page + self.pages,
+            "stages": snapshot,
+        })
@@ -1,33 +1,42 @@
+import threading
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QMainWindow, QTabWidget
 from ui.tabs import APITab
-from web.match_storage import connect_mysql, init_tables_if_missing
-from web.websocket_client_api import call_match_history_and_store
+
+def _ingest_job(**kwargs):
+    # 入库相关模块（lcu_driver / aiohttp / 数据库驱动）在第一次点击时才导入
+    from ui.jobs import IngestJob
+    return IngestJob(**kwargs)
 
 class MainWindow(QMainWindow):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("My Desktop App")
 
-        # 初始化数据库（只执行一次）
-        self._init_database()
-
         self.tab_widget = QTabWidget()
         self.setCentralWidget(self.tab_widget)
 
         self.tab_api1 = APITab("api1")
         self.tab_api2 = APITab("api2")
-        self.tab_api3 = APITab("api3", callback=call_match_history_and_store)  # 注入数据库回调
+        self.tab_api3 = APITab("api3", job_factory=_ingest_job)  # 后台增量入库任务，界面不阻塞
 
         self.tab_widget.addTab(self.tab_api1, "API 1")
         self.tab_widget.addTab(self.tab_api2, "API 2")
         self.tab_widget.addTab(self.tab_api3, "API 3")
 
+        # 数据库检查放到窗口显示之后的后台线程，不再阻塞首帧
+        QTimer.singleShot(0, self._start_database_init)
+
+    def _start_database_init(self):
+        threading.Thread(target=self._init_database, name="db-init", daemon=True).start()
+
     def _init_database(self):
         try:
-            print("🛠️ 正在连接数据库...")
-            conn = connect_mysql()
-            init_tables_if_missing(conn)
-            conn.close()
-            print("✅ 数据库连接与表结构初始化成功！")
+            from web.match_storage import ensure_schema
+            print("🛠️ 正在检查数据库结构...")
+            if ensure_schema():
+                print("✅ 数据库连接与表结构初始化成功！")
+            else:
+                print("✅ 数据库结构已是最新版本")
         except Exception as e:
             print(f"❌ 数据库初始化失败: {e}")
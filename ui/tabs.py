@@ -1,10 +1,14 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QLabel
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QProgressBar
 
 class APITab(QWidget):
-    def __init__(self, api_name, callback=None):
+    def __init__(self, api_name, callback=None, job_factory=None):
         super().__init__()
         self.api_name = api_name
         self.callback = callback
+        # job_factory(**kwargs) 返回 ui.jobs.IngestJob；提供时按钮启动后台任务而不是同步回调
+        self.job_factory = job_factory
+        self.job = None
+        self._resume_kwargs = None
         self._setup_ui()
 
     def _setup_ui(self):
@@ -12,9 +16,89 @@ class APITab(QWidget):
         self.label = QLabel(f"This is the {self.api_name} tab")
         layout.addWidget(self.label)
 
-        if self.callback:
+        if self.job_factory:
+            self._setup_job_ui(layout)
+        elif self.callback:
             self.button = QPushButton(f"Run {self.api_name}")
             self.button.clicked.connect(self.callback)
             layout.addWidget(self.button)
 
         self.setLayout(layout)
+
+    def _setup_job_ui(self, layout):
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(0)
+        self.status_label = QLabel("空闲")
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.status_label)
+
+        buttons = QHBoxLayout()
+        self.button = QPushButton(f"Run {self.api_name}")
+        self.cancel_button = QPushButton("Cancel")
+        self.resume_button = QPushButton("Resume")
+        self.button.clicked.connect(self._start_job)
+        self.cancel_button.clicked.connect(self._cancel_job)
+        self.resume_button.clicked.connect(self._resume_job)
+        for button in (self.button, self.cancel_button, self.resume_button):
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+        self._set_running(False)
+
+    # ----------------- 后台任务 -----------------
+
+    def _start_job(self):
+        self._launch({})
+
+    def _resume_job(self):
+        if self._resume_kwargs is not None:
+            self._launch(self._resume_kwargs)
+
+    def _cancel_job(self):
+        if self.job is not None and self.job.isRunning():
+            self.status_label.setText("正在取消...")
+            self.cancel_button.setEnabled(False)
+            self.job.cancel()
+
+    def _launch(self, kwargs):
+        if self.job is not None and self.job.isRunning():
+            return
+        self.job = self.job_factory(**kwargs)
+        self.job.progress.connect(self._on_progress)
+        self.job.completed.connect(self._on_completed)
+        self.job.failed.connect(self._on_failed)
+        self.progress_bar.setRange(0, self.job.start_page + self.job.pages)
+        self.progress_bar.setValue(self.job.start_page)
+        self.status_label.setText("正在连接客户端...")
+        self._set_running(True)
+        self.job.start()
+
+    def _on_progress(self, progress):
+        write = progress["stages"]["write"]
+        self.progress_bar.setValue(min(progress["pages_done"], progress["pages_total"]))
+        self.status_label.setText(
+            f"第 {progress['pages_done']} 页 · 已写入 {write['items']} 场 · {write['rate']:.1f} 场/秒"
+        )
+
+    def _on_completed(self, stats):
+        write = stats["write"]
+        if self.job.cancelled:
+            self._resume_kwargs = self.job.resume_kwargs()
+            self.status_label.setText(f"已取消：已写入 {write['items']} 场，翻页至第 {self.job.pages_done} 页，可续跑")
+        else:
+            self._resume_kwargs = None
+            self.progress_bar.setValue(self.progress_bar.maximum())
+            self.status_label.setText(
+                f"✅ 完成：写入 {write['items']} 场（{write['rate']:.1f} 场/秒，失败 {write['errors']}）"
+            )
+        self._set_running(False)
+
+    def _on_failed(self, message):
+        self._resume_kwargs = self.job.resume_kwargs()
+        self.status_label.setText(f"❌ 失败：{message}")
+        self._set_running(False)
+
+    def _set_running(self, running):
+        self.button.setEnabled(not running)
+        self.cancel_button.setEnabled(running)
+        self.resume_button.setEnabled(not running and self._resume_kwargs is not None)
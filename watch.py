@@ -0,0 +1,28 @@
+# watch.py（常驻监听：订阅客户端事件，每局结束后自动入库，Ctrl+C 退出）
+
+import threading
+from web.lcu_session import LCUSession, set_session
+from web.live_watcher import LiveWatcher
+from web.match_storage import ensure_schema
+
+def watch(session=None, with_timelines=True):
+    ensure_schema()
+    watcher = LiveWatcher(
+        with_timelines=with_timelines,
+        on_ingested=lambda game_id, detail: print(f"✅ 对局 {game_id} 已入库（{detail.get('gameMode', '')}）"),
+    )
+    # 先订阅再启动会话，连接建立时即开启 websocket
+    session = session or LCUSession()
+    watcher.attach(session)
+    set_session(session)
+    session.start()
+    session.wait_connected()
+    print("👀 正在监听对局事件:", session.call(watcher.prime)["phase"])
+    return watcher
+
+if __name__ == "__main__":
+    try:
+        watch()
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("👋 已停止监听")
@@ -1 +1,8 @@
-from .websocket_client_api import call_api, call_summoner, call_match_history
+# 包级别的快捷入口按需导入：import web.match_storage 等子模块时不连带加载 PyQt / lcu_driver / aiohttp
+_LAZY_EXPORTS = {"call_api", "call_summoner", "call_match_history"}
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        from web import websocket_client_api
+        return getattr(websocket_client_api, name)
+    raise AttributeError(f"module 'web' has no attribute {name!r}")
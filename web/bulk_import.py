@@ -0,0 +1,242 @@
+# bulk_import.py（离线批量导入：JSON / NDJSON 比赛转储在进程池中解析展平，单个写库线程按批提交，可断点续跑）
+
+import gzip
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from web.known_entities import get_known_entities
+from web.match_storage import build_match_rows, merge_rows, write_rows_batch, TABLE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# 每个解析任务包含的 JSON 文件数 / NDJSON 行数
+FILES_PER_TASK = 64
+LINES_PER_TASK = 500
+# 每个事务写入的比赛数
+IMPORT_BATCH_SIZE = 1000
+# 同时提交给进程池的任务数 = workers * TASKS_PER_WORKER，写库跟不上时解析端在此处等待
+TASKS_PER_WORKER = 2
+REPORT_INTERVAL = 5.0
+CHECKPOINT_FILE = os.path.join("cache", "import_checkpoint.ndjson")
+
+JSON_SUFFIXES = (".json", ".json.gz")
+NDJSON_SUFFIXES = (".ndjson", ".ndjson.gz", ".jsonl", ".jsonl.gz")
+
+
+def _open(path):
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+def iter_input_files(paths):
+    """展开目录（递归、按路径排序），只保留支持的后缀。"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith(JSON_SUFFIXES + NDJSON_SUFFIXES):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+# ----------------- 断点 -----------------
+
+class Checkpoint:
+    """逐行追加已提交的任务键（文件路径或 "路径#起始行+行数"），中断后跳过这些任务。"""
+
+    def __init__(self, path=CHECKPOINT_FILE):
+        self.path = path
+        self.done = set()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self.done.update(json.loads(line)["keys"])
+                    except (ValueError, KeyError):
+                        # 进程中断可能留下半行，忽略即可
+                        continue
+
+    def __contains__(self, key) -> bool:
+        return key in self.done
+
+    def commit(self, keys):
+        if not keys:
+            return
+        self.done.update(keys)
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"keys": keys, "at": int(time.time())}) + "\n")
+
+
+# ----------------- 任务切分（主进程） -----------------
+
+def iter_tasks(files, checkpoint, files_per_task=FILES_PER_TASK, lines_per_task=LINES_PER_TASK):
+    """JSON 文件按 files_per_task 个一组交给子进程读取；NDJSON 在主进程流式读出行，每 lines_per_task 行一个任务。
+
+    yield (keys, kind, payload)；已在断点中的任务直接跳过。
+    """
+    batch = []
+    for path in files:
+        if path.endswith(NDJSON_SUFFIXES):
+            yield from _ndjson_tasks(path, checkpoint, lines_per_task)
+            continue
+        if path in checkpoint:
+            continue
+        batch.append(path)
+        if len(batch) >= files_per_task:
+            yield batch, "files", batch
+            batch = []
+    if batch:
+        yield batch, "files", batch
+
+def _ndjson_tasks(path, checkpoint, lines_per_task):
+    with _open(path) as f:
+        start, lines = 0, []
+        for line in f:
+            lines.append(line)
+            if len(lines) >= lines_per_task:
+                key = f"{path}#{start}+{len(lines)}"
+                if key not in checkpoint:
+                    yield [key], "lines", b"".join(lines)
+                start, lines = start + len(lines), []
+        if lines:
+            key = f"{path}#{start}+{len(lines)}"
+            if key not in checkpoint:
+                yield [key], "lines", b"".join(lines)
+
+
+# ----------------- 解析展平（子进程） -----------------
+
+def _init_worker(known_game_ids):
+    # 子进程中的已知实体缓存只预热已入库的比赛，已存在的比赛不生成任何行
+    get_known_entities().add(game_ids=known_game_ids)
+
+def _iter_documents(kind, payload):
+    # 损坏的行 / 文件以异常对象的形式产出，只跳过这一行或这一个文件
+    if kind == "lines":
+        for line in payload.splitlines():
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    yield e
+        return
+    for path in payload:
+        try:
+            with _open(path) as f:
+                doc = json.load(f)
+        except (ValueError, OSError) as e:
+            yield e
+            continue
+        # 单个文件可以是一场比赛，也可以是比赛列表
+        yield from (doc if isinstance(doc, list) else [doc])
+
+def parse_task(kind, payload):
+    """返回 (合并后的行, 比赛数, 错误列表)。单场解析失败只记错误，不影响同一任务中的其它比赛。"""
+    rows = {table: [] for table in TABLE_COLUMNS}
+    games, errors = 0, []
+    for detail in _iter_documents(kind, payload):
+        if isinstance(detail, Exception):
+            errors.append(str(detail))
+            continue
+        if not isinstance(detail, dict) or "gameId" not in detail or not detail.get("participants"):
+            errors.append(f"not a match detail: {str(detail)[:80]}")
+            continue
+        try:
+            merge_rows(rows, build_match_rows(detail, is_fallback=detail.get("__fallback", False)))
+            games += 1
+        except Exception as e:
+            errors.append(f"game {detail.get('gameId')}: {e}")
+    return rows, games, errors
+
+
+# ----------------- 导入 -----------------
+
+def _dedupe_players(rows: dict, known) -> dict:
+    # 各子进程不知道其它进程与之前批次写过的玩家，写库前统一去重
+    players = {}
+    for row in rows.get("players", ()):
+        if row[0] not in players and not known.has_puuid(row[0]):
+            players[row[0]] = row
+    rows["players"] = list(players.values())
+    return rows
+
+def import_dumps(paths, conn, workers=None, batch_size=IMPORT_BATCH_SIZE, checkpoint_path=CHECKPOINT_FILE,
+                 files_per_task=FILES_PER_TASK, lines_per_task=LINES_PER_TASK, verbose=True) -> dict:
+    """把 paths（文件或目录）中的比赛导入 conn 对应的数据库，返回统计。
+
+    解析与行构建在 workers 个子进程中进行，写库只在当前线程：每凑满 batch_size 场比赛一个事务，
+    提交后把对应任务写入断点文件；中断后以相同参数重新运行即从断点继续。
+    """
+    workers = workers or os.cpu_count() or 1
+    checkpoint = Checkpoint(checkpoint_path)
+    known = get_known_entities()
+    known.warm(conn)
+
+    files = list(iter_input_files(paths))
+    tasks = iter_tasks(files, checkpoint, files_per_task, lines_per_task)
+    stats = {"files": len(files), "tasks": 0, "games": 0, "rows": 0, "errors": 0}
+    pending, pending_games, pending_keys = {}, 0, []
+    started = last_report = time.perf_counter()
+
+    def flush():
+        nonlocal pending, pending_games, pending_keys
+        if pending_games:
+            stats["rows"] += write_rows_batch(conn, _dedupe_players(pending, known))
+            stats["games"] += pending_games
+        checkpoint.commit(pending_keys)
+        pending, pending_games, pending_keys = {}, 0, []
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(known.game_ids(),)) as pool:
+        in_flight = {}
+        exhausted = False
+        while in_flight or not exhausted:
+            # 保持固定数量的任务在进程池中，主进程只在写库与读取 NDJSON 之间切换
+            while not exhausted and len(in_flight) < workers * TASKS_PER_WORKER:
+                task = next(tasks, None)
+                if task is None:
+                    exhausted = True
+                    break
+                keys, kind, payload = task
+                in_flight[pool.submit(parse_task, kind, payload)] = keys
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                keys = in_flight.pop(future)
+                rows, games, errors = future.result()
+                stats["tasks"] += 1
+                stats["errors"] += len(errors)
+                for error in errors[:3]:
+                    logger.warning("%s: %s", keys[0], error)
+                merge_rows(pending, rows)
+                pending_games += games
+                pending_keys.extend(keys)
+
+            if pending_games >= batch_size:
+                flush()
+            if verbose and time.perf_counter() - last_report >= REPORT_INTERVAL:
+                last_report = time.perf_counter()
+                print(_format_progress(stats, last_report - started))
+        flush()
+
+    elapsed = time.perf_counter() - started
+    stats.update({
+        "seconds": elapsed,
+        "files_per_sec": len(files) / elapsed if elapsed > 0 else 0.0,
+        "games_per_sec": stats["games"] / elapsed if elapsed > 0 else 0.0,
+        "rows_per_sec": stats["rows"] / elapsed if elapsed > 0 else 0.0,
+    })
+    if verbose:
+        print(f"[INFO] 导入 {stats['files']} 个文件，{stats['games']} 场比赛，{stats['rows']} 行，"
+              f"{stats['errors']} 个错误，耗时 {elapsed:.2f}s "
+              f"（{stats['files_per_sec']:,.1f} files/s，{stats['games_per_sec']:,.0f} games/s）")
+    return stats
+
+def _format_progress(stats: dict, elapsed: float) -> str:
+    return (f"[INFO] 已解析 {stats['tasks']} 个任务，写入 {stats['games']} 场比赛"
+            f"（{stats['games'] / elapsed if elapsed else 0:,.0f} games/s），错误 {stats['errors']}")
@@ -0,0 +1,266 @@
+# crawler.py（多玩家抓取：以 players 表中的玩家为边界，按优先级翻他们的历史并入库比赛详情）
+
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timezone
+from web.ingest_pipeline import IngestPipeline
+from web.lcu_client import request_match_history_page, get_current_summoner
+from web.utils import gather_or_cancel
+
+logger = logging.getLogger(__name__)
+
+# 每个玩家最多翻的页数与每页场数
+DEFAULT_PAGES_PER_PLAYER = 2
+DEFAULT_CRAWL_PAGE_SIZE = 20
+# 本次运行最多抓取的玩家数
+DEFAULT_MAX_PLAYERS = 100
+# 同时翻历史的玩家数；detail 请求的实际在途数由 request_scheduler 控制
+DEFAULT_PLAYER_WORKERS = 4
+DEFAULT_CRAWL_FETCH_WORKERS = 32
+# 每轮从 crawl_frontier 载入内存堆的玩家数
+FRONTIER_BATCH = 500
+
+# 优先级：与当前召唤师同场的次数（队友权重更高）× 最近一次同场的时间衰减；
+# 没有同场记录的玩家只按在库中出现的次数排在后面
+TEAMMATE_WEIGHT = 2.0
+OPPONENT_WEIGHT = 1.0
+RECENCY_HALF_LIFE_DAYS = 30.0
+APPEARANCE_WEIGHT = 0.01
+
+# 翻页失败（含调度器重试耗尽）的玩家放回 pending，累计失败这么多次后标记为 failed
+MAX_PLAYER_FAILURES = 3
+
+PENDING, ACTIVE, DONE, FAILED = "pending", "active", "done", "failed"
+
+
+# ----------------- 抓取状态（crawl_frontier 表） -----------------
+
+_CO_PLAYER_SQL = """
+    SELECT o.puuid, SUM(CASE WHEN o.team_id = me.team_id THEN 1 ELSE 0 END), COUNT(*), MAX(m.game_creation)
+    FROM participants me
+    JOIN participants o ON o.game_id = me.game_id AND o.puuid <> me.puuid
+    JOIN matches m ON m.game_id = me.game_id
+    WHERE me.puuid = %s
+    GROUP BY o.puuid
+"""
+
+def _is_real_puuid(puuid) -> bool:
+    # 人机的 puuid 为空或全 0
+    return bool(puuid) and bool(puuid.strip("0-"))
+
+def compute_priorities(conn, seed_puuid: str) -> dict:
+    """{puuid: priority}，包含库中出现过的所有真实玩家（不含 seed_puuid 本人）。"""
+    priorities = {}
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT puuid, COUNT(*) FROM participants GROUP BY puuid")
+        for puuid, appearances in cursor.fetchall():
+            priorities[puuid] = APPEARANCE_WEIGHT * appearances
+        cursor.execute(_CO_PLAYER_SQL, (seed_puuid,))
+        co_players = cursor.fetchall()
+
+    # SQLite 的聚合结果没有列类型，MAX(DATETIME) 以字符串返回
+    co_players = [
+        (puuid, int(teammate_games), games, datetime.fromisoformat(last) if isinstance(last, str) else last)
+        for puuid, teammate_games, games, last in co_players
+    ]
+    # 时间衰减以当前召唤师最近一场为基准，很久没玩时排序依然有效
+    latest = max((last for *_rest, last in co_players if last), default=None)
+    for puuid, teammate_games, games, last_played in co_players:
+        age_days = (latest - last_played).total_seconds() / 86400 if last_played else 0.0
+        weight = TEAMMATE_WEIGHT * teammate_games + OPPONENT_WEIGHT * (games - teammate_games)
+        priorities[puuid] += weight * 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+    priorities.pop(seed_puuid, None)
+    return {p: v for p, v in priorities.items() if _is_real_puuid(p)}
+
+def refresh_frontier(conn, seed_puuid: str) -> int:
+    """把新出现的玩家加入 crawl_frontier，并按最新数据更新所有玩家的优先级（不改变抓取进度）。"""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    rows = [(puuid, priority, now) for puuid, priority in compute_priorities(conn, seed_puuid).items()]
+    if rows:
+        with conn.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO crawl_frontier (puuid, priority, status, pages_done, games_found, games_new, updated_at) "
+                f"VALUES (%s, %s, '{PENDING}', 0, 0, 0, %s) "
+                "ON DUPLICATE KEY UPDATE priority = VALUES(priority)",
+                rows,
+            )
+        conn.commit()
+    return len(rows)
+
+def load_frontier(conn, limit=FRONTIER_BATCH, exclude=()) -> list:
+    """未完成的玩家按优先级从高到低：[(puuid, priority)]。上次中断时仍为 active 的玩家一并返回。"""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT puuid, priority FROM crawl_frontier WHERE status IN (%s, %s) "
+            "ORDER BY priority DESC LIMIT %s",
+            (PENDING, ACTIVE, limit + len(exclude)),
+        )
+        rows = cursor.fetchall()
+    return [(puuid, priority) for puuid, priority in rows if puuid not in exclude][:limit]
+
+def update_crawl_state(conn, puuid, status, pages_done, games_found, games_new):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "UPDATE crawl_frontier SET status = %s, pages_done = %s, games_found = %s, games_new = %s, "
+            "updated_at = %s WHERE puuid = %s",
+            (status, pages_done, games_found, games_new, datetime.now(timezone.utc).replace(tzinfo=None), puuid),
+        )
+    conn.commit()
+
+def record_crawl_failure(conn, puuid, pages_done, games_found, games_new, max_failures=MAX_PLAYER_FAILURES):
+    # status 先于 failures 赋值：MySQL 与 SQLite 中 CASE 读到的都是更新前的 failures
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE crawl_frontier SET status = CASE WHEN failures + 1 >= %s THEN '{FAILED}' ELSE '{PENDING}' END, "
+            "failures = failures + 1, pages_done = %s, games_found = %s, games_new = %s, updated_at = %s "
+            "WHERE puuid = %s",
+            (max_failures, pages_done, games_found, games_new,
+             datetime.now(timezone.utc).replace(tzinfo=None), puuid),
+        )
+    conn.commit()
+
+def load_seen_game_ids(conn) -> set:
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT game_id FROM matches")
+        return {row[0] for row in cursor.fetchall()}
+
+def crawl_progress(conn) -> dict:
+    """{status: 玩家数}"""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT status, COUNT(*) FROM crawl_frontier GROUP BY status")
+        return dict(cursor.fetchall())
+
+
+# ----------------- 流水线 -----------------
+
+class CrawlPipeline(IngestPipeline):
+    """IngestPipeline 的翻页阶段换成多玩家抓取，detail 拉取 / 行构建 / 批量写库沿用原流水线。
+
+    玩家从 crawl_frontier 按优先级取出，多个玩家并发翻页；已见过的比赛（库中已有或本次已入队）
+    在翻页阶段即被过滤，同一场比赛只会拉取一次 detail。内存中的边界取空后刷新一轮，
+    把新入库比赛带来的玩家加入边界（expand=False 时只抓取开始时已知的玩家）。
+
+    玩家翻完后标记为 done，翻页出错时放回 pending（累计 MAX_PLAYER_FAILURES 次后为 failed）；
+    中断时仍为 active 的玩家下次从第一页重翻，已入库的比赛在翻页时跳过，
+    因此中断时留在队列里未写入的比赛也不会丢失。批量写库重试仍失败时，列出这些比赛的玩家放回 pending。
+    """
+
+    def __init__(self, conn, max_players=DEFAULT_MAX_PLAYERS, pages_per_player=DEFAULT_PAGES_PER_PLAYER,
+                 page_size=DEFAULT_CRAWL_PAGE_SIZE, player_workers=DEFAULT_PLAYER_WORKERS,
+                 fetch_workers=DEFAULT_CRAWL_FETCH_WORKERS, expand=True, **kwargs):
+        super().__init__(conn, pages=pages_per_player, page_size=page_size, fetch_workers=fetch_workers,
+                         **kwargs)
+        self.max_players = max_players
+        self.player_workers = max(1, player_workers)
+        self.expand = expand
+        self.players_started = 0
+        self.players_done = 0
+        self.players_failed = 0
+        self.seen = set()
+        # game_id -> 列出该比赛的玩家；写库失败时据此把玩家放回边界
+        self._listed_by = {}
+        self._requeue = set()
+        self._seed = None
+        self._frontier = []
+        self._taken = set()
+        self._crawled_since_refresh = True
+        self._frontier_lock = None
+
+    async def _lister(self, _inq, outq):
+        stats = self.stats["list"]
+        stats.mark_started()
+        _summoner, self._seed = await get_current_summoner(self.conn)
+        self.seen = await self._in_db(load_seen_game_ids, self._db)
+        self._frontier_lock = asyncio.Lock()
+        await gather_or_cancel(*(self._player_worker(outq) for _ in range(self.player_workers)))
+
+    async def _player_worker(self, outq):
+        while not self._stopping:
+            puuid = await self._next_player()
+            if puuid is None:
+                return
+            await self._crawl_player(puuid, outq)
+
+    async def _next_player(self):
+        async with self._frontier_lock:
+            if self.players_started >= self.max_players:
+                return None
+            if not self._frontier and self._crawled_since_refresh:
+                if self.expand or not self._taken:
+                    await self._in_db(refresh_frontier, self._db, self._seed)
+                frontier = await self._in_db(load_frontier, self._db, FRONTIER_BATCH, self._taken)
+                self._frontier = [(-priority, puuid) for puuid, priority in frontier]
+                heapq.heapify(self._frontier)
+                self._crawled_since_refresh = False
+            if not self._frontier:
+                return None
+            _priority, puuid = heapq.heappop(self._frontier)
+            self._taken.add(puuid)
+            self.players_started += 1
+            return puuid
+
+    async def _crawl_player(self, puuid, outq):
+        stats = self.stats["list"]
+        found = new = pages = 0
+        await self._in_db(update_crawl_state, self._db, puuid, ACTIVE, 0, 0, 0)
+        for page_index in range(self.pages):
+            if self._stopping:
+                return
+            started = time.perf_counter()
+            try:
+                match_list = await request_match_history_page(self.conn, puuid, page_index, self.page_size)
+            except Exception as e:
+                # 出错不等于历史为空：不能标记为 done，放回 pending 下次重翻
+                stats.errors += 1
+                self.players_failed += 1
+                logger.warning("History page %d of %s failed: %s", page_index, puuid, e)
+                await self._in_db(record_crawl_failure, self._db, puuid, pages, found, new)
+                return
+            finally:
+                stats.busy_sec += time.perf_counter() - started
+            if not match_list:
+                break
+
+            fresh = []
+            for summary in match_list:
+                game_id = summary.get("gameId")
+                if game_id not in self.seen:
+                    self.seen.add(game_id)
+                    self._listed_by[game_id] = puuid
+                    fresh.append(summary)
+            for summary in fresh:
+                await outq.put(summary)
+                stats.items += 1
+
+            pages += 1
+            found += len(match_list)
+            new += len(fresh)
+            self.pages_done += 1
+            await self._in_db(update_crawl_state, self._db, puuid, ACTIVE, pages, found, new)
+            if len(match_list) < self.page_size:
+                break
+
+        if puuid in self._requeue:
+            return
+        await self._in_db(update_crawl_state, self._db, puuid, DONE, pages, found, new)
+        self.players_done += 1
+        self._crawled_since_refresh = True
+        logger.info("Crawled %s: %d games listed, %d new", puuid, found, new)
+
+    async def _on_write_failed(self, game_ids):
+        # 未写入的比赛移出已见集合，列出它们的玩家放回 pending，下次运行重新翻页
+        self.seen.difference_update(game_ids)
+        players = {self._listed_by[g] for g in game_ids if g in self._listed_by}
+        self._requeue.update(players)
+        for puuid in players:
+            await self._in_db(update_crawl_state, self._db, puuid, PENDING, 0, 0, 0)
+
+    def crawl_snapshot(self) -> dict:
+        return {
+            "players_started": self.players_started, "players_done": self.players_done,
+            "players_failed": self.players_failed,
+            "pages_done": self.pages_done, "games_seen": len(self.seen),
+        }
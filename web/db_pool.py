@@ -0,0 +1,80 @@
+# db_pool.py（进程内唯一的数据库连接池：match_storage / data.db / export / UI 共用，借出前 ping 检查；
+#   DB_BACKEND=sqlite 时改为打开嵌入式 SQLite 文件）
+
+import threading
+import pymysql
+from web.sqlite_backend import connect_sqlite
+from config.config import (
+    DB_BACKEND, SQLITE_PATH, DB_HOST, DB_PORT, DB_USER, DB_PASS, DB_NAME, DB_URL,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+)
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def ensure_database():
+    """库不存在时创建；只在连接池首次建立时执行一次。"""
+    conn = pymysql.connect(
+        host=DB_HOST,
+        port=DB_PORT,
+        user=DB_USER,
+        password=DB_PASS,
+        charset="utf8mb4",
+        autocommit=True
+    )
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME} DEFAULT CHARSET utf8mb4")
+    finally:
+        conn.close()
+
+def _enable_sqlite_foreign_keys(dbapi_conn, _record):
+    dbapi_conn.execute("PRAGMA foreign_keys = ON")
+
+def get_engine():
+    """SQLAlchemy 引擎（pandas / inspect 使用），底层即共享的 pymysql 连接池。"""
+    global _engine
+    # SQLAlchemy 导入较重，推迟到第一次需要引擎时，避免拖慢启动
+    from sqlalchemy import create_engine
+    with _engine_lock:
+        if _engine is None:
+            if DB_BACKEND == "sqlite":
+                from sqlalchemy import event
+                _engine = create_engine(f"sqlite:///{SQLITE_PATH}")
+                # 与 connect_sqlite 一致，每个连接都打开外键检查
+                event.listen(_engine, "connect", _enable_sqlite_foreign_keys)
+                return _engine
+            ensure_database()
+            _engine = create_engine(
+                DB_URL,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_timeout=DB_POOL_TIMEOUT,
+                pool_recycle=DB_POOL_RECYCLE,
+                # 借出前 ping，MySQL 重启或连接被服务端断开后自动换新连接
+                pool_pre_ping=True,
+                connect_args={"autocommit": True},
+            )
+        return _engine
+
+def connect_mysql():
+    """从连接池借出一个 pymysql 连接；用法与 pymysql.connect() 的返回值相同，close() 归还连接池。
+
+    DB_BACKEND=sqlite 时返回接口相同的 SQLiteConnection（打开文件的开销很小，不做池化）。
+    """
+    try:
+        if DB_BACKEND == "sqlite":
+            return connect_sqlite(SQLITE_PATH)
+        return get_engine().raw_connection()
+    except Exception as e:
+        print(f"❌ 数据库连接失败: {e}")
+        raise
+
+def dispose_pool():
+    """关闭池中所有空闲连接（进程退出或切换配置时调用）。"""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
@@ -0,0 +1,300 @@
+# ingest_pipeline.py（分阶段入库流水线：翻页 -> 并发拉取 detail（与时间线） -> 行构建 -> 批量写库，阶段间有界队列背压）
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from web.lcu_client import (
+    fetch_match_history_page, fetch_match_detail, fetch_match_timeline, get_current_summoner,
+    reached_stored_history, DEFAULT_DETAIL_CONCURRENCY, DEFAULT_FETCH_TIMELINES,
+)
+from web.match_cache import get_match_cache
+from web.metrics import metrics, flush_textfile
+from web.match_storage import (
+    connect_mysql, build_match_rows, merge_rows, write_rows_batch,
+    get_stored_game_ids, get_high_water_mark, DEFAULT_BATCH_SIZE,
+)
+from web.match_timeline import build_timeline_rows
+from web.utils import gather_or_cancel
+
+# 阶段间队列长度：下游变慢时上游在 put() 处等待
+DEFAULT_QUEUE_SIZE = 64
+# 写库阶段凑不满一批时的最长等待时间（秒）
+WRITE_FLUSH_INTERVAL = 0.5
+# 批量写入失败后的重试间隔（秒）；全部失败时整个流水线以异常结束，未写入的比赛下次翻页时重新列出
+WRITE_RETRY_DELAYS = (1, 3, 10)
+
+_DONE = object()
+STAGES = ("list", "fetch", "build", "write")
+
+logger = logging.getLogger(__name__)
+
+
+class StageStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.errors = 0
+        self.busy_sec = 0.0
+        self.started = None
+        self.finished = None
+
+    def mark_started(self):
+        if self.started is None:
+            self.started = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def rate(self) -> float:
+        elapsed = self.elapsed
+        return self.items / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "items": self.items, "errors": self.errors, "rate": self.rate,
+            "busy_sec": self.busy_sec, "elapsed_sec": self.elapsed,
+        }
+
+
+class IngestPipeline:
+    """lister -> fetchers -> builders -> writer。
+
+    用法（在 lcu_driver 连接所在的事件循环中）：
+        pipeline = IngestPipeline(connection, pages=5)
+        stats = await pipeline.run()
+    stop() 停止翻页并把已入队的比赛处理完；cancel() 立即取消所有阶段。两者均可跨线程调用。
+    """
+
+    def __init__(self, conn, pages=5, page_size=30, fetch_workers=DEFAULT_DETAIL_CONCURRENCY,
+                 build_workers=1, batch_size=DEFAULT_BATCH_SIZE, queue_size=DEFAULT_QUEUE_SIZE,
+                 incremental=False, skip_known=False, start_page=0, progress_callback=None,
+                 with_timelines=DEFAULT_FETCH_TIMELINES):
+        self.conn = conn
+        self.pages = pages
+        self.page_size = page_size
+        self.fetch_workers = max(1, fetch_workers)
+        self.build_workers = max(1, build_workers)
+        self.batch_size = max(1, batch_size)
+        self.queue_size = queue_size
+        self.incremental = incremental
+        # 只跳过已入库的比赛、不提前停止翻页（用于中断后续跑）
+        self.skip_known = skip_known
+        self.start_page = start_page
+        self.progress_callback = progress_callback
+        # 拉取 detail 后再拉时间线，与比赛行在同一事务中写入
+        self.with_timelines = with_timelines
+
+        self.stats = {name: StageStats(name) for name in STAGES}
+        self.pages_done = 0
+        self.failed_game_ids = []
+        self._stopping = False
+        self._loop = None
+        self._tasks = []
+        # pymysql 连接只在这个单线程 executor 中使用
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline-db")
+        self._db = None
+
+    # ----------------- 控制 -----------------
+
+    def stop(self):
+        self._stopping = True
+
+    def cancel(self):
+        self._stopping = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._cancel_tasks)
+
+    def _cancel_tasks(self):
+        for task in self._tasks:
+            task.cancel()
+
+    def snapshot(self) -> dict:
+        return {name: s.as_dict() for name, s in self.stats.items()}
+
+    # ----------------- 运行 -----------------
+
+    async def run(self) -> dict:
+        self._loop = asyncio.get_running_loop()
+        summaries = asyncio.Queue(self.queue_size)
+        details = asyncio.Queue(self.queue_size)
+        rows = asyncio.Queue(self.queue_size)
+
+        self._db = await self._in_db(connect_mysql)
+        try:
+            self._tasks = [
+                asyncio.create_task(self._stage("list", 1, self._lister, None, summaries, self.fetch_workers)),
+                asyncio.create_task(self._stage("fetch", self.fetch_workers, self._fetcher, summaries, details,
+                                                self.build_workers)),
+                asyncio.create_task(self._stage("build", self.build_workers, self._builder, details, rows, 1)),
+                asyncio.create_task(self._stage("write", 1, self._writer, rows, None, 0)),
+            ]
+            await asyncio.gather(*self._tasks)
+        except asyncio.CancelledError:
+            # cancel() 取消的是各阶段任务；run() 本身被取消时照常抛出
+            if not self._stopping:
+                raise
+        finally:
+            # 任一阶段异常或被取消时，其余阶段可能仍阻塞在队列上，关闭数据库前全部取消并等待结束
+            self._cancel_tasks()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            await self._in_db(self._db.close)
+            self._db_executor.shutdown(wait=False)
+            flush_textfile()
+        return self.snapshot()
+
+    async def _in_db(self, fn, *args):
+        return await self._loop.run_in_executor(self._db_executor, fn, *args)
+
+    async def _stage(self, name, workers, worker_fn, inq, outq, downstream_workers):
+        # 本阶段所有 worker 结束后，为下游每个 worker 投放一个结束标记
+        await gather_or_cancel(*(worker_fn(inq, outq) for _ in range(workers)))
+        self.stats[name].finished = time.perf_counter()
+        for _ in range(downstream_workers):
+            await outq.put(_DONE)
+
+    async def _lister(self, _inq, outq):
+        stats = self.stats["list"]
+        stats.mark_started()
+        _summoner, puuid = await get_current_summoner(self.conn)
+        hwm_creation = hwm_game_id = None
+        if self.incremental:
+            hwm_creation, hwm_game_id = await self._in_db(get_high_water_mark, self._db, puuid)
+
+        for page_index in range(self.start_page, self.start_page + self.pages):
+            if self._stopping:
+                break
+            started = time.perf_counter()
+            match_list = await fetch_match_history_page(self.conn, puuid, page_index, self.page_size)
+            stats.busy_sec += time.perf_counter() - started
+            if not match_list:
+                break
+
+            new_games = match_list
+            if self.incremental or self.skip_known:
+                known = await self._in_db(get_stored_game_ids, self._db, [s.get("gameId") for s in match_list])
+                new_games = [s for s in match_list if s.get("gameId") not in known]
+
+            for summary in new_games:
+                await outq.put(summary)
+                stats.items += 1
+            self.pages_done = page_index + 1
+
+            if len(match_list) < self.page_size:
+                break
+            if self.incremental and reached_stored_history(match_list, new_games, hwm_creation, hwm_game_id):
+                break
+
+    async def _fetcher(self, inq, outq):
+        stats = self.stats["fetch"]
+        while True:
+            summary = await inq.get()
+            if summary is _DONE:
+                return
+            stats.mark_started()
+            started = time.perf_counter()
+            detail = await fetch_match_detail(self.conn, summary)
+            timeline = None
+            if detail.get("__fallback", False):
+                stats.errors += 1
+            elif self.with_timelines:
+                # 失败时为 None，不影响比赛本身入库；缺失的时间线由 backfill_timelines 补拉
+                timeline = await fetch_match_timeline(self.conn, detail["gameId"])
+            stats.busy_sec += time.perf_counter() - started
+            stats.items += 1
+            await outq.put((detail, timeline))
+
+    async def _builder(self, inq, outq):
+        stats = self.stats["build"]
+        cache = get_match_cache()
+        while True:
+            item = await inq.get()
+            if item is _DONE:
+                return
+            detail, timeline = item
+            stats.mark_started()
+            is_fallback = detail.get("__fallback", False)
+            started = time.perf_counter()
+            try:
+                with metrics.timer("row_build_seconds"):
+                    match_rows = build_match_rows(detail, is_fallback=is_fallback)
+                    if timeline is not None:
+                        match_rows.update(build_timeline_rows(detail["gameId"], timeline))
+            except Exception as e:
+                stats.errors += 1
+                logger.error("Failed to build rows for match %s: %s", detail.get("gameId"), e)
+                continue
+            stats.busy_sec += time.perf_counter() - started
+            if not is_fallback:
+                await self._loop.run_in_executor(None, cache.put, detail)
+            stats.items += 1
+            await outq.put(match_rows)
+
+    async def _writer(self, inq, _outq):
+        stats = self.stats["write"]
+        pending, pending_matches = {}, 0
+        finished = False
+        while not finished:
+            try:
+                item = await asyncio.wait_for(inq.get(), timeout=WRITE_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                item = None
+
+            if item is _DONE:
+                finished = True
+            elif item is not None:
+                stats.mark_started()
+                merge_rows(pending, item)
+                pending_matches += 1
+
+            if pending_matches and (finished or item is None or pending_matches >= self.batch_size):
+                started = time.perf_counter()
+                await self._write_batch(pending, pending_matches)
+                stats.items += pending_matches
+                stats.busy_sec += time.perf_counter() - started
+                pending, pending_matches = {}, 0
+                if self.progress_callback:
+                    self.progress_callback(self.snapshot())
+
+    async def _write_batch(self, rows, n_matches):
+        for attempt, delay in enumerate((0,) + WRITE_RETRY_DELAYS):
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                await self._in_db(write_rows_batch, self._db, rows)
+                return
+            except Exception as e:
+                error = e
+                logger.warning("Batch write of %d matches failed (attempt %d): %s", n_matches, attempt + 1, e)
+                # pymysql 连接断开时重连；SQLite 连接没有 ping
+                ping = getattr(self._db, "ping", None)
+                if ping is not None:
+                    try:
+                        await self._in_db(ping, True)
+                    except Exception as ping_error:
+                        logger.warning("Reconnect failed: %s", ping_error)
+
+        game_ids = [row[0] for row in rows.get("matches", ())]
+        self.stats["write"].errors += n_matches
+        self.failed_game_ids.extend(game_ids)
+        await self._on_write_failed(game_ids)
+        raise RuntimeError(f"批量写入 {n_matches} 场比赛失败（已重试 {len(WRITE_RETRY_DELAYS)} 次）: {error}") from error
+
+    async def _on_write_failed(self, game_ids):
+        # 未写入的比赛不在库中，下次 incremental / skip_known 翻页时会重新列出；子类可在此回退自身状态
+        pass
+
+
+def empty_snapshot() -> dict:
+    # 流水线未启动（如等待客户端时被取消）时的结果，结构与 IngestPipeline.snapshot() 相同
+    return {name: StageStats(name).as_dict() for name in STAGES}
+
+def format_stats(snapshot: dict) -> str:
+    return "\n".join(
+        f"{name:>6}: {s['items']:6d} items  {s['rate']:8.1f}/s  busy {s['busy_sec']:6.2f}s  errors {s['errors']}"
+        for name, s in snapshot.items()
+    )
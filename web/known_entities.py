@@ -0,0 +1,126 @@
+# known_entities.py（进程内已入库实体缓存：已知的 puuid 与完整比赛 game_id，跳过重复的 players / matches 写入）
+
+import threading
+from collections import OrderedDict
+from web.metrics import metrics
+
+# 各类实体的缓存上限（LRU 淘汰，淘汰后只是退回到 INSERT IGNORE，不影响正确性）
+DEFAULT_MAX_PUUIDS = 200_000
+DEFAULT_MAX_GAMES = 200_000
+
+
+class _LRUSet:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        if key in self._items:
+            self._items.move_to_end(key)
+            return True
+        return False
+
+    def add(self, key):
+        self._items[key] = None
+        self._items.move_to_end(key)
+        if len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
+
+
+class KnownEntityCache:
+    """已确认存在于数据库中的 puuid 与 game_id（只含非 fallback 的完整比赛）。
+
+    只在事务提交之后（record_committed）或从数据库预热（warm）时加入，回滚的写入不会进入缓存；
+    因此命中即可安全跳过对应的 INSERT IGNORE。fallback 比赛不缓存，之后拿到完整 detail 时仍会补写。
+    同一进程内清表 / 删库后需调用 clear()；其它进程删除数据不会反映到这里。
+    """
+
+    def __init__(self, max_puuids=DEFAULT_MAX_PUUIDS, max_games=DEFAULT_MAX_GAMES):
+        self._puuids = _LRUSet(max_puuids)
+        self._games = _LRUSet(max_games)
+        self._lock = threading.Lock()
+        self.counters = {("puuid", "hit"): 0, ("puuid", "miss"): 0, ("game", "hit"): 0, ("game", "miss"): 0}
+
+    def _lookup(self, kind: str, entries: _LRUSet, key) -> bool:
+        with self._lock:
+            hit = key in entries
+            self.counters[(kind, "hit" if hit else "miss")] += 1
+        metrics.inc("known_entity_lookups_total", kind=kind, result="hit" if hit else "miss")
+        return hit
+
+    def has_puuid(self, puuid: str) -> bool:
+        return self._lookup("puuid", self._puuids, puuid)
+
+    def has_game(self, game_id) -> bool:
+        return self._lookup("game", self._games, game_id)
+
+    def add(self, puuids=(), game_ids=()):
+        with self._lock:
+            for puuid in puuids:
+                self._puuids.add(puuid)
+            for game_id in game_ids:
+                self._games.add(game_id)
+
+    def record_committed(self, rows: dict, is_fallback_idx: int):
+        """write_rows_batch 提交成功后调用：rows 中的玩家与完整比赛已确定落库。"""
+        self.add(
+            puuids=(row[0] for row in rows.get("players", ())),
+            game_ids=(row[0] for row in rows.get("matches", ()) if not row[is_fallback_idx]),
+        )
+
+    def warm(self, conn, max_puuids=None, max_games=None) -> dict:
+        """启动时预热：出场最多的玩家与最近的完整比赛，重要的后加入以排在 LRU 队尾。"""
+        max_puuids = self._puuids.maxsize if max_puuids is None else max_puuids
+        max_games = self._games.maxsize if max_games is None else max_games
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT puuid FROM participants WHERE puuid <> '' GROUP BY puuid ORDER BY COUNT(*) DESC LIMIT %s",
+                (max_puuids,),
+            )
+            puuids = [row[0] for row in cursor.fetchall()]
+            cursor.execute(
+                "SELECT game_id FROM matches WHERE is_fallback = 0 ORDER BY game_creation DESC LIMIT %s",
+                (max_games,),
+            )
+            game_ids = [row[0] for row in cursor.fetchall()]
+        self.add(reversed(puuids), reversed(game_ids))
+        return {"puuids": len(puuids), "games": len(game_ids)}
+
+    def game_ids(self) -> list:
+        with self._lock:
+            return list(self._games._items)
+
+    def clear(self):
+        with self._lock:
+            self._puuids.clear()
+            self._games.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+            sizes = {"puuid": len(self._puuids), "game": len(self._games)}
+        result = {}
+        for kind in ("puuid", "game"):
+            hits, misses = counters[(kind, "hit")], counters[(kind, "miss")]
+            result[kind] = {
+                "size": sizes[kind], "hits": hits, "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            }
+        return result
+
+
+_known = None
+_known_lock = threading.Lock()
+
+def get_known_entities() -> KnownEntityCache:
+    global _known
+    with _known_lock:
+        if _known is None:
+            _known = KnownEntityCache()
+        return _known
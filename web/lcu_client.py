@@ -1,34 +1,67 @@
 # lcu_client.py（集成容错 match detail 获取 + 插入流程）
 
 import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from web.match_storage import connect_mysql, insert_match_json
+from web.match_storage import (
+    connect_mysql, insert_match_json, get_stored_game_ids, get_high_water_mark, parse_game_creation
+)
+from web.match_cache import get_match_cache
+from web.match_timeline import insert_timeline, get_games_without_timeline
+from web.metrics import metrics
+from web.request_scheduler import get_scheduler
+from web.utils import gather_or_cancel
 from rich.console import Console
 
 console = Console()
+logger = logging.getLogger(__name__)
 
-async def fetch_match_history_page(conn, puuid: str, page_index: int, page_size: int = 30):
+# 单页内同时调度的 /games/{id} 任务数；实际在途请求数由 request_scheduler 按 AIMD 控制
+DEFAULT_DETAIL_CONCURRENCY = 16
+# 增量同步最多翻的页数（首次同步时的上限）
+DEFAULT_SYNC_MAX_PAGES = 10
+# 入库时是否同时拉取每场比赛的时间线（每场多一次请求）
+DEFAULT_FETCH_TIMELINES = True
+TIMELINE_ENDPOINT = '/lol-match-history/v1/game-timelines/{game_id}'
+
+async def request_json(conn, method: str, endpoint: str, stage: str, **kwargs):
+    # 请求耗时（含读取响应体与重试）与 JSON 解码耗时分开计量
+    with metrics.timer("lcu_request_seconds", endpoint=stage):
+        status, body = await get_scheduler().fetch(conn, method, endpoint, stage, **kwargs)
+    metrics.inc("lcu_requests_total", endpoint=stage, status=status)
+    with metrics.timer("json_decode_seconds", endpoint=stage):
+        return json.loads(body)
+
+async def request_match_history_page(conn, puuid: str, page_index: int, page_size: int = 30):
+    """请求失败或返回错误体时抛出异常，调用方可以区分“出错”与“历史为空”。"""
     beg_index = page_index * page_size
     end_index = beg_index + page_size
 
-    resp = await conn.request(
-        'GET',
+    json_data = await request_json(
+        conn, 'GET',
         f'/lol-match-history/v1/products/lol/{puuid}/matches',
+        'history_page',
         params={'begIndex': beg_index, 'endIndex': end_index}
     )
+    games = json_data.get('games') if isinstance(json_data, dict) else None
+    if not isinstance(games, dict):
+        raise RuntimeError(f"Unexpected match history response: {str(json_data)[:200]}")
+    return games.get('games', [])
 
+async def fetch_match_history_page(conn, puuid: str, page_index: int, page_size: int = 30):
     try:
-        json_data = await resp.json()
-        return json_data.get('games', {}).get('games', [])
+        return await request_match_history_page(conn, puuid, page_index, page_size)
     except Exception as e:
-        print(f"Failed to parse match history: {e}")
+        logger.error("Failed to parse match history: %s", e)
         return []
 
 async def get_current_summoner(conn):
-    summ = await (await conn.request('GET','/lol-summoner/v1/current-summoner')).json()
+    summ = await request_json(conn, 'GET', '/lol-summoner/v1/current-summoner', 'summoner')
     name = summ.get('displayName') or summ.get('summonerName') or summ.get('summonerId')
     puuid = summ.get('puuid')
-    print(f"[DEBUG] Summoner info: name={name}, puuid={puuid}")
+    logger.debug("Summoner info: name=%s, puuid=%s", name, puuid)
     return summ, puuid
 
 async def get_current_game_phase(conn):
@@ -42,33 +75,158 @@ async def get_current_game_phase(conn):
 
 async def fetch_match_detail(conn, fallback_summary: dict):
     game_id = fallback_summary.get("gameId")
-    print(f'{game_id}')
     try:
-        resp = await conn.request('GET', f'/lol-match-history/v1/games/{game_id}')
-        detail = await resp.json()
+        detail = await request_json(conn, 'GET', f'/lol-match-history/v1/games/{game_id}', 'match_detail')
 
         if all(k in detail for k in ["participants", "teams", "participantIdentities"]):
-            print(f"[INFO] Loaded match {game_id} from /games")
+            logger.debug("Loaded match %s from /games", game_id)
+            metrics.inc("match_details_total", result="ok")
             detail["__fallback"] = False
-            print(f'{detail}')
             return detail
         else:
-            print(f"[WARN] Incomplete detail for match {game_id}, using fallback.")
+            logger.warning("Incomplete detail for match %s, using fallback.", game_id)
+            metrics.inc("match_details_total", result="incomplete")
     except Exception as e:
-        print(f"[ERROR] Failed to fetch match {game_id} detail: {e}")
+        logger.error("Failed to fetch match %s detail: %s", game_id, e)
+        metrics.inc("match_details_total", result="error")
 
     fallback_summary["__fallback"] = True
     return fallback_summary
 
+async def fetch_match_timeline(conn, game_id):
+    """返回 game-timelines 的 JSON；失败或没有帧时返回 None，不影响比赛本身入库（之后可用 backfill_timelines 补拉）。"""
+    try:
+        timeline = await request_json(conn, 'GET', TIMELINE_ENDPOINT.format(game_id=game_id), 'timeline')
+    except Exception as e:
+        logger.warning("Failed to fetch timeline for match %s: %s", game_id, e)
+        metrics.inc("match_timelines_total", result="error")
+        return None
+    if not isinstance(timeline, dict) or not timeline.get("frames"):
+        metrics.inc("match_timelines_total", result="empty")
+        return None
+    metrics.inc("match_timelines_total", result="ok")
+    return timeline
+
 # ----------------- 清洁化接口: 批量获取并入库 -----------------
 
-async def fetch_and_store_history(conn, page_index=0, page_size=30):
+def _persist_detail(detail, db, is_fallback, timeline=None):
+    # 完整的 detail 先写入本地原始 JSON 缓存，之后可脱离客户端回放重建
+    if not is_fallback:
+        get_match_cache().put(detail)
+    insert_match_json(detail, db, is_fallback=is_fallback)
+    if timeline is not None:
+        insert_timeline(db, detail["gameId"], timeline)
+
+async def _store_summaries(conn, summaries, db, writer, concurrency, with_timelines=DEFAULT_FETCH_TIMELINES):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch_and_store(summary):
+        timeline = None
+        async with semaphore:
+            detail = await fetch_match_detail(conn, summary)
+            is_fallback = detail.get("__fallback", False)
+            # fallback 摘要说明该比赛的 detail 已不可用，时间线同样跳过
+            if with_timelines and not is_fallback:
+                timeline = await fetch_match_timeline(conn, detail["gameId"])
+        await loop.run_in_executor(writer, _persist_detail, detail, db, is_fallback, timeline)
+
+    # 任一场失败时先取消并等待其余任务，调用方随后关闭 db / writer，不会再有任务往已关闭的 executor 提交
+    await gather_or_cancel(*(fetch_and_store(s) for s in summaries))
+    return len(summaries)
+
+async def fetch_and_store_history(conn, page_index=0, page_size=30, concurrency=DEFAULT_DETAIL_CONCURRENCY,
+                                  with_timelines=DEFAULT_FETCH_TIMELINES):
     summoner, puuid = await get_current_summoner(conn)
     match_list = await fetch_match_history_page(conn, puuid, page_index, page_size)
-    
-    db = connect_mysql()
-    for summary in match_list:
-        detail = await fetch_match_detail(conn, summary)
-        is_fallback = detail.get("__fallback", False)
-        insert_match_json(detail, db, is_fallback=is_fallback)
-    db.close()
+
+    loop = asyncio.get_running_loop()
+    # pymysql 连接不能跨线程并发使用，用单线程写入，网络请求与入库在事件循环外重叠
+    writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="match-writer")
+    db = await loop.run_in_executor(writer, connect_mysql)
+    try:
+        await _store_summaries(conn, match_list, db, writer, concurrency, with_timelines)
+    finally:
+        await loop.run_in_executor(writer, db.close)
+        writer.shutdown(wait=False)
+
+    return len(match_list)
+
+async def backfill_timelines(conn, limit=None, concurrency=DEFAULT_DETAIL_CONCURRENCY):
+    """为已入库但缺少时间线的比赛（入库时拉取失败）只重新拉取时间线，返回 (补齐场数, 待补场数)。"""
+    loop = asyncio.get_running_loop()
+    writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="match-writer")
+    db = await loop.run_in_executor(writer, connect_mysql)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    filled = 0
+    try:
+        game_ids = await loop.run_in_executor(writer, get_games_without_timeline, db, limit)
+
+        async def refill(game_id):
+            nonlocal filled
+            async with semaphore:
+                timeline = await fetch_match_timeline(conn, game_id)
+            # 仍然失败的比赛保持缺失，下次回填时重试
+            if timeline is not None:
+                await loop.run_in_executor(writer, insert_timeline, db, game_id, timeline)
+                filled += 1
+
+        await gather_or_cancel(*(refill(gid) for gid in game_ids))
+    finally:
+        await loop.run_in_executor(writer, db.close)
+        writer.shutdown(wait=False)
+
+    logger.info("Backfilled timelines for %d of %d matches", filled, len(game_ids))
+    return filled, len(game_ids)
+
+# ----------------- 增量同步: 遇到已入库的比赛即停止翻页 -----------------
+
+def is_known_history(summary, hwm_creation, hwm_game_id) -> bool:
+    if hwm_creation is not None and "gameCreationDate" in summary:
+        return parse_game_creation(summary).replace(tzinfo=None) <= hwm_creation
+    return hwm_game_id is not None and summary.get("gameId", 0) <= hwm_game_id
+
+def reached_stored_history(match_list, new_games, hwm_creation, hwm_game_id) -> bool:
+    """增量同步的停止条件：本页已越过高水位线且没有未入库的比赛。
+
+    是否入库只看 get_stored_game_ids；高水位线只用于决定何时停止翻页。
+    中断的入库（先写最新的批次）会在高水位线以下留下空缺，只要页中还有未入库的比赛就继续往后翻。
+    """
+    return not new_games and any(is_known_history(s, hwm_creation, hwm_game_id) for s in match_list)
+
+async def sync_new_history(conn, max_pages=DEFAULT_SYNC_MAX_PAGES, page_size=30,
+                           concurrency=DEFAULT_DETAIL_CONCURRENCY, with_timelines=DEFAULT_FETCH_TIMELINES):
+    """只拉取并入库尚未保存的比赛，返回新入库的场数。
+
+    历史按时间倒序返回：跳过已入库比赛的 detail 请求，
+    某页越过该 puuid 的高水位线且全部已入库时停止翻页（见 reached_stored_history）。
+    """
+    summoner, puuid = await get_current_summoner(conn)
+
+    loop = asyncio.get_running_loop()
+    writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="match-writer")
+    db = await loop.run_in_executor(writer, connect_mysql)
+    stored = 0
+    try:
+        hwm_creation, hwm_game_id = await loop.run_in_executor(writer, get_high_water_mark, db, puuid)
+        for page_index in range(max_pages):
+            match_list = await fetch_match_history_page(conn, puuid, page_index, page_size)
+            if not match_list:
+                break
+
+            known = await loop.run_in_executor(
+                writer, get_stored_game_ids, db, [s.get("gameId") for s in match_list]
+            )
+            new_games = [s for s in match_list if s.get("gameId") not in known]
+            stored += await _store_summaries(conn, new_games, db, writer, concurrency, with_timelines)
+
+            if len(match_list) < page_size:
+                break
+            if reached_stored_history(match_list, new_games, hwm_creation, hwm_game_id):
+                break
+    finally:
+        await loop.run_in_executor(writer, db.close)
+        writer.shutdown(wait=False)
+
+    logger.info("Incremental sync stored %d new matches for %s", stored, puuid)
+    return stored
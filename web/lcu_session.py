@@ -0,0 +1,219 @@
+# lcu_session.py（长连接会话：连接一次，任意线程复用，客户端重启后自动重连）
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from lcu_driver import Connector
+from lcu_driver.events.responses import WebsocketEventResponse
+from web.request_scheduler import get_scheduler
+
+# 心跳间隔与端点：请求失败即视为客户端已退出
+HEARTBEAT_INTERVAL = 5
+HEARTBEAT_ENDPOINT = '/riotclient/region-locale'
+# 断线后重新查找客户端进程前的等待时间
+RECONNECT_DELAY = 1
+WS_EVENT_TYPES = ('CREATE', 'UPDATE', 'DELETE')
+
+
+class LCUSession:
+    """在后台线程中维持一个 lcu_driver 连接，供任意线程提交协程。
+
+    用法：get_session().call(fetch_match_history_page, puuid, 0, 30)
+    协程的第一个参数为 lcu_driver 的 Connection。
+
+    subscribe(uri, handler) 订阅 websocket 事件，handler(connection, event) 在会话线程中执行；
+    有订阅时才开启 websocket，重连后自动恢复订阅。
+    """
+
+    def __init__(self, heartbeat_interval=HEARTBEAT_INTERVAL, connection_factory=None):
+        self.heartbeat_interval = heartbeat_interval
+        # 可选的 async 工厂，返回带 request() 的连接对象（如 benchmarks.fake_lcu 的测试服务器），
+        # 为 None 时通过 lcu_driver 查找本机客户端
+        self.connection_factory = connection_factory
+        self._thread = None
+        self._loop = None
+        self._connection = None
+        self._disconnected = None
+        self._connected = threading.Event()
+        self._closing = False
+        self._lock = threading.Lock()
+        self._subscriptions = []
+        self._connector = None
+        self._ws_enabled = False
+        self._resubscribe = False
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._closing = False
+                self._thread = threading.Thread(target=self._run, name="lcu-session", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._closing = True
+        loop, disconnected = self._loop, self._disconnected
+        if loop is not None and disconnected is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(disconnected.set)
+
+    def wait_connected(self, timeout=None) -> bool:
+        self.start()
+        return self._connected.wait(timeout)
+
+    def submit(self, coro_fn, *args, connect_timeout=None, **kwargs):
+        """提交协程到会话线程，返回 concurrent.futures.Future。"""
+        if not self.wait_connected(connect_timeout):
+            raise TimeoutError("LCU 客户端未连接")
+        connection, loop = self._connection, self._loop
+        if connection is None or loop is None or loop.is_closed():
+            raise ConnectionError("LCU 连接已断开")
+        return asyncio.run_coroutine_threadsafe(coro_fn(connection, *args, **kwargs), loop)
+
+    def call(self, coro_fn, *args, timeout=None, connect_timeout=None, **kwargs):
+        """阻塞执行协程并返回结果，不能在会话线程内调用。"""
+        future = self.submit(coro_fn, *args, connect_timeout=connect_timeout, **kwargs)
+        return future.result(timeout)
+
+    def request(self, method: str, endpoint: str, **kwargs):
+        return self.call(_request_json, method, endpoint, **kwargs)
+
+    def subscribe(self, uri: str, handler, event_types=WS_EVENT_TYPES):
+        """uri 以 / 结尾时匹配该前缀下的所有事件。已连接但尚未开启 websocket 时会重连一次。"""
+        with self._lock:
+            self._subscriptions.append((uri, tuple(event_types), handler))
+            connector = self._connector if self._ws_enabled else None
+        if connector is not None:
+            # Connector 在分发事件时才读取订阅列表，可直接追加
+            connector.ws.register(uri, event_types=tuple(event_types))(handler)
+        elif self.connected:
+            self._resubscribe = True
+            loop, disconnected = self._loop, self._disconnected
+            if loop is not None and disconnected is not None and not loop.is_closed():
+                loop.call_soon_threadsafe(disconnected.set)
+
+    # ----------------- 会话线程内部 -----------------
+
+    def _run(self):
+        while not self._closing:
+            # Connector.start() 结束时会关闭 loop，每次重连都需要新的 loop
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                with self._lock:
+                    subscriptions = list(self._subscriptions)
+                    self._ws_enabled = bool(subscriptions)
+                    self._resubscribe = False
+                if self.connection_factory is not None:
+                    loop.run_until_complete(self._run_with_factory())
+                    loop.close()
+                else:
+                    connector = Connector(loop=loop)
+                    connector.ready(self._on_ready)
+                    connector.close(self._on_close)
+                    for uri, event_types, handler in subscriptions:
+                        connector.ws.register(uri, event_types=event_types)(handler)
+                    self._connector = connector
+                    connector.start()
+            except Exception as e:
+                logging.warning(f"LCU 会话异常断开: {e}")
+            finally:
+                self._mark_disconnected()
+
+            if not self._closing:
+                logging.info("LCU 连接已断开，等待客户端重启后重连...")
+                time.sleep(RECONNECT_DELAY)
+
+    async def _on_ready(self, connection):
+        self._loop = asyncio.get_running_loop()
+        self._disconnected = asyncio.Event()
+        self._connection = connection
+        self._connected.set()
+        logging.info("LCU 会话已连接")
+
+        # 阻塞 ready 回调以保持连接，直到心跳失败或 stop()
+        while not self._disconnected.is_set():
+            try:
+                await asyncio.wait_for(self._disconnected.wait(), timeout=self.heartbeat_interval)
+            except asyncio.TimeoutError:
+                if not await self._heartbeat(connection):
+                    break
+        self._mark_disconnected()
+
+        if self._ws_enabled and self._connector is not None and (self._closing or self._resubscribe):
+            # 开启 websocket 后 Connector 会阻塞在事件循环里并自动等待下一个客户端，
+            # 停止或需要重新订阅时主动关闭连接与 websocket，回到 _run 的重连循环
+            await self._connector.stop()
+            ws = getattr(connection, "_ws", None)
+            if ws is not None:
+                await ws.close()
+
+    async def _run_with_factory(self):
+        connection = await self.connection_factory()
+        events = None
+        # 测试用连接（benchmarks.fake_lcu）提供 run_ws(dispatch) 时同样支持订阅
+        if self._ws_enabled and hasattr(connection, "run_ws"):
+            events = asyncio.create_task(connection.run_ws(self._dispatch_event))
+        try:
+            await self._on_ready(connection)
+        finally:
+            if events is not None:
+                events.cancel()
+            close = getattr(connection, "close", None)
+            if close is not None:
+                await close()
+
+    async def _on_close(self, connection):
+        self._mark_disconnected()
+
+    async def _heartbeat(self, connection) -> bool:
+        try:
+            resp = await connection.request('GET', HEARTBEAT_ENDPOINT)
+            resp.release()
+            return True
+        except Exception as e:
+            logging.info(f"LCU 心跳失败: {e}")
+            return False
+
+    def _dispatch_event(self, connection, data: dict):
+        # 与 lcu_driver 的 WebsocketEventManager.match_event 相同的匹配规则
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for uri, event_types, handler in subscriptions:
+            if uri == data['uri'] or (uri.endswith('/') and data['uri'].startswith(uri)):
+                if data['eventType'].upper() in event_types:
+                    event = WebsocketEventResponse(event_type=data['eventType'], uri=data['uri'], data=data['data'])
+                    asyncio.create_task(handler(connection, event))
+
+    def _mark_disconnected(self):
+        self._connected.clear()
+        self._connection = None
+
+
+async def _request_json(connection, method, endpoint, **kwargs):
+    _status, body = await get_scheduler().fetch(connection, method, endpoint, "session", **kwargs)
+    return json.loads(body)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+def set_session(session: LCUSession):
+    """替换全局会话（基准测试中指向本地假服务器）。"""
+    global _session
+    with _session_lock:
+        if _session is not None and _session is not session:
+            _session.stop()
+        _session = session
+
+def get_session() -> LCUSession:
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = LCUSession()
+        return _session.start()
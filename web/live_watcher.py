@@ -0,0 +1,175 @@
+# live_watcher.py（实时对局监听：订阅 LCU websocket 的 gameflow / 选人 / 结算事件，对局结束后立即入库，无轮询）
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from web.known_entities import get_known_entities
+from web.lcu_client import request_json, fetch_match_timeline, DEFAULT_FETCH_TIMELINES
+from web.match_cache import get_match_cache
+from web.match_storage import connect_mysql, insert_match_json
+from web.match_timeline import insert_timeline
+from web.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+GAMEFLOW_PHASE_URI = '/lol-gameflow/v1/gameflow-phase'
+GAMEFLOW_SESSION_URI = '/lol-gameflow/v1/session'
+CHAMP_SELECT_URI = '/lol-champ-select/v1/session'
+END_OF_GAME_URI = '/lol-end-of-game/v1/eog-stats-block'
+MATCH_DETAIL_ENDPOINT = '/lol-match-history/v1/games/{game_id}'
+
+# 结算后 match history 通常要过几秒到几十秒才有完整 detail；只针对这一场按间隔重试，不翻历史
+DETAIL_RETRY_DELAYS = (2, 5, 10, 20, 30, 60)
+END_PHASES = ('PreEndOfGame', 'EndOfGame')
+
+
+class LiveWatcher:
+    """订阅 gameflow / champ-select / end-of-game 事件，维护当前对局状态，对局结束时拉取 detail 入库。
+
+    用法（二选一）：
+        watcher.attach(get_session())        # 共享 LCUSession 长连接
+        watcher.register(connector)          # 挂到 lcu_driver 的 Connector 上（commands.py）
+    prime(connection) 在连接建立时读取一次当前状态，之后全部由事件驱动。
+    """
+
+    def __init__(self, with_timelines=DEFAULT_FETCH_TIMELINES, on_ingested=None,
+                 retry_delays=DETAIL_RETRY_DELAYS):
+        self.with_timelines = with_timelines
+        # on_ingested(game_id, detail)，在会话线程中调用
+        self.on_ingested = on_ingested
+        self.retry_delays = tuple(retry_delays)
+        self.phase = None
+        self.game_id = None
+        self.champ_select = None
+        self.ingested = []
+        self.stats = {"events": 0, "games_ingested": 0, "ingest_failures": 0}
+        self._scheduled = set()
+        self._tasks = set()
+        # pymysql 连接不跨线程，写库放在单线程 executor 中
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="live-writer")
+
+    # ----------------- 订阅 -----------------
+
+    def subscriptions(self):
+        return (
+            (GAMEFLOW_PHASE_URI, ('CREATE', 'UPDATE'), self._on_phase),
+            (GAMEFLOW_SESSION_URI, ('CREATE', 'UPDATE', 'DELETE'), self._on_gameflow_session),
+            (CHAMP_SELECT_URI, ('CREATE', 'UPDATE', 'DELETE'), self._on_champ_select),
+            (END_OF_GAME_URI, ('CREATE', 'UPDATE'), self._on_end_of_game),
+        )
+
+    def attach(self, session):
+        for uri, event_types, handler in self.subscriptions():
+            session.subscribe(uri, handler, event_types)
+
+    def register(self, connector):
+        for uri, event_types, handler in self.subscriptions():
+            connector.ws.register(uri, event_types=event_types)(handler)
+
+    async def prime(self, connection):
+        """连接建立后读取一次当前阶段（与选人状态），此后只依赖事件更新。"""
+        self.phase = await request_json(connection, 'GET', GAMEFLOW_PHASE_URI, 'gameflow')
+        if self.phase == 'ChampSelect':
+            self.champ_select = await request_json(connection, 'GET', CHAMP_SELECT_URI, 'champ_select')
+        return self.current_state()
+
+    def current_state(self) -> dict:
+        return {"phase": self.phase, "game_id": self.game_id, "champ_select": self.champ_select}
+
+    # ----------------- 事件 -----------------
+
+    def _count(self, event):
+        self.stats["events"] += 1
+        metrics.inc("lcu_ws_events_total", uri=event.uri, type=event.type)
+
+    async def _on_phase(self, connection, event):
+        self._count(event)
+        previous, self.phase = self.phase, event.data
+        logger.info("Gameflow phase %s -> %s", previous, self.phase)
+        if self.phase == 'ChampSelect' and previous != 'ChampSelect':
+            self.champ_select = None
+        # 个别模式（如提前投降、重开）不产生结算面板，进入结算阶段时按 gameflow session 中的 gameId 兜底
+        if self.phase in END_PHASES and self.game_id:
+            self.schedule_ingest(connection, self.game_id)
+
+    async def _on_gameflow_session(self, connection, event):
+        self._count(event)
+        if event.type.upper() == 'DELETE':
+            return
+        game_id = ((event.data or {}).get('gameData') or {}).get('gameId')
+        if game_id:
+            self.game_id = game_id
+
+    async def _on_champ_select(self, connection, event):
+        self._count(event)
+        self.champ_select = None if event.type.upper() == 'DELETE' else event.data
+
+    async def _on_end_of_game(self, connection, event):
+        self._count(event)
+        game_id = (event.data or {}).get('gameId')
+        if game_id:
+            self.schedule_ingest(connection, game_id)
+
+    # ----------------- 入库 -----------------
+
+    def schedule_ingest(self, connection, game_id):
+        """同一场比赛只入库一次；已完整入库的比赛直接跳过。"""
+        if game_id in self._scheduled:
+            return
+        self._scheduled.add(game_id)
+        if get_known_entities().has_game(game_id):
+            return
+        task = asyncio.create_task(self.ingest_game(connection, game_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def ingest_game(self, connection, game_id) -> bool:
+        endpoint = MATCH_DETAIL_ENDPOINT.format(game_id=game_id)
+        detail = None
+        for delay in (0,) + self.retry_delays:
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                candidate = await request_json(connection, 'GET', endpoint, 'match_detail')
+            except Exception as e:
+                logger.info("Match %s not available yet: %s", game_id, e)
+                continue
+            if isinstance(candidate, dict) and candidate.get('participants'):
+                detail = candidate
+                break
+
+        if detail is None:
+            self.stats["ingest_failures"] += 1
+            metrics.inc("live_games_total", result="unavailable")
+            logger.warning("Match %s detail still unavailable after %d attempts", game_id, 1 + len(self.retry_delays))
+            # 允许之后的事件（或下次增量同步）再次处理这场比赛
+            self._scheduled.discard(game_id)
+            return False
+
+        timeline = await fetch_match_timeline(connection, game_id) if self.with_timelines else None
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._writer, self._store, detail, timeline)
+        except Exception as e:
+            self.stats["ingest_failures"] += 1
+            self._scheduled.discard(game_id)
+            metrics.inc("live_games_total", result="error")
+            logger.error("Failed to store match %s: %s", game_id, e)
+            return False
+
+        self.ingested.append(game_id)
+        self.stats["games_ingested"] += 1
+        metrics.inc("live_games_total", result="ok")
+        if self.on_ingested is not None:
+            self.on_ingested(game_id, detail)
+        return True
+
+    def _store(self, detail, timeline):
+        get_match_cache().put(detail)
+        conn = connect_mysql()
+        try:
+            insert_match_json(detail, conn)
+            if timeline:
+                insert_timeline(conn, detail["gameId"], timeline)
+        finally:
+            conn.close()
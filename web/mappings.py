@@ -1,20 +1,131 @@
-# mappings.py
+# mappings.py（静态映射：按补丁版本缓存到本地，懒加载 + 后台刷新，启动不等待网络）
+import json
 import logging
+import os
+import threading
 import requests
 
+MAPPINGS_DIR = os.path.join("cache", "mappings")
+VERSIONS_URL = "https://ddragon.leagueoflegends.com/api/versions.json"
+QUEUES_URL = "https://static.developer.riotgames.com/docs/lol/queues.json"
+DDRAGON_DATA_URL = "https://ddragon.leagueoflegends.com/cdn/{version}/data/en_US/{name}.json"
+
+FALLBACK_QUEUE_MAP = {420: 'Ranked Solo', 450: 'ARAM', 1700: 'Ascension'}
+MAP_KINDS = ("queue", "champion", "item", "spell", "perk")
+
+
+def _get_json(url):
+    resp = requests.get(url, timeout=5)
+    resp.raise_for_status()
+    return resp.json()
+
+def _fetch_maps(version: str) -> dict:
+    champions = _get_json(DDRAGON_DATA_URL.format(version=version, name="champion"))['data']
+    items = _get_json(DDRAGON_DATA_URL.format(version=version, name="item"))['data']
+    spells = _get_json(DDRAGON_DATA_URL.format(version=version, name="summoner"))['data']
+    styles = _get_json(DDRAGON_DATA_URL.format(version=version, name="runesReforged"))
+
+    perks = {}
+    for style in styles:
+        perks[style['id']] = style['name']
+        for slot in style.get('slots', []):
+            for rune in slot.get('runes', []):
+                perks[rune['id']] = rune['name']
+
+    return {
+        "queue": {item['queueId']: item['description'] for item in _get_json(QUEUES_URL)},
+        "champion": {int(v['key']): v['name'] for v in champions.values()},
+        "item": {int(k): v['name'] for k, v in items.items()},
+        "spell": {int(v['key']): v['name'] for v in spells.values()},
+        "perk": perks,
+    }
+
+
+class MappingStore:
+    """映射按补丁版本存放在 <root>/<version>/maps.json，<root>/current.json 记录当前版本。
+
+    get() 只读本地缓存并立即返回，同时在后台线程检查新版本；
+    返回的 dict 对象保持不变，刷新时原地更新，调用方持有的引用会看到新数据。
+    """
+
+    def __init__(self, root=MAPPINGS_DIR):
+        self.root = root
+        self.version = None
+        self._maps = None
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+
+    def get(self, kind: str) -> dict:
+        if self._maps is None:
+            with self._lock:
+                if self._maps is None:
+                    self._maps = {k: {} for k in MAP_KINDS}
+                    self._load_local()
+                    if not self._maps["queue"]:
+                        self._maps["queue"].update(FALLBACK_QUEUE_MAP)
+            self.refresh_in_background()
+        return self._maps[kind]
+
+    def _load_local(self):
+        try:
+            with open(os.path.join(self.root, "current.json"), encoding="utf-8") as f:
+                version = json.load(f)["version"]
+            with open(os.path.join(self.root, version, "maps.json"), encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError, KeyError):
+            logging.info("No local mapping cache yet, using fallback maps until refresh completes.")
+            return
+
+        for kind in MAP_KINDS:
+            self._maps[kind].update({int(k): v for k, v in cached.get(kind, {}).items()})
+        self.version = version
+
+    def refresh_in_background(self):
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self.refresh, name="mapping-refresh", daemon=True)
+            self._refresh_thread.start()
+
+    def refresh(self):
+        try:
+            latest = _get_json(VERSIONS_URL)[0]
+            if latest == self.version:
+                return
+            maps = _fetch_maps(latest)
+        except Exception as e:
+            logging.warning(f"Mapping refresh failed, keeping cached maps: {e}")
+            return
+
+        version_dir = os.path.join(self.root, latest)
+        os.makedirs(version_dir, exist_ok=True)
+        with open(os.path.join(version_dir, "maps.json"), "w", encoding="utf-8") as f:
+            json.dump(maps, f, ensure_ascii=False)
+        with open(os.path.join(self.root, "current.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": latest}, f)
+
+        for kind in MAP_KINDS:
+            target, fresh = self._maps[kind], maps[kind]
+            target.update(fresh)
+            for stale in set(target) - set(fresh):
+                target.pop(stale, None)
+        self.version = latest
+        logging.info(f"Mappings refreshed to patch {latest}.")
+
+
+_store = MappingStore()
+
 def load_queue_map():
-    try:
-        resp = requests.get('https://static.developer.riotgames.com/docs/lol/queues.json', timeout=5)
-        resp.raise_for_status()
-        return {item['queueId']: item['description'] for item in resp.json()}
-    except Exception:
-        logging.warning("Using fallback queue map.")
-        return {420: 'Ranked Solo', 450: 'ARAM', 1700: 'Ascension'}
+    return _store.get("queue")
 
 def load_champion_map():
-    try:
-        data = requests.get("https://ddragon.leagueoflegends.com/cdn/15.6.1/data/en_US/champion.json", timeout=5).json()['data']
-        return {int(v['key']): v['name'] for v in data.values()}
-    except Exception:
-        logging.warning("Failed to load champion map.")
-        return {}
+    return _store.get("champion")
+
+def load_item_map():
+    return _store.get("item")
+
+def load_spell_map():
+    return _store.get("spell")
+
+def load_perk_map():
+    return _store.get("perk")
@@ -0,0 +1,71 @@
+# match_aggregates.py（玩家 / 英雄汇总表：重建与常数时间查询）
+
+from web.match_storage import AGGREGATE_METRICS
+
+_SUMS = """
+    COUNT(*), SUM(p.win), SUM(p.kills), SUM(p.deaths), SUM(p.assists),
+    SUM(p.minions_killed + p.jungle_cs), SUM(m.duration_sec), SUM(p.vision_score),
+    SUM(p.gold_earned), SUM(p.dmg_total)
+"""
+
+def rebuild_aggregates(conn):
+    """从 participants / matches 全量重算汇总表，用于首次启用或修复不一致。"""
+    metrics = ", ".join(AGGREGATE_METRICS)
+    conn.begin()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM player_champion_stats")
+            cursor.execute("DELETE FROM player_queue_stats")
+            cursor.execute(f"""
+                INSERT INTO player_champion_stats (puuid, champion_id, queue_id, {metrics})
+                SELECT p.puuid, p.champion_id, m.queue_id, {_SUMS}
+                FROM participants p JOIN matches m ON m.game_id = p.game_id
+                WHERE p.puuid <> '' AND p.champion_id IS NOT NULL
+                GROUP BY p.puuid, p.champion_id, m.queue_id
+            """)
+            cursor.execute(f"""
+                INSERT INTO player_queue_stats (puuid, queue_id, {metrics})
+                SELECT p.puuid, m.queue_id, {_SUMS}
+                FROM participants p JOIN matches m ON m.game_id = p.game_id
+                WHERE p.puuid <> ''
+                GROUP BY p.puuid, m.queue_id
+            """)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def _with_derived(row: dict) -> dict:
+    games = row["games"] or 0
+    minutes = (row["duration_sec"] or 0) / 60
+    row["winrate"] = row["wins"] / games if games else 0.0
+    row["kda"] = (row["kills"] + row["assists"]) / max(row["deaths"], 1)
+    row["cs_per_min"] = row["cs"] / minutes if minutes else 0.0
+    row["vision_per_game"] = row["vision_score"] / games if games else 0.0
+    return row
+
+def _fetch_dicts(conn, sql, params):
+    with conn.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [d[0] for d in cursor.description]
+        return [_with_derived(dict(zip(columns, row))) for row in cursor.fetchall()]
+
+def get_champion_stats(conn, puuid: str, queue_id=None, champion_id=None):
+    # 主键前缀查找，耗时与历史场数无关
+    sql = "SELECT * FROM player_champion_stats WHERE puuid = %s"
+    params = [puuid]
+    if champion_id is not None:
+        sql += " AND champion_id = %s"
+        params.append(champion_id)
+    if queue_id is not None:
+        sql += " AND queue_id = %s"
+        params.append(queue_id)
+    return _fetch_dicts(conn, sql + " ORDER BY games DESC", params)
+
+def get_queue_stats(conn, puuid: str, queue_id=None):
+    sql = "SELECT * FROM player_queue_stats WHERE puuid = %s"
+    params = [puuid]
+    if queue_id is not None:
+        sql += " AND queue_id = %s"
+        params.append(queue_id)
+    return _fetch_dicts(conn, sql, params)
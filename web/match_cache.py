@@ -0,0 +1,107 @@
+# match_cache.py（match detail 原始 JSON 本地缓存：gzip 压缩、按内容寻址、gameId 索引）
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+CACHE_DIR = os.path.join("cache", "matches")
+INDEX_FILE = "index.ndjson"
+
+
+class MatchCache:
+    """原始 payload 存在 objects/<sha256[:2]>/<sha256[2:]>.json.gz，
+    index.ndjson 逐行追加 {gameId, sha256, size, stored_at}，同一 gameId 以最后一行为准。"""
+
+    def __init__(self, root=CACHE_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, INDEX_FILE)
+        self._index = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self) -> dict:
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._load_index()
+        return self._index
+
+    def _load_index(self) -> dict:
+        index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # 进程中断可能留下半行，忽略即可
+                        continue
+                    index[entry["gameId"]] = entry
+        return index
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest[2:] + ".json.gz")
+
+    def __contains__(self, game_id) -> bool:
+        return game_id in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def game_ids(self):
+        return list(self.index)
+
+    def put(self, detail: dict) -> str:
+        payload = {k: v for k, v in detail.items() if k != "__fallback"}
+        raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+                f.write(raw)
+            os.replace(tmp_path, path)
+
+        game_id = payload["gameId"]
+        index = self.index
+        with self._lock:
+            if index.get(game_id, {}).get("sha256") == digest:
+                return digest
+            entry = {"gameId": game_id, "sha256": digest, "size": len(raw), "stored_at": int(time.time())}
+            os.makedirs(self.root, exist_ok=True)
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            index[game_id] = entry
+        return digest
+
+    def get(self, game_id):
+        entry = self.index.get(game_id)
+        if entry is None:
+            return None
+        with gzip.open(self._blob_path(entry["sha256"]), "rb") as f:
+            return json.loads(f.read())
+
+    def iter_details(self):
+        for game_id in self.game_ids():
+            detail = self.get(game_id)
+            if detail is not None:
+                yield detail
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_match_cache() -> MatchCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = MatchCache()
+        return _cache
@@ -0,0 +1,103 @@
+# match_queries.py（常用查询：参数化 SQL + EXPLAIN 回归检查，防止退化为全表扫描）
+
+import sys
+from web.match_storage import connect_mysql
+
+RECENT_GAMES_SQL = """
+    SELECT m.game_id, m.game_creation, m.queue_id, m.duration_sec,
+           p.champion_id, p.kills, p.deaths, p.assists, p.win
+    FROM participants p
+    JOIN matches m ON m.game_id = p.game_id
+    WHERE p.puuid = %s
+    ORDER BY p.game_id DESC
+    LIMIT %s
+"""
+
+HEAD_TO_HEAD_SQL = """
+    SELECT m.game_id, m.game_creation, m.queue_id,
+           a.champion_id, b.champion_id AS other_champion_id,
+           a.team_id = b.team_id AS same_team, a.win
+    FROM participants a
+    JOIN participants b ON b.game_id = a.game_id AND b.puuid = %s
+    JOIN matches m ON m.game_id = a.game_id
+    WHERE a.puuid = %s
+    ORDER BY a.game_id DESC
+    LIMIT %s
+"""
+
+CHAMPION_HISTORY_SQL = """
+    SELECT m.game_id, m.game_creation, m.queue_id, m.duration_sec,
+           p.kills, p.deaths, p.assists, p.minions_killed, p.jungle_cs, p.gold_earned, p.win
+    FROM participants p
+    JOIN matches m ON m.game_id = p.game_id
+    WHERE p.puuid = %s AND p.champion_id = %s
+    ORDER BY p.game_id DESC
+    LIMIT %s
+"""
+
+
+def _fetch_dicts(conn, sql, params):
+    with conn.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [d[0] for d in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def recent_games(conn, puuid: str, limit=20):
+    return _fetch_dicts(conn, RECENT_GAMES_SQL, (puuid, limit))
+
+def head_to_head(conn, puuid: str, other_puuid: str, limit=50):
+    return _fetch_dicts(conn, HEAD_TO_HEAD_SQL, (other_puuid, puuid, limit))
+
+def champion_history(conn, puuid: str, champion_id: int, limit=50):
+    return _fetch_dicts(conn, CHAMPION_HISTORY_SQL, (puuid, champion_id, limit))
+
+# ----------------- EXPLAIN 回归检查 -----------------
+
+def explain(conn, sql, params):
+    return _fetch_dicts(conn, "EXPLAIN " + sql, params)
+
+def find_table_scans(plan) -> list:
+    # SQLite 的 EXPLAIN QUERY PLAN 每行只有 detail：SCAN 且未使用索引即为全表扫描
+    if plan and "detail" in plan[0]:
+        return [
+            row["detail"] for row in plan
+            if row["detail"].startswith("SCAN") and "INDEX" not in row["detail"]
+        ]
+    # type=ALL 或未使用任何索引即视为全表扫描
+    return [
+        f"{row.get('table')}: type={row.get('type')} key={row.get('key')}"
+        for row in plan
+        if row.get("table") and (row.get("type") == "ALL" or row.get("key") is None)
+    ]
+
+def _sample_params(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT puuid, champion_id FROM participants WHERE puuid <> '' LIMIT 1")
+        row = cursor.fetchone()
+    return row if row else ("0" * 36, 1)
+
+def check_query_plans(conn) -> dict:
+    """对每个查询执行 EXPLAIN，返回 {查询名: 全表扫描描述列表}，列表为空表示通过。"""
+    puuid, champion_id = _sample_params(conn)
+    checks = {
+        "recent_games": (RECENT_GAMES_SQL, (puuid, 20)),
+        "head_to_head": (HEAD_TO_HEAD_SQL, (puuid, puuid, 50)),
+        "champion_history": (CHAMPION_HISTORY_SQL, (puuid, champion_id, 50)),
+    }
+    return {name: find_table_scans(explain(conn, sql, params)) for name, (sql, params) in checks.items()}
+
+if __name__ == "__main__":
+    conn = connect_mysql()
+    try:
+        results = check_query_plans(conn)
+    finally:
+        conn.close()
+
+    failed = False
+    for name, scans in results.items():
+        if scans:
+            failed = True
+            print(f"❌ {name} falls back to a table scan: {'; '.join(scans)}")
+        else:
+            print(f"✅ {name} uses indexes")
+    sys.exit(1 if failed else 0)
@@ -1,30 +1,31 @@
 import pymysql
 import json
+import logging
+import threading
+import time
 from datetime import datetime
+from itertools import islice
+from web.metrics import metrics
+from web.known_entities import get_known_entities
+# connect_mysql 从共享连接池借出连接，其它模块沿用 web.match_storage 的导入路径
+from web.db_pool import connect_mysql
 
-DB_NAME = "lol_stats"
-DB_USER = "lol_user"
-DB_PASS = "lol_pass"
-DB_HOST = "localhost"
-DB_PORT = 3306
+logger = logging.getLogger(__name__)
 
-def connect_mysql():
-    try:
-        conn = pymysql.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            user=DB_USER,
-            password=DB_PASS,
-            charset="utf8mb4",
-            autocommit=True
-        )
-        with conn.cursor() as cursor:
-            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME} DEFAULT CHARSET utf8mb4")
-        conn.select_db(DB_NAME)
-        return conn
-    except Exception as e:
-        print(f"❌ 数据库初始化失败: {e}")
-        raise
+AGGREGATE_METRICS = (
+    "games", "wins", "kills", "deaths", "assists", "cs",
+    "duration_sec", "vision_score", "gold_earned", "dmg_total",
+)
+# 汇总表的键列与主键；主键写在列定义之后（SQLite 要求表约束位于所有列之后）
+AGGREGATE_KEYS = {
+    "player_champion_stats": ("""
+                puuid CHAR(36),
+                champion_id SMALLINT,
+                queue_id INT""", "puuid, champion_id, queue_id"),
+    "player_queue_stats": ("""
+                puuid CHAR(36),
+                queue_id INT""", "puuid, queue_id"),
+}
 
 def init_tables_if_missing(conn):
     cursor = conn.cursor()
@@ -132,13 +133,223 @@ def init_tables_if_missing(conn):
         )
     """)
 
+    # 汇总表：随 insert_match_json 在同一事务内增量更新，查询无需扫描 participants
+    for table, (key_ddl, primary_key) in AGGREGATE_KEYS.items():
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {key_ddl},
+                games INT NOT NULL DEFAULT 0,
+                wins INT NOT NULL DEFAULT 0,
+                kills INT NOT NULL DEFAULT 0,
+                deaths INT NOT NULL DEFAULT 0,
+                assists INT NOT NULL DEFAULT 0,
+                cs INT NOT NULL DEFAULT 0,
+                duration_sec BIGINT NOT NULL DEFAULT 0,
+                vision_score INT NOT NULL DEFAULT 0,
+                gold_earned BIGINT NOT NULL DEFAULT 0,
+                dmg_total BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY ({primary_key})
+            )
+        """)
+
     conn.commit()
+    migrate_schema(conn)
 
-def insert_match_json(match_json: dict, conn, is_fallback=False):
-    game_id = match_json["gameId"]
-    game_creation = datetime.fromisoformat(
+# ----------------- 结构迁移: 按版本执行，记录在 schema_version 表 -----------------
+
+SCHEMA_MIGRATIONS = [
+    (1, [
+        # 覆盖 puuid 最近比赛 / 双人同场查询，同时满足 participants.puuid 外键
+        "CREATE INDEX idx_participants_puuid_game ON participants (puuid, game_id, team_id, champion_id, win)",
+        # 英雄历史
+        "CREATE INDEX idx_participants_puuid_champion ON participants (puuid, champion_id, game_id)",
+        "CREATE INDEX idx_matches_creation ON matches (game_creation)",
+        "CREATE INDEX idx_matches_queue_creation ON matches (queue_id, game_creation)",
+    ]),
+    (2, [
+        # 时间线：每场一行事件数组，每个参与者一行帧数组（均为差分 + zlib 压缩的 int32 矩阵）
+        """
+        CREATE TABLE IF NOT EXISTS match_timelines (
+            game_id BIGINT PRIMARY KEY,
+            format_version SMALLINT,
+            frame_interval_ms INT,
+            n_frames SMALLINT,
+            n_events INT,
+            events MEDIUMBLOB,
+            FOREIGN KEY (game_id) REFERENCES matches(game_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS timeline_frames (
+            game_id BIGINT,
+            participant_id SMALLINT,
+            n_frames SMALLINT,
+            frames BLOB,
+            PRIMARY KEY (game_id, participant_id),
+            FOREIGN KEY (game_id) REFERENCES matches(game_id)
+        )
+        """,
+    ]),
+    (3, [
+        # 多玩家抓取的边界与进度（web/crawler.py），中断后从这里续跑
+        """
+        CREATE TABLE IF NOT EXISTS crawl_frontier (
+            puuid CHAR(36) PRIMARY KEY,
+            priority DOUBLE,
+            status VARCHAR(8),
+            pages_done INT,
+            games_found INT,
+            games_new INT,
+            updated_at DATETIME,
+            FOREIGN KEY (puuid) REFERENCES players(puuid)
+        )
+        """,
+        "CREATE INDEX idx_crawl_frontier_status_priority ON crawl_frontier (status, priority)",
+    ]),
+    (4, [
+        # 翻页失败次数：失败的玩家放回 pending，达到上限后标记为 failed 不再自动重试
+        "ALTER TABLE crawl_frontier ADD COLUMN failures INT NOT NULL DEFAULT 0",
+    ]),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+# MySQL 错误码：索引名已存在（手工建过或上次迁移中途失败）
+ER_DUP_KEYNAME = 1061
+
+def get_schema_version(conn) -> int:
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INT PRIMARY KEY,
+                applied_at DATETIME
+            )
+        """)
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        row = cursor.fetchone()
+    return (row[0] or 0) if row else 0
+
+def migrate_schema(conn):
+    current = get_schema_version(conn)
+    for version, statements in SCHEMA_MIGRATIONS:
+        if version <= current:
+            continue
+        with conn.cursor() as cursor:
+            for statement in statements:
+                try:
+                    cursor.execute(statement)
+                except pymysql.err.OperationalError as e:
+                    if e.args[0] != ER_DUP_KEYNAME:
+                        raise
+            cursor.execute(
+                "INSERT INTO schema_version (version, applied_at) VALUES (%s, %s)",
+                (version, datetime.now()),
+            )
+        conn.commit()
+        print(f"✅ Schema migrated to version {version}")
+
+def read_schema_version(conn) -> int:
+    """只读检查：schema_version 表不存在（全新数据库）时返回 0，不执行任何 DDL。"""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT MAX(version) FROM schema_version")
+            row = cursor.fetchone()
+    except Exception:
+        conn.rollback()
+        return 0
+    return (row[0] or 0) if row else 0
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def ensure_schema(conn=None) -> bool:
+    """启动与入库前调用：版本已是最新时只执行一次 SELECT，否则建表并迁移。返回是否执行了 DDL。
+
+    检查通过后顺带预热已知实体缓存；同一进程内不再重复。conn 为 None 时从连接池借用。
+    """
+    global _schema_ready
+    if _schema_ready:
+        return False
+    with _schema_lock:
+        if _schema_ready:
+            return False
+        own_conn = conn is None
+        conn = conn or connect_mysql()
+        try:
+            changed = read_schema_version(conn) < SCHEMA_VERSION
+            if changed:
+                init_tables_if_missing(conn)
+            try:
+                warmed = get_known_entities().warm(conn)
+                logger.info("Known-entity cache warmed: %(puuids)d players, %(games)d games", warmed)
+            except Exception as e:
+                conn.rollback()
+                logger.warning("Failed to warm known-entity cache: %s", e)
+        finally:
+            if own_conn:
+                conn.close()
+        _schema_ready = True
+        return changed
+
+MATCH_COLUMNS = (
+    "game_id", "game_creation", "duration_sec", "queue_id", "map_id",
+    "game_mode", "game_type", "game_version", "is_fallback",
+)
+
+TEAM_COLUMNS = (
+    "game_id", "team_id", "win", "first_blood", "first_tower", "first_dragon", "first_baron",
+    "first_inhibitor", "first_rift_herald",
+    "tower_kills", "inhibitor_kills", "dragon_kills", "baron_kills", "rift_herald_kills", "bans",
+)
+
+PLAYER_COLUMNS = ("puuid", "summoner_name", "tag_line", "platform_id", "profile_icon")
+
+PARTICIPANT_COLUMNS = (
+    "game_id", "participant_id", "puuid", "team_id", "champion_id",
+    "spell1_id", "spell2_id", "lane", "role", "champ_level",
+    "kills", "deaths", "assists", "dmg_total", "dmg_magic", "dmg_phys", "dmg_true",
+    "taken_total", "taken_magic", "taken_phys", "taken_true",
+    "heal_total", "units_healed", "shield_teammates", "cc_time_sec",
+    "vision_score", "wards_placed", "wards_killed", "detector_wards",
+    "gold_earned", "gold_spent", "minions_killed", "jungle_cs",
+    "item0", "item1", "item2", "item3", "item4", "item5", "item6",
+    "primary_style_id", "sub_style_id",
+    "perk0", "perk1", "perk2", "perk3", "perk4", "perk5",
+    "stat_perk0", "stat_perk1", "stat_perk2",
+    "win",
+)
+
+# 写入顺序需满足外键依赖：matches -> teams -> players -> participants
+TABLE_COLUMNS = {
+    "matches": MATCH_COLUMNS,
+    "teams": TEAM_COLUMNS,
+    "players": PLAYER_COLUMNS,
+    "participants": PARTICIPANT_COLUMNS,
+}
+
+# 批量入库时每个事务包含的比赛数
+DEFAULT_BATCH_SIZE = 200
+
+def _insert_sql(table: str, columns) -> str:
+    placeholders = ", ".join(["%s"] * len(columns))
+    return f"INSERT IGNORE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+INSERT_SQL = {table: _insert_sql(table, cols) for table, cols in TABLE_COLUMNS.items()}
+
+def parse_game_creation(match_json: dict) -> datetime:
+    return datetime.fromisoformat(
         match_json.get("gameCreationDate", "2000-01-01T00:00:00Z").replace("Z", "+00:00")
     )
+
+def build_match_rows(match_json: dict, is_fallback=False) -> dict:
+    """把一场比赛的 JSON 展平为按表分组的行元组，列顺序与 TABLE_COLUMNS 一致。"""
+    game_id = match_json["gameId"]
+    rows = {table: [] for table in TABLE_COLUMNS}
+    # 已完整入库的比赛不再生成任何行；已知玩家不再生成 players 行
+    known = get_known_entities()
+    if known.has_game(game_id):
+        return rows
+
+    game_creation = parse_game_creation(match_json)
     duration = match_json.get("gameDuration", 0)
     mode = match_json.get("gameMode", "")
     gtype = match_json.get("gameType", "")
@@ -146,105 +357,264 @@ def insert_match_json(match_json: dict, conn, is_fallback=False):
     map_id = match_json.get("mapId", 0)
     version = match_json.get("gameVersion", "")
 
-    with conn.cursor() as cursor:
-        cursor.execute("""
-            INSERT IGNORE INTO matches (
-                game_id, game_creation, duration_sec, queue_id, map_id,
-                game_mode, game_type, game_version, is_fallback
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (game_id, game_creation, duration, queue_id, map_id, mode, gtype, version, is_fallback))
-
-        for t in match_json.get("teams", []):
-            cursor.execute("""
-                INSERT IGNORE INTO teams (
-                    game_id, team_id, win, first_blood, first_tower, first_dragon, first_baron,
-                    first_inhibitor, first_rift_herald,
-                    tower_kills, inhibitor_kills, dragon_kills, baron_kills, rift_herald_kills, bans
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                game_id, t.get("teamId"), t.get("win") == "Win",
-                t.get("firstBlood"), t.get("firstTower"), t.get("firstDargon", False), t.get("firstBaron", False),
-                t.get("firstInhibitor", False), t.get("firstRiftHerald", False),
-                t.get("towerKills", 0), t.get("inhibitorKills", 0), t.get("dragonKills", 0),
-                t.get("baronKills", 0), t.get("riftHeraldKills", 0), json.dumps(t.get("bans", []))
+    rows["matches"].append(
+        (game_id, game_creation, duration, queue_id, map_id, mode, gtype, version, is_fallback)
+    )
+
+    for t in match_json.get("teams", []):
+        rows["teams"].append((
+            game_id, t.get("teamId"), t.get("win") == "Win",
+            t.get("firstBlood"), t.get("firstTower"), t.get("firstDargon", False), t.get("firstBaron", False),
+            t.get("firstInhibitor", False), t.get("firstRiftHerald", False),
+            t.get("towerKills", 0), t.get("inhibitorKills", 0), t.get("dragonKills", 0),
+            t.get("baronKills", 0), t.get("riftHeraldKills", 0), json.dumps(t.get("bans", []))
+        ))
+
+    puuid_map = {
+        ident["participantId"]: ident["player"]
+        for ident in match_json.get("participantIdentities", [])
+    }
+
+    for p in match_json.get("participants", []):
+        stats = p.get("stats", {})
+        timeline = p.get("timeline", {})
+        participant_id = p.get("participantId")
+        player = puuid_map.get(participant_id, {})
+
+        puuid = player.get("puuid", "")
+        if puuid and not known.has_puuid(puuid):
+            rows["players"].append((
+                puuid,
+                player.get("summonerName", ""),
+                player.get("tagLine", ""),
+                player.get("platformId", ""),
+                player.get("profileIcon", 0)
             ))
 
-        puuid_map = {
-            ident["participantId"]: ident["player"]
-            for ident in match_json.get("participantIdentities", [])
-        }
-
-        for p in match_json.get("participants", []):
-            stats = p.get("stats", {})
-            timeline = p.get("timeline", {})
-            participant_id = p.get("participantId")
-            player = puuid_map.get(participant_id, {})
-
-            puuid = player.get("puuid", "")
-            if puuid:
-                cursor.execute("""
-                    INSERT IGNORE INTO players (puuid, summoner_name, tag_line, platform_id, profile_icon)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (
-                    puuid,
-                    player.get("summonerName", ""),
-                    player.get("tagLine", ""),
-                    player.get("platformId", ""),
-                    player.get("profileIcon", 0)
-                ))
-
-            args = (
-                game_id, participant_id, puuid,
-                p.get("teamId"), p.get("championId"), p.get("spell1Id"), p.get("spell2Id"),
-                timeline.get("lane", ""), timeline.get("role", ""), stats.get("champLevel", 0),
-                stats.get("kills", 0), stats.get("deaths", 0), stats.get("assists", 0),
-                stats.get("totalDamageDealtToChampions", 0), stats.get("magicDamageDealtToChampions", 0),
-                stats.get("physicalDamageDealtToChampions", 0), stats.get("trueDamageDealtToChampions", 0),
-                stats.get("totalDamageTaken", 0), stats.get("magicalDamageTaken", 0),
-                stats.get("physicalDamageTaken", 0), stats.get("trueDamageTaken", 0),
-                stats.get("totalHeal", 0), stats.get("totalUnitsHealed", 0),
-                stats.get("totalShieldedOnTeammates", 0), stats.get("timeCCingOthers", 0),
-                stats.get("visionScore", 0), stats.get("wardsPlaced", 0), stats.get("wardsKilled", 0),
-                stats.get("visionWardsBoughtInGame", 0),
-                stats.get("goldEarned", 0), stats.get("goldSpent", 0), stats.get("totalMinionsKilled", 0),
-                stats.get("neutralMinionsKilled", 0),
-                stats.get("item0", 0), stats.get("item1", 0), stats.get("item2", 0),
-                stats.get("item3", 0), stats.get("item4", 0), stats.get("item5", 0), stats.get("item6", 0),
-                stats.get("perkPrimaryStyle", 0), stats.get("perkSubStyle", 0),
-                stats.get("perk0", 0), stats.get("perk1", 0), stats.get("perk2", 0),
-                stats.get("perk3", 0), stats.get("perk4", 0), stats.get("perk5", 0),
-                stats.get("statPerk0", 0), stats.get("statPerk1", 0), stats.get("statPerk2", 0),
-                stats.get("win", False)
-            )
+        rows["participants"].append((
+            game_id, participant_id, puuid,
+            p.get("teamId"), p.get("championId"), p.get("spell1Id"), p.get("spell2Id"),
+            timeline.get("lane", ""), timeline.get("role", ""), stats.get("champLevel", 0),
+            stats.get("kills", 0), stats.get("deaths", 0), stats.get("assists", 0),
+            stats.get("totalDamageDealtToChampions", 0), stats.get("magicDamageDealtToChampions", 0),
+            stats.get("physicalDamageDealtToChampions", 0), stats.get("trueDamageDealtToChampions", 0),
+            stats.get("totalDamageTaken", 0), stats.get("magicalDamageTaken", 0),
+            stats.get("physicalDamageTaken", 0), stats.get("trueDamageTaken", 0),
+            stats.get("totalHeal", 0), stats.get("totalUnitsHealed", 0),
+            stats.get("totalShieldedOnTeammates", 0), stats.get("timeCCingOthers", 0),
+            stats.get("visionScore", 0), stats.get("wardsPlaced", 0), stats.get("wardsKilled", 0),
+            stats.get("visionWardsBoughtInGame", 0),
+            stats.get("goldEarned", 0), stats.get("goldSpent", 0), stats.get("totalMinionsKilled", 0),
+            stats.get("neutralMinionsKilled", 0),
+            stats.get("item0", 0), stats.get("item1", 0), stats.get("item2", 0),
+            stats.get("item3", 0), stats.get("item4", 0), stats.get("item5", 0), stats.get("item6", 0),
+            stats.get("perkPrimaryStyle", 0), stats.get("perkSubStyle", 0),
+            stats.get("perk0", 0), stats.get("perk1", 0), stats.get("perk2", 0),
+            stats.get("perk3", 0), stats.get("perk4", 0), stats.get("perk5", 0),
+            stats.get("statPerk0", 0), stats.get("statPerk1", 0), stats.get("statPerk2", 0),
+            stats.get("win", False)
+        ))
 
-            cursor.execute("""
-                INSERT IGNORE INTO participants (
-                    game_id, participant_id, puuid, team_id, champion_id,
-                    spell1_id, spell2_id, lane, role, champ_level,
-                    kills, deaths, assists, dmg_total, dmg_magic, dmg_phys, dmg_true,
-                    taken_total, taken_magic, taken_phys, taken_true,
-                    heal_total, units_healed, shield_teammates, cc_time_sec,
-                    vision_score, wards_placed, wards_killed, detector_wards,
-                    gold_earned, gold_spent, minions_killed, jungle_cs,
-                    item0, item1, item2, item3, item4, item5, item6,
-                    primary_style_id, sub_style_id,
-                    perk0, perk1, perk2, perk3, perk4, perk5,
-                    stat_perk0, stat_perk1, stat_perk2,
-                    win
-                ) VALUES (
-                    %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s,
-                    %s, %s, %s, %s,
-                    %s, %s, %s, %s,
-                    %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s, %s, %s,
-                    %s, %s,
-                    %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s,
-                    %s
-                )
-            """, args)
+    return rows
 
-    conn.commit()
+def merge_rows(target: dict, rows: dict):
+    for table, table_rows in rows.items():
+        target.setdefault(table, []).extend(table_rows)
+    return target
+
+def _existing_participants(cursor, rows: dict) -> set:
+    # 写入前锁定并读取已存在的 (game_id, participant_id)，INSERT IGNORE 跳过的行不计入汇总
+    game_ids = list({row[0] for row in rows.get("participants", ())})
+    if not game_ids:
+        return set()
+    placeholders = ", ".join(["%s"] * len(game_ids))
+    with metrics.timer("db_statement_seconds", table="participants", op="select"):
+        cursor.execute(
+            f"SELECT game_id, participant_id FROM participants WHERE game_id IN ({placeholders}) FOR UPDATE",
+            game_ids,
+        )
+    return {(row[0], row[1]) for row in cursor.fetchall()}
+
+def _aggregate_deltas(rows: dict, existing: set):
+    matches = {row[0]: row for row in rows.get("matches", ())}
+    queue_idx, duration_idx = MATCH_COLUMNS.index("queue_id"), MATCH_COLUMNS.index("duration_sec")
+    col = {name: i for i, name in enumerate(PARTICIPANT_COLUMNS)}
+
+    champion_deltas, queue_deltas = {}, {}
+    seen = set(existing)
+    for p in rows.get("participants", ()):
+        key = (p[col["game_id"]], p[col["participant_id"]])
+        puuid = p[col["puuid"]]
+        match = matches.get(key[0])
+        # 外键会拒绝的行已在 write_rows 中过滤，同一批内重复的行只计一次
+        if key in seen or not puuid or match is None:
+            continue
+        seen.add(key)
+
+        values = (
+            1, int(bool(p[col["win"]])), p[col["kills"]] or 0, p[col["deaths"]] or 0, p[col["assists"]] or 0,
+            (p[col["minions_killed"]] or 0) + (p[col["jungle_cs"]] or 0),
+            match[duration_idx] or 0, p[col["vision_score"]] or 0, p[col["gold_earned"]] or 0,
+            p[col["dmg_total"]] or 0,
+        )
+        queue_id, champion_id = match[queue_idx], p[col["champion_id"]]
+        targets = [(queue_deltas, (puuid, queue_id))]
+        if champion_id is not None:
+            targets.append((champion_deltas, (puuid, champion_id, queue_id)))
+        for deltas, agg_key in targets:
+            current = deltas.get(agg_key)
+            deltas[agg_key] = values if current is None else tuple(a + b for a, b in zip(current, values))
+    return champion_deltas, queue_deltas
+
+def _upsert_sql(table: str, key_columns) -> str:
+    columns = tuple(key_columns) + AGGREGATE_METRICS
+    placeholders = ", ".join(["%s"] * len(columns))
+    updates = ", ".join(f"{m} = {m} + VALUES({m})" for m in AGGREGATE_METRICS)
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) ON DUPLICATE KEY UPDATE {updates}"
+
+AGGREGATE_UPSERT_SQL = {
+    "player_champion_stats": _upsert_sql("player_champion_stats", ("puuid", "champion_id", "queue_id")),
+    "player_queue_stats": _upsert_sql("player_queue_stats", ("puuid", "queue_id")),
+}
+
+_PUUID_IDX = PARTICIPANT_COLUMNS.index("puuid")
+_GAME_IDX = PARTICIPANT_COLUMNS.index("game_id")
+_TEAM_IDX = PARTICIPANT_COLUMNS.index("team_id")
+_FALLBACK_IDX = MATCH_COLUMNS.index("is_fallback")
+
+def _insertable_participants(cursor, rows: dict) -> list:
+    """过滤会被外键拒绝的参与者：没有 puuid，或 (game_id, team_id) 在 teams 中不存在（fallback 摘要没有 teams 行）。
+
+    MySQL 的 INSERT IGNORE 会静默跳过这些行，汇总增量只能按真正写入的行计算，否则与 rebuild_aggregates 不一致。
+    """
+    participants = rows.get("participants", ())
+    teams = {(t[0], t[1]) for t in rows.get("teams", ())}
+    # team_id 为 NULL 时复合外键不做检查
+    missing = {p[_GAME_IDX] for p in participants
+               if p[_TEAM_IDX] is not None and (p[_GAME_IDX], p[_TEAM_IDX]) not in teams}
+    if missing:
+        game_ids = list(missing)
+        placeholders = ", ".join(["%s"] * len(game_ids))
+        with metrics.timer("db_statement_seconds", table="teams", op="select"):
+            cursor.execute(f"SELECT game_id, team_id FROM teams WHERE game_id IN ({placeholders})", game_ids)
+        teams.update((row[0], row[1]) for row in cursor.fetchall())
+    return [
+        p for p in participants
+        if p[_PUUID_IDX] and (p[_TEAM_IDX] is None or (p[_GAME_IDX], p[_TEAM_IDX]) in teams)
+    ]
+
+def write_rows(cursor, rows: dict) -> int:
+    # 提前过滤外键会拒绝的参与者，使 MySQL / SQLite 结果一致，且不计入汇总
+    participants = _insertable_participants(cursor, rows)
+    if len(participants) != len(rows.get("participants", ())):
+        rows = dict(rows, participants=participants)
+    existing = _existing_participants(cursor, rows)
+
+    # pymysql 会把 INSERT ... VALUES 的 executemany 改写为多行 INSERT
+    written = 0
+    for table in TABLE_COLUMNS:
+        table_rows = rows.get(table)
+        if table_rows:
+            with metrics.timer("db_statement_seconds", table=table, op="insert"):
+                cursor.executemany(INSERT_SQL[table], table_rows)
+            metrics.inc("db_rows_total", len(table_rows), table=table)
+            written += len(table_rows)
+
+    # IngestPipeline 合并进来的时间线行，外键依赖 matches，放在比赛行之后
+    if rows.get("match_timelines") or rows.get("timeline_frames"):
+        from web.match_timeline import write_timeline_rows
+        write_timeline_rows(cursor, rows)
+
+    champion_deltas, queue_deltas = _aggregate_deltas(rows, existing)
+    for table, deltas in (("player_champion_stats", champion_deltas), ("player_queue_stats", queue_deltas)):
+        if deltas:
+            with metrics.timer("db_statement_seconds", table=table, op="upsert"):
+                cursor.executemany(AGGREGATE_UPSERT_SQL[table], [key + values for key, values in deltas.items()])
+    return written
+
+def write_rows_batch(conn, rows: dict) -> int:
+    # 一个事务写入多场比赛合并后的行
+    conn.begin()
+    try:
+        with conn.cursor() as cursor:
+            written = write_rows(cursor, rows)
+        with metrics.timer("db_commit_seconds"):
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    # 提交之后才登记为已知，回滚的批次下次仍会写入
+    get_known_entities().record_committed(rows, _FALLBACK_IDX)
+    return written
+
+def insert_match_json(match_json: dict, conn, is_fallback=False):
+    # 明细行与汇总表在同一事务内写入
+    with metrics.timer("row_build_seconds"):
+        rows = build_match_rows(match_json, is_fallback=is_fallback)
+    write_rows_batch(conn, rows)
+
+def insert_matches_bulk(matches, conn, batch_size=DEFAULT_BATCH_SIZE, verbose=True):
+    """批量入库：每 batch_size 场比赛一个事务，各表使用多行 INSERT。
+
+    matches 中每项为 match detail dict，`__fallback` 字段决定 is_fallback，
+    与逐场调用 insert_match_json(detail, conn, is_fallback=detail["__fallback"]) 的结果一致。
+    """
+    total_matches = 0
+    total_rows = 0
+    started = time.perf_counter()
+    # 按批消费可迭代对象，回放大量缓存时不必整体载入内存
+    matches = iter(matches)
+
+    while True:
+        batch = list(islice(matches, batch_size))
+        if not batch:
+            break
+        total_matches += len(batch)
+        rows = {table: [] for table in TABLE_COLUMNS}
+        with metrics.timer("row_build_seconds"):
+            for match_json in batch:
+                merge_rows(rows, build_match_rows(match_json, is_fallback=match_json.get("__fallback", False)))
+
+        total_rows += write_rows_batch(conn, rows)
+
+    elapsed = time.perf_counter() - started
+    rows_per_sec = total_rows / elapsed if elapsed > 0 else 0.0
+    if verbose:
+        print(f"[INFO] 批量入库 {total_matches} 场比赛，{total_rows} 行，"
+              f"耗时 {elapsed:.2f}s（{rows_per_sec:,.0f} rows/s）")
+
+    return {
+        "matches": total_matches,
+        "rows": total_rows,
+        "seconds": elapsed,
+        "rows_per_sec": rows_per_sec,
+    }
+
+# ----------------- 增量同步: 已入库比赛查询 -----------------
+
+def get_stored_game_ids(conn, game_ids) -> set:
+    game_ids = [gid for gid in game_ids if gid is not None]
+    if not game_ids:
+        return set()
+    placeholders = ", ".join(["%s"] * len(game_ids))
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT game_id FROM matches WHERE game_id IN ({placeholders})", game_ids)
+        return {row[0] for row in cursor.fetchall()}
+
+def get_high_water_mark(conn, puuid: str):
+    """返回该 puuid 已入库比赛中最新的 (game_creation, game_id)，没有记录时为 (None, None)。"""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT MAX(m.game_creation), MAX(m.game_id)
+            FROM matches m
+            JOIN participants p ON p.game_id = m.game_id
+            WHERE p.puuid = %s
+        """, (puuid,))
+        row = cursor.fetchone()
+    if not row:
+        return None, None
+    creation = row[0]
+    # SQLite 的聚合结果没有列类型，MAX(DATETIME) 以字符串返回
+    if isinstance(creation, str):
+        creation = datetime.fromisoformat(creation)
+    return creation, row[1]
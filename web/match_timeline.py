@@ -0,0 +1,184 @@
+# match_timeline.py（比赛时间线：每分钟金币 / 经验 / 补刀帧与事件，按 (比赛, 参与者) 存为压缩的定宽数组）
+
+import zlib
+import numpy as np
+from web.metrics import metrics
+
+# 帧数组格式版本，写入 match_timelines.format_version
+TIMELINE_FORMAT = 1
+
+# participantFrames 中保存的字段（列顺序即数组列顺序，修改后需提升 TIMELINE_FORMAT）
+FRAME_FIELDS = (
+    ("total_gold", "totalGold"),
+    ("current_gold", "currentGold"),
+    ("xp", "xp"),
+    ("level", "level"),
+    ("minions_killed", "minionsKilled"),
+    ("jungle_cs", "jungleMinionsKilled"),
+    ("x", None),
+    ("y", None),
+)
+FRAME_COLUMNS = {name: j for j, (name, _key) in enumerate(FRAME_FIELDS)}
+
+# 事件类型字典编码，未列出的类型记为 UNKNOWN
+EVENT_TYPES = (
+    "UNKNOWN", "CHAMPION_KILL", "BUILDING_KILL", "ELITE_MONSTER_KILL", "WARD_PLACED", "WARD_KILL",
+    "ITEM_PURCHASED", "ITEM_SOLD", "ITEM_DESTROYED", "ITEM_UNDO", "SKILL_LEVEL_UP",
+)
+EVENT_CODES = {name: code for code, name in enumerate(EVENT_TYPES)}
+EVENT_COLUMNS = ("timestamp_ms", "type", "participant_id", "killer_id", "victim_id", "x", "y")
+
+_ZLIB_LEVEL = 6
+
+
+# ----------------- 打包 / 解码 -----------------
+
+def pack_array(matrix) -> bytes:
+    """int32 矩阵按行做差分后 zlib 压缩：帧间累计值变化小，差分后压缩率高。"""
+    matrix = np.ascontiguousarray(matrix, dtype="<i4")
+    deltas = np.diff(matrix, axis=0, prepend=np.zeros((1, matrix.shape[1]), dtype="<i4"))
+    return zlib.compress(deltas.astype("<i4").tobytes(), _ZLIB_LEVEL)
+
+def unpack_array(blob: bytes, n_columns: int) -> np.ndarray:
+    deltas = np.frombuffer(zlib.decompress(blob), dtype="<i4").reshape(-1, n_columns)
+    return np.cumsum(deltas, axis=0, dtype=np.int32)
+
+def decode_frames(blob: bytes) -> np.ndarray:
+    """单个参与者的帧数组，形状 (n_frames, len(FRAME_FIELDS))，第 i 行为第 i 分钟。"""
+    return unpack_array(blob, len(FRAME_FIELDS))
+
+def decode_events(blob: bytes) -> np.ndarray:
+    return unpack_array(blob, len(EVENT_COLUMNS))
+
+def build_timeline_rows(game_id: int, timeline: dict) -> dict:
+    """把 game-timelines 的 JSON 转为 match_timelines / timeline_frames 两张表的行。"""
+    frames = timeline.get("frames") or []
+    by_participant = {}
+    for i, frame in enumerate(frames):
+        for pid_key, pf in (frame.get("participantFrames") or {}).items():
+            pid = int(pf.get("participantId") or pid_key)
+            rows = by_participant.setdefault(pid, np.zeros((len(frames), len(FRAME_FIELDS)), dtype=np.int32))
+            position = pf.get("position") or {}
+            rows[i] = [
+                position.get(name, 0) if key is None else (pf.get(key) or 0)
+                for name, key in FRAME_FIELDS
+            ]
+
+    events = []
+    for frame in frames:
+        for event in frame.get("events") or ():
+            position = event.get("position") or {}
+            events.append((
+                event.get("timestamp", 0), EVENT_CODES.get(event.get("type"), 0),
+                event.get("participantId") or event.get("creatorId") or 0,
+                event.get("killerId") or 0, event.get("victimId") or 0,
+                position.get("x", 0), position.get("y", 0),
+            ))
+    event_matrix = np.array(events, dtype=np.int32).reshape(-1, len(EVENT_COLUMNS))
+
+    interval = timeline.get("frameInterval") or 60000
+    return {
+        "match_timelines": [(game_id, TIMELINE_FORMAT, interval, len(frames), len(events), pack_array(event_matrix))],
+        "timeline_frames": [
+            (game_id, pid, len(frames), pack_array(matrix)) for pid, matrix in sorted(by_participant.items())
+        ],
+    }
+
+
+# ----------------- 入库 -----------------
+
+TIMELINE_INSERT_SQL = {
+    "match_timelines": "INSERT IGNORE INTO match_timelines "
+                       "(game_id, format_version, frame_interval_ms, n_frames, n_events, events) "
+                       "VALUES (%s, %s, %s, %s, %s, %s)",
+    "timeline_frames": "INSERT IGNORE INTO timeline_frames (game_id, participant_id, n_frames, frames) "
+                       "VALUES (%s, %s, %s, %s)",
+}
+
+def write_timeline_rows(cursor, rows: dict):
+    for table in ("match_timelines", "timeline_frames"):
+        if rows.get(table):
+            with metrics.timer("db_statement_seconds", table=table, op="insert"):
+                cursor.executemany(TIMELINE_INSERT_SQL[table], rows[table])
+
+def insert_timeline(conn, game_id, timeline: dict):
+    rows = build_timeline_rows(game_id, timeline)
+    conn.begin()
+    try:
+        with conn.cursor() as cursor:
+            write_timeline_rows(cursor, rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+# ----------------- 查询 -----------------
+
+def get_games_without_timeline(conn, limit=None) -> list:
+    """已完整入库（非 fallback）但没有 match_timelines 行的比赛，按 game_id 倒序，供回填时间线。"""
+    sql = ("SELECT m.game_id FROM matches m "
+           "LEFT JOIN match_timelines t ON t.game_id = m.game_id "
+           "WHERE t.game_id IS NULL AND m.is_fallback = 0 "
+           "ORDER BY m.game_id DESC")
+    params = []
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(limit)
+    with conn.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+def load_frames(conn, game_ids, participant_ids=None) -> dict:
+    """返回 {(game_id, participant_id): 帧数组}。"""
+    game_ids = list(game_ids)
+    if not game_ids:
+        return {}
+    sql = (f"SELECT game_id, participant_id, frames FROM timeline_frames "
+           f"WHERE game_id IN ({', '.join(['%s'] * len(game_ids))})")
+    params = list(game_ids)
+    if participant_ids is not None:
+        participant_ids = list(participant_ids)
+        sql += f" AND participant_id IN ({', '.join(['%s'] * len(participant_ids))})"
+        params.extend(participant_ids)
+    with conn.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {(row[0], row[1]): decode_frames(row[2]) for row in cursor.fetchall()}
+
+_LANE_OPPONENT_SQL = """
+    SELECT a.game_id, a.participant_id, b.participant_id
+    FROM participants a
+    JOIN participants b ON b.game_id = a.game_id AND b.team_id <> a.team_id
+                       AND b.lane = a.lane AND b.role = a.role
+    JOIN timeline_frames f ON f.game_id = a.game_id AND f.participant_id = a.participant_id
+    WHERE a.puuid = %s
+"""
+
+def stat_diff_at(conn, puuid: str, minute: int, field="total_gold") -> dict:
+    """该玩家每场比赛第 minute 分钟与对位（同 lane / role 的对方选手）的 field 差值：{game_id: diff}。
+
+    没有时间线、没有唯一对位或比赛不足 minute 分钟的场次不计入。
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(_LANE_OPPONENT_SQL, (puuid,))
+        pairs = cursor.fetchall()
+    # 同 lane / role 出现多名对手（如 lane 未识别）时无法确定对位
+    counts = {}
+    for game_id, _me, _opp in pairs:
+        counts[game_id] = counts.get(game_id, 0) + 1
+    pairs = [p for p in pairs if counts[p[0]] == 1]
+    if not pairs:
+        return {}
+
+    frames = load_frames(conn, {p[0] for p in pairs}, {pid for p in pairs for pid in p[1:]})
+    column = FRAME_COLUMNS[field]
+    diffs = {}
+    for game_id, me, opp in pairs:
+        mine, theirs = frames.get((game_id, me)), frames.get((game_id, opp))
+        if mine is None or theirs is None or minute >= min(len(mine), len(theirs)):
+            continue
+        diffs[game_id] = int(mine[minute, column]) - int(theirs[minute, column])
+    return diffs
+
+def gold_diff_at(conn, puuid: str, minute: int) -> dict:
+    return stat_diff_at(conn, puuid, minute, "total_gold")
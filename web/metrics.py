@@ -0,0 +1,165 @@
+# metrics.py（轻量指标：计时器 / 计数器，导出 Prometheus 文本格式；未启用时热路径只多一次属性判断）
+
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 环境变量：LOL_STAT_METRICS=1 启用采集；LOL_STAT_METRICS_PORT 暴露 /metrics；
+# LOL_STAT_METRICS_FILE 为 textfile collector 的输出路径
+ENV_ENABLED = "LOL_STAT_METRICS"
+ENV_PORT = "LOL_STAT_METRICS_PORT"
+ENV_FILE = "LOL_STAT_METRICS_FILE"
+
+# 耗时直方图分桶（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("_registry", "_key", "_started")
+
+    def __init__(self, registry, key):
+        self._registry = registry
+        self._key = key
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._registry._observe(self._key, time.perf_counter() - self._started)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.enabled = False
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    # ----------------- 采集 -----------------
+
+    def timer(self, name: str, **labels):
+        """with metrics.timer("lcu_request_seconds", endpoint="match_detail"): ..."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, (name, tuple(sorted(labels.items()))))
+
+    def observe(self, name: str, seconds: float, **labels):
+        if self.enabled:
+            self._observe((name, tuple(sorted(labels.items()))), seconds)
+
+    def inc(self, name: str, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def _observe(self, key, seconds: float):
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                # [各桶计数..., +Inf 计数, 总和]
+                hist = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            hist[bisect.bisect_left(self.buckets, seconds)] += 1
+            hist[-1] += seconds
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    # ----------------- 导出 -----------------
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: list(v) for k, v in self._histograms.items()}
+
+        lines = []
+        for name in sorted({k[0] for k in counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for name in sorted({k[0] for k in histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), hist in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), hist[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {hist[-1]:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int, host="127.0.0.1"):
+        """在后台线程提供 http://host:port/metrics。"""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{str(v)}"' for k, v in labels)
+    return "{" + body + "}"
+
+
+metrics = MetricsRegistry()
+
+def configure_from_env():
+    if os.environ.get(ENV_ENABLED, "").lower() in ("1", "true", "yes"):
+        metrics.enabled = True
+    port = os.environ.get(ENV_PORT)
+    if metrics.enabled and port:
+        metrics.serve(int(port))
+    return metrics
+
+def flush_textfile():
+    path = os.environ.get(ENV_FILE)
+    if metrics.enabled and path:
+        metrics.write_textfile(path)
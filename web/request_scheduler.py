@@ -0,0 +1,224 @@
+# request_scheduler.py（LCU 请求调度：瞬时错误重试 + 抖动退避，AIMD 自适应并发，按端点统计）
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from web.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 视为瞬时错误、值得重试的 HTTP 状态码（客户端繁忙 / 内部 RPC 超时）
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+DEFAULT_MAX_RETRIES = 3
+# 退避：第 n 次重试等待 uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2**n)) 秒（full jitter）
+BASE_BACKOFF = 0.2
+MAX_BACKOFF = 5.0
+# 单次请求（含读取响应体）超时
+REQUEST_TIMEOUT = 15.0
+
+# AIMD：无拥塞时每完成约 limit 个请求并发上限 +1；出错或延迟超过基线的 LATENCY_TOLERANCE 倍时减半
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 32
+INITIAL_CONCURRENCY = 4
+DECREASE_FACTOR = 0.5
+LATENCY_TOLERANCE = 3.0
+# 低于该值的延迟不视为拥塞（本地回环请求的基线可能只有 1ms）
+LATENCY_FLOOR = 0.05
+EWMA_ALPHA = 0.2
+
+
+class EndpointStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.failures = 0
+        self.latency_ewma = 0.0
+        self.latency_min = None
+        self.latency_max = 0.0
+
+    def observe(self, latency: float):
+        self.requests += 1
+        self.latency_ewma = latency if self.requests == 1 else (
+            EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency_ewma)
+        self.latency_min = latency if self.latency_min is None else min(self.latency_min, latency)
+        self.latency_max = max(self.latency_max, latency)
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests, "errors": self.errors, "retries": self.retries,
+            "failures": self.failures, "latency_ewma": self.latency_ewma,
+            "latency_min": self.latency_min or 0.0, "latency_max": self.latency_max,
+        }
+
+
+class RequestScheduler:
+    """包在 connection.request 外层的调度器，所有经 lcu_client.request_json 的请求共享同一并发上限。
+
+    fetch() 返回 (status, body)：瞬时错误（RETRY_STATUSES、连接异常、超时）按抖动退避重试，
+    重试耗尽后返回最后一次的响应或抛出最后一次的异常，由调用方决定是否 fallback。
+    并发上限按 AIMD 调整，可被多个事件循环（会话重连后新建的 loop）先后使用。
+    """
+
+    def __init__(self, initial=INITIAL_CONCURRENCY, min_concurrency=MIN_CONCURRENCY,
+                 max_concurrency=MAX_CONCURRENCY, max_retries=DEFAULT_MAX_RETRIES,
+                 timeout=REQUEST_TIMEOUT):
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.limit = float(max(min_concurrency, min(initial, max_concurrency)))
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.in_flight = 0
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._waiters = {}
+        self._last_decrease = 0.0
+        self._rng = random.Random()
+
+    # ----------------- 并发许可 -----------------
+
+    def _loop_waiters(self) -> list:
+        # 等待者 future 绑定事件循环，每个 loop 各自一个列表
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            waiters = self._waiters.get(loop)
+            if waiters is None:
+                self._waiters = {l: w for l, w in self._waiters.items() if not l.is_closed()}
+                waiters = self._waiters[loop] = []
+            return waiters
+
+    async def _acquire(self):
+        while self.in_flight >= int(self.limit):
+            waiters = self._loop_waiters()
+            waiter = asyncio.get_running_loop().create_future()
+            waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in waiters:
+                    waiters.remove(waiter)
+        self.in_flight += 1
+
+    def _release(self):
+        # 同步释放：任务被取消时在 finally 中调用，不能再 await
+        self.in_flight -= 1
+        waiters = self._loop_waiters()
+        while waiters:
+            waiter = waiters.pop()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _on_success(self, stats: EndpointStats, latency: float):
+        baseline = stats.latency_min or latency
+        congested = latency > LATENCY_FLOOR and latency > baseline * LATENCY_TOLERANCE
+        stats.observe(latency)
+        if congested:
+            self._decrease(f"{stats.name} latency {latency * 1000:.0f}ms")
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+
+    def _decrease(self, reason: str):
+        # 同一批并发请求往往一起出错，至少间隔一个典型请求耗时才再次减半
+        now = time.monotonic()
+        window = max((s.latency_ewma for s in self.stats.values()), default=0.0)
+        if now - self._last_decrease < max(window, LATENCY_FLOOR):
+            return
+        self._last_decrease = now
+        old = self.limit
+        self.limit = max(self.min_concurrency, self.limit * DECREASE_FACTOR)
+        logger.debug("LCU concurrency %.1f -> %.1f (%s)", old, self.limit, reason)
+
+    # ----------------- 请求 -----------------
+
+    async def fetch(self, conn, method: str, endpoint: str, stage: str, **kwargs):
+        stats = self.stats.get(stage)
+        if stats is None:
+            stats = self.stats.setdefault(stage, EndpointStats(stage))
+
+        attempt = 0
+        while True:
+            await self._acquire()
+            started = time.perf_counter()
+            error = status = body = resp = None
+            try:
+                try:
+                    resp = await asyncio.wait_for(conn.request(method, endpoint, **kwargs), self.timeout)
+                    body = await asyncio.wait_for(resp.read(), self.timeout)
+                    status = resp.status
+                except (asyncio.TimeoutError, OSError) as e:
+                    error = e
+                except Exception as e:
+                    # aiohttp.ClientError 等连接层异常同样视为瞬时错误
+                    if type(e).__module__.split(".")[0] not in ("aiohttp", "lcu_driver"):
+                        raise
+                    error = e
+                latency = time.perf_counter() - started
+
+                transient = error is not None or status in RETRY_STATUSES
+                if transient:
+                    stats.errors += 1
+                    self._decrease(f"{stage} {status or type(error).__name__}")
+                else:
+                    self._on_success(stats, latency)
+            finally:
+                # 取消（CancelledError）与非瞬时异常同样要归还许可；未读完的响应直接关闭连接
+                if resp is not None and body is None:
+                    _close_response(resp)
+                self._release()
+
+            if not transient:
+                return status, body
+            if attempt >= self.max_retries:
+                stats.failures += 1
+                metrics.inc("lcu_request_failures_total", endpoint=stage)
+                if error is not None:
+                    raise error
+                return status, body
+
+            attempt += 1
+            stats.retries += 1
+            metrics.inc("lcu_request_retries_total", endpoint=stage)
+            delay = self._rng.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt))
+            logger.debug("Retrying %s %s in %.2fs (attempt %d, %s)", method, endpoint, delay, attempt,
+                         status or error)
+            await asyncio.sleep(delay)
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "endpoints": {name: s.as_dict() for name, s in self.stats.items()},
+        }
+
+
+def _close_response(resp):
+    close = getattr(resp, "close", None)
+    if callable(close):
+        try:
+            close()
+        except Exception as e:
+            logger.debug("Failed to close LCU response: %s", e)
+
+def format_scheduler_stats(snapshot: dict) -> str:
+    lines = [f"concurrency limit {snapshot['limit']:.1f}"]
+    for name, s in snapshot["endpoints"].items():
+        lines.append(
+            f"{name:>13}: {s['requests']:6d} ok  {s['errors']:4d} errors  {s['retries']:4d} retries  "
+            f"{s['failures']:3d} failed  ewma {s['latency_ewma'] * 1000:7.1f}ms  "
+            f"min {s['latency_min'] * 1000:6.1f}ms"
+        )
+    return "\n".join(lines)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> RequestScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
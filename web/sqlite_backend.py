@@ -0,0 +1,137 @@
+# sqlite_backend.py（嵌入式 SQLite 后端：单机安装无需 MySQL 容器，连接对象模拟 pymysql 的接口）
+
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from functools import lru_cache
+
+# WAL 允许读写并发；synchronous=NORMAL 在 WAL 下每次提交不再 fsync 主库，断电最多丢失最近的事务；
+# 其余为批量写入时的缓存设置（cache_size 为负数表示 KiB）。
+# SQLite 默认不检查外键；打开后违反外键的行与 MySQL 一样不会落库，区别在于 INSERT OR IGNORE 不忽略外键错误，
+# 整条语句报错回滚（MySQL 的 INSERT IGNORE 静默跳过该行）。match_storage.write_rows 写入前已过滤这些行
+SQLITE_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA busy_timeout = 5000",
+)
+
+_PLACEHOLDER = re.compile(r"%s")
+_UPSERT = re.compile(r"ON DUPLICATE KEY UPDATE", re.IGNORECASE)
+_VALUES_REF = re.compile(r"VALUES\((\w+)\)", re.IGNORECASE)
+_FOR_UPDATE = re.compile(r"\s+FOR UPDATE\s*$", re.IGNORECASE)
+
+
+@lru_cache(maxsize=256)
+def translate_sql(sql: str) -> str:
+    """把本项目用到的 MySQL 方言改写为 SQLite：占位符、INSERT IGNORE、ON DUPLICATE KEY、FOR UPDATE、EXPLAIN。"""
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = re.sub(r"^\s*INSERT IGNORE INTO", "INSERT OR IGNORE INTO", sql, flags=re.IGNORECASE)
+    if _UPSERT.search(sql):
+        head, updates = _UPSERT.split(sql, maxsplit=1)
+        sql = head + "ON CONFLICT DO UPDATE SET" + _VALUES_REF.sub(r"excluded.\1", updates)
+    # SQLite 整库单写者，BEGIN IMMEDIATE 已起到行锁的作用
+    sql = _FOR_UPDATE.sub("", sql)
+    sql = re.sub(r"^\s*CREATE INDEX ", "CREATE INDEX IF NOT EXISTS ", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"^\s*EXPLAIN ", "EXPLAIN QUERY PLAN ", sql, flags=re.IGNORECASE)
+    return sql
+
+
+class SQLiteCursor:
+    """支持 with 语句的游标；execute / executemany 接受 %s 占位符。"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def execute(self, sql, params=()):
+        return self._cursor.execute(translate_sql(sql), tuple(params or ()))
+
+    def executemany(self, sql, seq_of_params):
+        return self._cursor.executemany(translate_sql(sql), seq_of_params)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size or self._cursor.arraysize)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """begin / commit / rollback / cursor / close 与 pymysql 连接一致，match_storage 无需区分后端。"""
+
+    def __init__(self, path: str):
+        # isolation_level=None：与 pymysql 的 autocommit=True 一致，事务由 begin() 显式开启
+        self._conn = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+        )
+        for pragma in SQLITE_PRAGMAS:
+            self._conn.execute(pragma)
+
+    def cursor(self, cursor_class=None):
+        # cursor_class（如 SSCursor）对 SQLite 无意义：sqlite3 游标本身就按需逐行读取
+        return SQLiteCursor(self._conn.cursor())
+
+    def begin(self):
+        # IMMEDIATE 在事务开始时即取得写锁，避免多个写线程读后升级锁时死锁
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        if self._conn.in_transaction:
+            self._conn.execute("COMMIT")
+
+    def rollback(self):
+        if self._conn.in_transaction:
+            self._conn.execute("ROLLBACK")
+
+    def close(self):
+        self._conn.close()
+
+
+def _adapt_datetime(value: datetime) -> str:
+    # 与 pymysql 写入 DATETIME 一致：丢弃时区，按本身的时刻值存储
+    return value.replace(tzinfo=None).isoformat(sep=" ")
+
+def _convert_datetime(value: bytes) -> datetime:
+    return datetime.fromisoformat(value.decode())
+
+_registered = False
+_register_lock = threading.Lock()
+
+def _register_types():
+    global _registered
+    with _register_lock:
+        if not _registered:
+            # 与 MySQL DATETIME 一样存取 datetime 对象（Python 3.12 起默认适配器已弃用）
+            sqlite3.register_adapter(datetime, _adapt_datetime)
+            sqlite3.register_converter("DATETIME", _convert_datetime)
+            _registered = True
+
+def connect_sqlite(path: str) -> SQLiteConnection:
+    _register_types()
+    return SQLiteConnection(path)
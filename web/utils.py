@@ -1,4 +1,16 @@
+import asyncio
+
 async def get_current_summoner(connection):
     resp = await connection.request('GET', '/lol-summoner/v1/current-summoner')
     data = await resp.json()
     return data.get('displayName'), data.get('puuid')
+
+async def gather_or_cancel(*aws):
+    """与 asyncio.gather 相同；任一任务失败（或自身被取消）时先取消并等待其余任务结束，再抛出异常。"""
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
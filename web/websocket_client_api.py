@@ -1,12 +1,13 @@
 # websocket_client_api.py（完整保留：线程封装、API 调用、数据库落库、批量入库）
 
-from PyQt5.QtCore import QThread, QEventLoop
+from PyQt5.QtCore import QThread
 import logging
 import concurrent.futures
 from web.websocket_client_worker import APICallWorker
-from web.match_storage import connect_mysql, insert_match_json
-from lcu_driver import Connector
-from web.lcu_client import fetch_and_store_history
+from web.match_storage import connect_mysql, insert_match_json, get_stored_game_ids, get_high_water_mark
+from web.lcu_client import reached_stored_history
+from web.ingest_pipeline import IngestPipeline, format_stats
+from web.lcu_session import get_session
 
 class APICallThread(QThread):
     def __init__(self, api_name: str, api_params: dict = None, parent=None):
@@ -20,18 +21,10 @@ class APICallThread(QThread):
         self.worker.run()
 
 def call_api(api_name: str, api_params: dict = None):
-    thread = APICallThread(api_name, api_params)
-    loop = QEventLoop()
-    result = {}
-
-    def handle_result(data):
-        result["data"] = data
-        loop.quit()
-
-    thread.worker.resultReady.connect(handle_result)
-    thread.start()
-    loop.exec_()
-    return result.get("data")
+    # APICallWorker.run() 阻塞在长连接会话上，调用线程直接等待结果，不再启动 QThread + 嵌套 QEventLoop
+    worker = APICallWorker(api_name, api_params)
+    worker.run()
+    return worker.response.get("data")
 
 def call_api_paginated(
     api_name: str,
@@ -70,7 +63,31 @@ def call_summoner():
 def call_match_history():
     return call_api("match_history", {"page_index": 0, "page_size": 30})
 
-def call_match_history_paginated(progress_callback=None, status_callback=None):
+def call_api_incremental(api_name: str, page_size=30, max_pages=10, status_callback=None):
+    # 顺序翻页，只返回尚未入库的比赛；越过高水位线且整页已入库时停止（见 reached_stored_history）
+    results = []
+    summoner = call_api("summoner") or {}
+    conn = connect_mysql()
+    try:
+        hwm_creation, hwm_game_id = get_high_water_mark(conn, summoner.get("puuid"))
+        for index in range(max_pages):
+            page_data = call_api(api_name, {"page_index": index, "page_size": page_size}) or []
+            known = get_stored_game_ids(conn, [g.get("gameId") for g in page_data])
+            new_games = [g for g in page_data if g.get("gameId") not in known]
+            results.extend(new_games)
+            if status_callback:
+                status_callback(f"Page {index + 1}: {len(new_games)} new of {len(page_data)}")
+            if len(page_data) < page_size:
+                break
+            if reached_stored_history(page_data, new_games, hwm_creation, hwm_game_id):
+                break
+    finally:
+        conn.close()
+    return results
+
+def call_match_history_paginated(progress_callback=None, status_callback=None, incremental=False):
+    if incremental:
+        return call_api_incremental("match_history", page_size=30, max_pages=10, status_callback=status_callback)
     return call_api_paginated(
         "match_history",
         total_range=(0, 300),
@@ -81,18 +98,22 @@ def call_match_history_paginated(progress_callback=None, status_callback=None):
     )
 
 def store_match_detail(match_json):
+    # 连接来自共享连接池，close() 只是归还，不再每场比赛重新握手
     conn = connect_mysql()
-    insert_match_json(match_json, conn)
-    conn.close()
+    try:
+        insert_match_json(match_json, conn)
+    finally:
+        conn.close()
 
-# 自动分页拉取并入库（用于 API3）
-def call_match_history_and_store():
-    connector = Connector()
+async def _run_ingest_pipeline(connection, **kwargs):
+    return await IngestPipeline(connection, **kwargs).run()
 
-    @connector.ready
-    async def on_ready(connection):
-        for page_index in range(5):  # 拉取前 5 页
-            await fetch_and_store_history(connection, page_index=page_index, page_size=30)
-        await connector.stop()
+# 自动增量拉取并入库（用于 API3）：只请求尚未入库的比赛
+def call_match_history_and_store():
+    stats = get_session().call(_run_ingest_pipeline, pages=10, page_size=30, incremental=True)
+    print(format_stats(stats))
 
-    connector.start()
+# 全量回填前 5 页，忽略已入库状态
+def call_match_history_backfill():
+    stats = get_session().call(_run_ingest_pipeline, pages=5, page_size=30)
+    print(format_stats(stats))
@@ -1,10 +1,10 @@
-import asyncio
 import logging
 import concurrent.futures
-from PyQt5.QtCore import QObject, pyqtSignal, QThread, QEventLoop
-from lcu_driver import Connector
-from lcu_driver.connection import Connection
+from PyQt5.QtCore import QObject, pyqtSignal, QThread
 from web.lcu_client import fetch_match_history_page, get_current_summoner
+from web.lcu_session import get_session
+
+logger = logging.getLogger(__name__)
 
 
 class APICallWorker(QObject):
@@ -17,59 +17,42 @@ class APICallWorker(QObject):
         self.timeout = timeout
         self._cancelled = False
         self.response = {"data": None}
-        self.connector = None
-        print(f"[DEBUG] APICallWorker initialized with api_type={self.api_type}")
+        logger.debug("APICallWorker initialized with api_type=%s", self.api_type)
 
     def cancel(self):
         self._cancelled = True
 
     def run(self):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        self.connector = Connector(loop=loop)
-        self.connector.ready(self._connect_callback)
         self._cancelled = False
-
         try:
-            self.connector.start()
+            # 复用长连接会话，不再为每次调用新建 event loop 与 Connector；
+            # 客户端未运行时最多等待 timeout 秒，不让调用线程永久阻塞
+            data = get_session().call(self._dispatch, connect_timeout=self.timeout)
+            if not self._cancelled:
+                self.response = {"data": data}
         except Exception as e:
-            print(f"[ERROR] connector.start() failed: {e}")
-            self.resultReady.emit(self.response)
+            logger.error("Exception during API call: %s", e)
+        self.resultReady.emit(self.response)
 
-    async def _connect_callback(self, connection: Connection):
-        print(f"[DEBUG] API type dispatched: {self.api_type}")
-        try:
-            if self.api_type == "match_history":
-                print(f"[DEBUG] match_history branch entered")
-                summoner, puuid = await get_current_summoner(connection)
-                print(f"[DEBUG] summoner: {summoner.get('displayName')}, puuid: {puuid}")
-
-                page_index = self.api_params.get("page_index", 0)
-                page_size = self.api_params.get("page_size", 30)
-
-                games = await fetch_match_history_page(connection, puuid, page_index, page_size)
-                logging.info(f"{games[0]}")
-                print(f"[DEBUG] fetched {len(games)} games")
-
-                if not self._cancelled:
-                    self.response = {"data": games}
-                    print(f"[DEBUG] Emitting resultReady with {len(games)} items")
-                    self.resultReady.emit(self.response)
-
-            elif self.api_type == "summoner":
-                print(f"[DEBUG] summoner branch entered")
-                summoner, puuid = await get_current_summoner(connection)
-                print(f"[DEBUG] summoner: {summoner.get('displayName')}, puuid: {puuid}")
-                if not self._cancelled:
-                    self.response = {"data": summoner}
-                    print(f"[DEBUG] Emitting resultReady for summoner")
-                    self.resultReady.emit(self.response)
+    async def _dispatch(self, connection):
+        logger.debug("API type dispatched: %s", self.api_type)
+        if self.api_type == "match_history":
+            logger.debug("match_history branch entered")
+            summoner, puuid = await get_current_summoner(connection)
+            logger.debug("summoner: %s, puuid: %s", summoner.get('displayName'), puuid)
 
-        except Exception as e:
-            print(f"[ERROR] Exception during API call: {e}")
-            self.resultReady.emit(self.response)
-        finally:
-            await self.connector.stop()
+            page_index = self.api_params.get("page_index", 0)
+            page_size = self.api_params.get("page_size", 30)
+
+            games = await fetch_match_history_page(connection, puuid, page_index, page_size)
+            logger.debug("fetched %s games", len(games))
+            return games
+
+        elif self.api_type == "summoner":
+            logger.debug("summoner branch entered")
+            summoner, puuid = await get_current_summoner(connection)
+            logger.debug("summoner: %s, puuid: %s", summoner.get('displayName'), puuid)
+            return summoner
 
 
 class APICallThread(QThread):
@@ -77,7 +60,7 @@ class APICallThread(QThread):
         super().__init__(parent)
         self.api_name = api_name
         self.api_params = api_params or {}
-        print(f"[DEBUG] Initializing APICallThread with api_name={self.api_name}")
+        logger.debug("Initializing APICallThread with api_name=%s", self.api_name)
         self.worker = APICallWorker(self.api_name, self.api_params)
 
     def run(self):
@@ -86,19 +69,11 @@ class APICallThread(QThread):
 
 
 def call_api(api_name: str, api_params: dict = None):
-    print(f"[DEBUG] call_api invoked with api_name={api_name}")
-    thread = APICallThread(api_name, api_params)
-    loop = QEventLoop()
-    result = {}
-
-    def handle_result(data):
-        result["data"] = data
-        loop.quit()
-
-    thread.worker.resultReady.connect(handle_result)
-    thread.start()
-    loop.exec_()
-    return result.get("data")
+    logger.debug("call_api invoked with api_name=%s", api_name)
+    # APICallWorker.run() 阻塞在长连接会话上，调用线程直接等待结果，不再启动 QThread + 嵌套 QEventLoop
+    worker = APICallWorker(api_name, api_params)
+    worker.run()
+    return worker.response.get("data")
 
 
 def call_api_paginated(api_name: str, total_range=(0, 300), page_size=30, max_workers=3):
@@ -107,7 +82,7 @@ def call_api_paginated(api_name: str, total_range=(0, 300), page_size=30, max_wo
     results = []
 
     def fetch_page(index):
-        print(f"[DEBUG] call_api_paginated: dispatch page_index={index}")
+        logger.debug("call_api_paginated: dispatch page_index=%s", index)
         return call_api(api_name, {"page_index": index, "page_size": page_size})
 
     with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor: